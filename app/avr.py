@@ -1,8 +1,17 @@
 import utilities
+import hexfile
 from pathlib import Path
+import re
 import subprocess
+import time
 from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
 
+TOOL_ARGS = ["-t", "avrispmk2",
+             "-i", "pdi",
+             "-d", "atxmega256a3"]
+# atprogram prints one of these for every command in a chain that succeeds.
+STEP_DONE_PATTERN = r"completed successfully"
+
 
 class FlashD505(QObject):
     """Class that flashes the D505 board with hex files."""
@@ -13,11 +22,15 @@ class FlashD505(QObject):
     file_not_found_signal = pyqtSignal(str)
     version_signal = pyqtSignal(str, str, str)
     generic_error_signal = pyqtSignal(str)
+    command_timed = pyqtSignal(str, float)
 
     def __init__(self):
         # , atprogram_path: str, hex_files_path: Path, main_file: str):
         super().__init__()
         self.flash_flag = False
+        # Run every operation in one atprogram call, so the programmer only
+        # connects and enters PDI mode once.
+        self.chained = False
 
         # Hide console window
         self.si = subprocess.STARTUPINFO()
@@ -29,7 +42,9 @@ class FlashD505(QObject):
         self.boot_file = Path.joinpath(hex_files_path, "boot-section.hex")
         self.app_file = Path.joinpath(hex_files_path, "app-section.hex")
         self.main_file = None
+        self.image_file = None
         self.one_wire_file = None
+        self.operations = None
         self.commands = None
 
     def check_files(self):
@@ -60,85 +75,131 @@ class FlashD505(QObject):
             self.file_not_found_signal.emit("1-wire-master")
             return
 
-        chip_erase = [self.atprogram_path,
-                      "-t", "avrispmk2",
-                      "-i", "pdi",
-                      "-d", "atxmega256a3",
-                      "chiperase"]
-        prog_boot = [self.atprogram_path,
-                     "-t", "avrispmk2",
-                     "-i", "pdi",
-                     "-d", "atxmega256a3",
-                     "program",
-                     "--flash", "-f", str(self.boot_file),
-                     "--format", "hex",
-                     "--verify"]
-        prog_app = [self.atprogram_path,
-                    "-t", "avrispmk2",
-                    "-i", "pdi",
-                    "-d", "atxmega256a3",
-                    "program",
-                    "--flash", "-f", str(self.app_file),
-                    "--format", "hex",
-                    "--verify"]
-        prog_main = [self.atprogram_path,
-                     "-t", "avrispmk2",
-                     "-i", "pdi",
-                     "-d", "atxmega256a3",
-                     "program",
-                     "--flash", "-f", str(self.main_file),
-                     "--format", "hex",
-                     "--verify"]
-        write_fuses = [self.atprogram_path,
-                       "-t", "avrispmk2",
-                       "-i", "pdi",
-                       "-d", "atxmega256a3",
-                       "write",
-                       "--fuses", "--values", "FF00BDFFFEDE"]
-        write_lockbits = [self.atprogram_path,
-                          "-t", "avrispmk2",
-                          "-i", "pdi",
-                          "-d", "atxmega256a3",
-                          "write",
-                          "--lockbits", "--values", "FC"]
-
-        # Command status is for the subsequent step
-        self.commands = {"chip_erase": chip_erase,
-                         "prog_boot": prog_boot,
-                         "prog_app": prog_app,
-                         "prog_main": prog_main,
-                         "write_fuses": write_fuses,
-                         "write_lockbits": write_lockbits}
+        # Boot, app and main are merged into one cached image so atprogram
+        # parses and verifies a single file. Files that can't be merged, or
+        # a hex directory that can't be written, fall back to programming
+        # them one by one.
+        try:
+            self.image_file = hexfile.cached_image(
+                [self.boot_file, self.app_file, self.main_file])
+        except (ValueError, OSError):
+            self.image_file = None
+
+        # Operations, each run after connecting to the board with TOOL_ARGS.
+        self.operations = {"chip_erase": ["chiperase"]}
+        if self.image_file:
+            self.operations["prog_image"] = self.program_args(self.image_file)
+        else:
+            self.operations["prog_boot"] = self.program_args(self.boot_file)
+            self.operations["prog_app"] = self.program_args(self.app_file)
+            self.operations["prog_main"] = self.program_args(self.main_file)
+        self.operations["write_fuses"] = ["write",
+                                          "--fuses", "--values",
+                                          "FF00BDFFFEDE"]
+        self.operations["write_lockbits"] = ["write",
+                                             "--lockbits", "--values", "FC"]
+
+        self.commands = {cmd_text: [self.atprogram_path] + TOOL_ARGS + op
+                         for cmd_text, op in self.operations.items()}
 
         self.version_signal.emit(main_app_ver, 
                                  str(self.one_wire_file), one_wire_ver)
 
+    @staticmethod
+    def program_args(hex_file):
+        return ["program",
+                "--flash", "-f", str(hex_file),
+                "--format", "hex",
+                "--verify"]
+
+    def run(self, name, cmd, **kwargs):
+        """Runs an atprogram command line, emitting how long it took, and
+        returns its output."""
+        start = time.monotonic()
+        try:
+            return subprocess.check_output(cmd, startupinfo=self.si,
+                                           **kwargs).decode()
+        finally:
+            self.command_timed.emit(name, time.monotonic() - start)
+
+    def chained_command(self):
+        """Returns a single atprogram command line running all operations."""
+        cmd = [self.atprogram_path] + TOOL_ARGS
+        for op in self.operations.values():
+            cmd += op
+        return cmd
+
+    def report_chained_status(self, status, exited_ok=True):
+        """Emits command_succeeded for each operation atprogram reported as
+        completed, and command_failed for the one after them if the chain
+        stopped early. A chain that exited with an error has always failed,
+        so if every operation reported completing the last one is failed.
+        Returns True if every operation completed."""
+        completed = len(re.findall(STEP_DONE_PATTERN, status, re.IGNORECASE))
+        cmd_texts = list(self.operations)
+        if not exited_ok:
+            completed = min(completed, len(cmd_texts) - 1)
+        for cmd_text in cmd_texts[:completed]:
+            self.command_succeeded.emit(cmd_text)
+        if completed < len(cmd_texts):
+            self.command_failed.emit(cmd_texts[completed])
+            return False
+        return True
+
+    def flash_chained(self):
+        """Flashes the D505 board with one atprogram call. Returns True if
+        every operation succeeded."""
+        exited_ok = True
+        try:
+            status = self.run("chained", self.chained_command(),
+                              stderr=subprocess.STDOUT)
+        except subprocess.CalledProcessError as e:
+            exited_ok = False
+            status = (e.output or b"").decode(errors="replace")
+            # Nothing completed; most likely the programmer isn't connected.
+            if not re.search(STEP_DONE_PATTERN, status, re.IGNORECASE):
+                self.process_error_signal.emit()
+                return False
+        except FileNotFoundError:
+            self.file_not_found_signal.emit(self.atprogram_path)
+            return False
+        except Exception as e:
+            self.generic_error_signal.emit(str(e))
+            return False
+        return self.report_chained_status(status, exited_ok)
+
     @pyqtSlot()
     def flash(self):
-        """Loops through all the commands to flash the D505 board."""
+        """Loops through all the commands to flash the D505 board, or runs
+        them as one chained command."""
         if not self.flash_flag:
-            for cmd_text, cmd in self.commands.items():
-                try:
-                    status = subprocess.check_output(cmd,
-                                                     startupinfo=self.si).decode()
-
-                    if "Firmware check OK" in status:
-                        self.command_succeeded.emit(cmd_text)
-                    else:
-                        self.command_failed.emit(cmd_text)
-                        break
-
-                except ValueError:
-                    self.command_failed.emit(cmd_text)
-                    return
-                except subprocess.CalledProcessError:
-                    self.process_error_signal.emit()
-                    return
-                except FileNotFoundError:
-                    self.file_not_found_signal.emit(cmd[10])
-                    return
-                except Exception as e:
-                    self.generic_error_signal.emit(e)
+            if self.chained:
+                if not self.flash_chained():
                     return
+            else:
+                for cmd_text, cmd in self.commands.items():
+                    try:
+                        status = self.run(cmd_text, cmd)
+
+                        if "Firmware check OK" in status:
+                            self.command_succeeded.emit(cmd_text)
+                        else:
+                            # Not finished, so the scheduler doesn't start
+                            # the tasks that need a flashed board.
+                            self.command_failed.emit(cmd_text)
+                            return
+
+                    except ValueError:
+                        self.command_failed.emit(cmd_text)
+                        return
+                    except subprocess.CalledProcessError:
+                        self.process_error_signal.emit()
+                        return
+                    except FileNotFoundError:
+                        self.file_not_found_signal.emit(cmd[10])
+                        return
+                    except Exception as e:
+                        self.generic_error_signal.emit(e)
+                        return
             self.flash_flag = True
         self.flash_finished.emit()
@@ -19,6 +19,10 @@ class FinalPage(QWizardPage):
 
     def initializePage(self):
         # Check test result
+        self.tu.timer.leave_page()
+        self.tu.timer.write_to(self.report)
+        self.tu.main_window.metrics.add_board(self.tu.timer)
+
         report_file_path = self.tu.settings.value("report_file_path")
         self.report.set_file_location(report_file_path)
         self.report.generate_report()
@@ -35,12 +39,18 @@ class FinalPage(QWizardPage):
         self.break_down_lbl = QLabel("Remove power and disconnect all"
                                      " peripherals from DUT.")
         self.break_down_lbl.setFont(self.label_font)
+        self.store_error_lbl = QLabel()
+        if self.report.store_error:
+            self.store_error_lbl.setText("Report saved, but not added to the "
+                                         "results database: "
+                                         f"{self.report.store_error}")
 
         self.layout = QVBoxLayout()
         self.layout.addStretch()
         self.layout.addWidget(self.test_status_labl)
         self.layout.addSpacing(25)
         self.layout.addWidget(self.break_down_lbl)
+        self.layout.addWidget(self.store_error_lbl)
         self.layout.addStretch()
         self.layout.setAlignment(Qt.AlignHCenter)
         self.setLayout(self.layout)
@@ -0,0 +1,397 @@
+"""Intel HEX parsing, the merged firmware image cache and the 1-wire
+master page index.
+
+The boot-section, app-section and main-app hex files are merged into one
+image the first time a firmware set is used. The image and a manifest
+describing its sources are stored next to the hex files. The manifest is
+checked against the sources' sizes and mtimes, and against their SHA-256
+hashes if those changed, so the image is rebuilt whenever a source does.
+The hex directory is shared by every fixture, so files are written under a
+temporary name and renamed into place, and old images are only deleted once
+they haven't been used for a day.
+
+Parsed files are kept in memory, keyed by path and mtime, so uploads and
+merges don't read or check a file again until it changes.
+
+The page index records a hash of every flash page of each 1-wire master
+version that has been programmed, so an upgrade only needs to send the
+records in pages that differ from the board's current version.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from array import array
+from pathlib import Path
+
+MANIFEST_NAME = "firmware-image.json"
+IMAGE_PREFIX = "firmware-image-"
+# Images other than the current one are deleted once they haven't been used
+# for this many seconds, far longer than programming a board takes.
+IMAGE_MAX_AGE = 24 * 60 * 60
+RECORD_SIZE = 16
+PAGE_INDEX_NAME = "1-wire-master-pages.json"
+PAGE_SIZE = 128
+
+DATA = 0x00
+EOF = 0x01
+EXTENDED_SEGMENT_ADDRESS = 0x02
+EXTENDED_LINEAR_ADDRESS = 0x04
+
+
+def parse_record(line, line_num=0):
+    """Returns the (type, address, data) of an Intel HEX record. Raises
+    ValueError if it is malformed or its checksum is wrong."""
+    record = line.strip()
+    try:
+        if record[:1] != b":":
+            raise ValueError
+        raw = bytes.fromhex(record[1:].decode("ascii"))
+    except ValueError:
+        raise ValueError(f"Bad hex record on line {line_num}")
+    if len(raw) < 5 or len(raw) != raw[0] + 5 or sum(raw) & 0xFF:
+        raise ValueError(f"Bad hex record on line {line_num}")
+    return (raw[3], (raw[1] << 8) | raw[2], raw[4:-1])
+
+
+class HexRecords:
+    """The records of an Intel HEX file, parsed and checked once.
+
+    Instance variables:
+    raw          --  Every record as it appears in the file, line endings
+                     included, back-to-back.
+    offsets      --  Start of each record in raw, plus the end of the last.
+    types        --  Record type of each record.
+    addresses    --  Absolute address of each record's data.
+    data         --  Data bytes of all records, back-to-back.
+    data_offsets --  Start of each record's data in data, plus the end.
+    total_bytes  --  Bytes sent when the file is uploaded.
+    """
+
+    def __init__(self, file_path):
+        with open(file_path, "rb") as f:
+            lines = f.readlines()
+
+        raw = bytearray()
+        data = bytearray()
+        self.offsets = array("L", [0])
+        self.types = bytearray()
+        self.addresses = array("L")
+        self.data_offsets = array("L", [0])
+        base = 0
+        for line_num, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            rec_type, address, rec_data = parse_record(line, line_num)
+            if rec_type == EXTENDED_SEGMENT_ADDRESS:
+                base = int.from_bytes(rec_data, "big") << 4
+            elif rec_type == EXTENDED_LINEAR_ADDRESS:
+                base = int.from_bytes(rec_data, "big") << 16
+            raw += line
+            data += rec_data
+            self.offsets.append(len(raw))
+            self.types.append(rec_type)
+            self.addresses.append(base + address)
+            self.data_offsets.append(len(data))
+
+        self.raw = bytes(raw)
+        self.data = bytes(data)
+        self.total_bytes = len(self.raw)
+
+    def __len__(self):
+        return len(self.types)
+
+    def __iter__(self):
+        return (self.record(i) for i in range(len(self)))
+
+    def record(self, i):
+        """Returns record i as it appears in the file."""
+        return memoryview(self.raw)[self.offsets[i]:self.offsets[i + 1]]
+
+    def record_data(self, i):
+        """Returns the data bytes of record i."""
+        return memoryview(self.data)[
+            self.data_offsets[i]:self.data_offsets[i + 1]]
+
+
+# Parsed files keyed by path, with the mtime and size they were read at.
+_records_cache = {}
+_records_lock = threading.Lock()
+
+
+def load(file_path):
+    """Returns the HexRecords of a file, parsing it only if it hasn't been
+    parsed since it last changed. Raises ValueError for a bad record."""
+    path = str(Path(file_path).resolve())
+    st = Path(path).stat()
+    key = (st.st_mtime_ns, st.st_size)
+    with _records_lock:
+        cached = _records_cache.get(path)
+        if cached and cached[0] == key:
+            return cached[1]
+    records = HexRecords(path)
+    with _records_lock:
+        _records_cache[path] = (key, records)
+    return records
+
+
+def read_chunks(file_path):
+    """Returns the data in a hex file as (absolute address, bytes) chunks."""
+    records = load(file_path)
+    return [(records.addresses[i], records.record_data(i))
+            for i in range(len(records)) if records.types[i] == DATA]
+
+
+def merge(file_paths):
+    """Merges hex files into a list of contiguous (address, bytearray)
+    segments. Raises ValueError if two files put different data at the same
+    address."""
+    chunks = []
+    for file_path in file_paths:
+        chunks += read_chunks(file_path)
+    chunks.sort(key=lambda chunk: chunk[0])
+
+    segments = []
+    for address, data in chunks:
+        if segments:
+            start, segment = segments[-1]
+            end = start + len(segment)
+            if address < end:
+                overlap = min(end - address, len(data))
+                offset = address - start
+                if segment[offset:offset + overlap] != data[:overlap]:
+                    raise ValueError(f"Hex files overlap at 0x{address:X}")
+                segment += data[overlap:]
+                continue
+            if address == end:
+                segment += data
+                continue
+        segments.append((address, bytearray(data)))
+    return segments
+
+
+def make_record(rec_type, address, data):
+    raw = bytes([len(data), (address >> 8) & 0xFF, address & 0xFF,
+                 rec_type]) + bytes(data)
+    checksum = (-sum(raw)) & 0xFF
+    return f":{raw.hex().upper()}{checksum:02X}\r\n"
+
+
+def write_atomic(file_path, write):
+    """Writes a file by calling write with a text file open on a temporary
+    file in the same directory, then renames it into place. Readers see
+    either the old or the new file, never a partly written one."""
+    file_path = Path(file_path)
+    fd, temp = tempfile.mkstemp(prefix=file_path.name, suffix=".tmp",
+                                dir=file_path.parent)
+    try:
+        with os.fdopen(fd, "w", newline="") as f:
+            write(f)
+        os.replace(temp, file_path)
+    except BaseException:
+        try:
+            os.unlink(temp)
+        except OSError:
+            pass
+        raise
+
+
+def write_image(segments, file_path):
+    """Writes merged segments as an Intel HEX file."""
+    write_atomic(file_path, lambda f: write_records(segments, f))
+
+
+def write_records(segments, f):
+    """Writes segments to an open file as Intel HEX records."""
+    upper = None
+    for start, segment in segments:
+        offset = 0
+        while offset < len(segment):
+            address = start + offset
+            # Records can't cross a 64 kB boundary.
+            length = min(RECORD_SIZE, len(segment) - offset,
+                         0x10000 - (address & 0xFFFF))
+            if address >> 16 != upper:
+                upper = address >> 16
+                f.write(make_record(EXTENDED_LINEAR_ADDRESS, 0,
+                                    upper.to_bytes(2, "big")))
+            f.write(make_record(DATA, address & 0xFFFF,
+                                segment[offset:offset + length]))
+            offset += length
+    f.write(make_record(EOF, 0, b""))
+
+
+def sha256(file_path):
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def source_entry(file_path, digest=None):
+    st = Path(file_path).stat()
+    return {"name": Path(file_path).name,
+            "size": st.st_size,
+            "mtime": st.st_mtime,
+            "sha256": digest or sha256(file_path)}
+
+
+def read_manifest(directory):
+    try:
+        with open(Path(directory, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def sources_match(manifest, file_paths):
+    """Checks the manifest describes the given files. A file whose size and
+    mtime are unchanged is trusted; otherwise its hash is compared, so a
+    file that was only touched doesn't cause a rebuild. Returns the updated
+    source entries, or None if any source changed."""
+    entries = manifest.get("sources", [])
+    if [e.get("name") for e in entries] != [Path(p).name
+                                            for p in file_paths]:
+        return None
+    updated = []
+    for entry, file_path in zip(entries, file_paths):
+        st = Path(file_path).stat()
+        if st.st_size == entry["size"] and st.st_mtime == entry["mtime"]:
+            updated.append(entry)
+            continue
+        digest = sha256(file_path)
+        if digest != entry["sha256"]:
+            return None
+        updated.append(source_entry(file_path, digest))
+    return updated
+
+
+def cached_image(file_paths):
+    """Returns the path of the merged image of the given hex files, building
+    it if the cache is missing or out of date. The cache lives in the first
+    file's directory. Raises ValueError if the files can't be merged and
+    OSError if the directory can't be written."""
+    directory = Path(file_paths[0]).parent
+    manifest = read_manifest(directory)
+    if manifest:
+        sources = sources_match(manifest, file_paths)
+        image = directory / manifest.get("image", "")
+        if sources and image.is_file():
+            if sources != manifest["sources"]:
+                manifest["sources"] = sources
+                write_manifest(directory, manifest)
+            mark_used(image)
+            return image
+
+    sources = [source_entry(p) for p in file_paths]
+    key = hashlib.sha256("".join(s["sha256"]
+                                 for s in sources).encode()).hexdigest()
+    # The name depends only on the sources, so an image another fixture
+    # already built from them is used as it is.
+    image = directory / f"{IMAGE_PREFIX}{key[:12]}.hex"
+    if image.is_file():
+        mark_used(image)
+    else:
+        write_image(merge(file_paths), image)
+    write_manifest(directory, {"sources": sources, "image": image.name})
+    remove_old_images(directory, image)
+    return image
+
+
+def mark_used(image):
+    """Updates the image's mtime so it isn't deleted as unused while a
+    board is programmed from it."""
+    try:
+        os.utime(image)
+    except OSError:
+        pass
+
+
+def remove_old_images(directory, current):
+    """Deletes the images other than current that haven't been used for
+    IMAGE_MAX_AGE. Newer ones may still be programming a board on another
+    fixture."""
+    cutoff = time.time() - IMAGE_MAX_AGE
+    for image in Path(directory).glob(f"{IMAGE_PREFIX}*.hex"):
+        if image.name == current.name:
+            continue
+        try:
+            if image.stat().st_mtime < cutoff:
+                image.unlink()
+        except OSError:
+            pass
+
+
+def write_manifest(directory, manifest):
+    write_atomic(Path(directory, MANIFEST_NAME),
+                 lambda f: json.dump(manifest, f, indent=2))
+
+
+def page_hashes(file_path, page_size=PAGE_SIZE):
+    """Returns a hash of each flash page the hex file writes, keyed by the
+    page's address as a string."""
+    pages = {}
+    for address, segment in merge([file_path]):
+        for offset in range(len(segment)):
+            page = (address + offset) // page_size * page_size
+            pages.setdefault(page, bytearray(page_size * b"\xff"))
+            pages[page][(address + offset) % page_size] = segment[offset]
+    return {str(page): hashlib.sha1(data).hexdigest()
+            for page, data in pages.items()}
+
+
+def delta_records(file_path, old_pages, page_size=PAGE_SIZE):
+    """Returns the records of the hex file that write to pages whose hash
+    differs from old_pages, with the address records they need and the end
+    of file record. Returns None if the old version wrote a page the new one
+    doesn't: the page-write command doesn't erase the rest of the flash, so
+    only a full upload clears it."""
+    new_pages = page_hashes(file_path, page_size)
+    if any(page not in new_pages for page in old_pages):
+        return None
+    changed = {int(page) for page, digest in new_pages.items()
+               if old_pages.get(page) != digest}
+
+    records = load(file_path)
+    delta = []
+    address_record = None
+    for i, record in enumerate(records):
+        rec_type = records.types[i]
+        if rec_type in (EXTENDED_SEGMENT_ADDRESS, EXTENDED_LINEAR_ADDRESS):
+            address_record = record
+        elif rec_type == DATA:
+            start = records.addresses[i]
+            length = max(len(records.record_data(i)), 1)
+            first = start // page_size * page_size
+            last = (start + length - 1) // page_size * page_size
+            if any(page in changed
+                   for page in range(first, last + 1, page_size)):
+                if address_record is not None:
+                    delta.append(address_record)
+                    address_record = None
+                delta.append(record)
+        elif rec_type == EOF:
+            delta.append(record)
+            break
+    return delta
+
+
+def read_page_index(directory):
+    try:
+        with open(Path(directory, PAGE_INDEX_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_pages(directory, version, file_path):
+    """Records the page hashes of a 1-wire master version once a board has
+    been programmed with it."""
+    index = read_page_index(directory)
+    index[version] = {"page_size": PAGE_SIZE,
+                      "pages": page_hashes(file_path)}
+    write_atomic(Path(directory, PAGE_INDEX_NAME),
+                 lambda f: json.dump(index, f, indent=2))
@@ -0,0 +1,157 @@
+"""Versioned limit sets loaded from JSON files.
+
+A limit set file replaces any of the limits in Model and any of the station
+values the tests read from the settings (TAC IDs and IMEI), e.g.:
+
+    {
+        "version": "2026.10-1",
+        "limits": {"v_input_min": 5.2, "5v_uart_tolerance": 0.02},
+        "settings": {"iridium_imei": "300434063218220"}
+    }
+
+Files are parsed once and cached until they change. LimitWatcher reloads the
+file whenever it is written; a board keeps the limit set it started with, so
+a new set only takes effect from the next board.
+"""
+import json
+import threading
+from pathlib import Path
+from PyQt5.QtCore import QObject, QFileSystemWatcher, pyqtSignal
+import model
+
+BUILT_IN_VERSION = "built-in"
+# Settings a limit set may override. The GPS latitude and longitude
+# settings aren't listed, as the GPS test doesn't check the position.
+STATION_SETTINGS = [
+    "port1_tac_id", "port2_tac_id", "port3_tac_id", "port4_tac_id",
+    "iridium_imei"
+]
+
+
+class InvalidLimitSet(Exception):
+    pass
+
+
+class LimitSet:
+    """A version of the test limits.
+
+    Instance variables:
+    version   --  Version string recorded in each report.
+    limits    --  Complete Model.limits dictionary.
+    settings  --  Station settings the set overrides.
+    path      --  File the set was loaded from, None for the built-in set.
+    """
+
+    def __init__(self, version, limits, settings=None, path=None):
+        self.version = version
+        self.limits = limits
+        self.settings = settings or {}
+        self.path = path
+
+
+def built_in():
+    """Returns the limits compiled into the application."""
+    return LimitSet(BUILT_IN_VERSION, model.Model().limits)
+
+
+def parse(path):
+    """Reads and checks a limit set file. Raises InvalidLimitSet if it is
+    malformed and OSError if it can't be read."""
+    with open(path) as f:
+        try:
+            data = json.load(f)
+        except ValueError as e:
+            raise InvalidLimitSet(f"{Path(path).name}: {e}")
+    if not isinstance(data, dict) or not data.get("version"):
+        raise InvalidLimitSet(f"{Path(path).name}: no version")
+
+    limits = built_in().limits
+    for key, value in data.get("limits", {}).items():
+        if key not in limits:
+            raise InvalidLimitSet(f"{Path(path).name}: unknown limit {key}")
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise InvalidLimitSet(f"{Path(path).name}: {key} isn't a number")
+        limits[key] = value
+
+    settings = data.get("settings", {})
+    for key in settings:
+        if key not in STATION_SETTINGS:
+            raise InvalidLimitSet(f"{Path(path).name}: unknown setting {key}")
+    return LimitSet(str(data["version"]), limits,
+                    {key: str(value) for key, value in settings.items()},
+                    str(path))
+
+
+# Parsed files keyed by path, with the mtime and size they were read at.
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def load(path):
+    """Returns the LimitSet in a file, parsing it only if it changed since
+    it was last read."""
+    path = str(Path(path).resolve())
+    st = Path(path).stat()
+    key = (st.st_mtime_ns, st.st_size)
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached and cached[0] == key:
+            return cached[1]
+    limit_set = parse(path)
+    with _cache_lock:
+        _cache[path] = (key, limit_set)
+    return limit_set
+
+
+class LimitWatcher(QObject):
+    """Holds the current limit set and reloads it when its file changes.
+    A file that fails to load leaves the previous set in place.
+
+    Instance variables:
+    current  --  The LimitSet new boards are tested with.
+    """
+    limits_changed = pyqtSignal(str)
+    load_failed = pyqtSignal(str)
+
+    def __init__(self):
+        super().__init__()
+        self.current = built_in()
+        self.path = None
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self.reload)
+        # Editors often replace the file rather than write it, which drops
+        # it from the file watch; the directory watch catches that.
+        self.watcher.directoryChanged.connect(self.reload)
+
+    def watch(self, path):
+        """Loads the limit set in path and watches it for changes. An empty
+        path returns to the built-in limits."""
+        if self.watcher.files():
+            self.watcher.removePaths(self.watcher.files())
+        if self.watcher.directories():
+            self.watcher.removePaths(self.watcher.directories())
+        self.path = path or None
+        if not self.path:
+            self.swap(built_in())
+            return
+        self.watcher.addPath(str(Path(path).parent))
+        self.reload()
+
+    def reload(self, changed=None):
+        if not self.path:
+            return
+        if self.path not in self.watcher.files() and Path(self.path).exists():
+            self.watcher.addPath(self.path)
+        try:
+            limit_set = load(self.path)
+        except (OSError, InvalidLimitSet) as e:
+            self.load_failed.emit(str(e))
+            return
+        if limit_set is not self.current:
+            self.swap(limit_set)
+
+    def swap(self, limit_set):
+        # A single assignment, so a board starting now gets either the old
+        # or the new set, never a mix.
+        self.current = limit_set
+        self.limits_changed.emit(limit_set.version)
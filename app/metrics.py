@@ -0,0 +1,128 @@
+import statistics
+import time
+from collections import deque
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+
+PAGE = "Page"
+ATPROGRAM = "atprogram"
+SERIAL = "Serial"
+# Durations kept per step for the station statistics.
+HISTORY_SIZE = 200
+# Window boards per hour is counted over, in seconds.
+RATE_WINDOW = 3600
+
+
+def percentile(values, fraction):
+    """Returns the value below which the given fraction of values fall,
+    interpolating between the nearest two."""
+    values = sorted(values)
+    position = (len(values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position -
+                                                              lower)
+
+
+class BoardTimer(QObject):
+    """Times the pages, atprogram calls and serial commands of the board in
+    a fixture.
+
+    Instance variables:
+    board    --  Serial number of the board.
+    entries  --  (kind, name, seconds) of everything timed, in order.
+    page     --  (name, start) of the page being shown, or None.
+    """
+    updated = pyqtSignal()
+
+    def __init__(self):
+        super().__init__()
+        self.reset()
+
+    def reset(self, board=""):
+        self.board = board
+        self.entries = []
+        self.page = None
+        self.start = time.monotonic()
+
+    def record(self, kind, name, seconds):
+        self.entries.append((kind, name, seconds))
+        self.updated.emit()
+
+    @pyqtSlot(str, float)
+    def serial_command(self, name, seconds):
+        self.record(SERIAL, name, seconds)
+
+    @pyqtSlot(str, float)
+    def atprogram_command(self, name, seconds):
+        self.record(ATPROGRAM, name, seconds)
+
+    def enter_page(self, name):
+        """Ends the timing of the page being shown and starts the next."""
+        self.leave_page()
+        self.page = (name, time.monotonic())
+
+    def leave_page(self):
+        if self.page:
+            name, start = self.page
+            self.page = None
+            self.record(PAGE, name, time.monotonic() - start)
+
+    def totals(self):
+        """Returns the total seconds per (kind, name), in the order each was
+        first timed."""
+        totals = {}
+        for kind, name, seconds in self.entries:
+            totals[(kind, name)] = totals.get((kind, name), 0) + seconds
+        return totals
+
+    def slowest(self):
+        """Returns the (kind, name, seconds) of the atprogram call or serial
+        command that took longest in total, or None."""
+        steps = [(kind, name, seconds)
+                 for (kind, name), seconds in self.totals().items()
+                 if kind != PAGE]
+        return max(steps, key=lambda step: step[2], default=None)
+
+    def write_to(self, report):
+        """Writes the total time of each page, atprogram call and serial
+        command to the report."""
+        for (kind, name), seconds in self.totals().items():
+            report.write_timing(f"{kind} {name}", seconds)
+        report.write_timing("Board", time.monotonic() - self.start)
+
+
+class StationMetrics(QObject):
+    """Timings of the boards tested on the station, across fixtures.
+
+    Instance variables:
+    finished   --  Monotonic times boards finished, within RATE_WINDOW.
+    durations  --  Recent total seconds per board for each (kind, name).
+    """
+    updated = pyqtSignal()
+
+    def __init__(self):
+        super().__init__()
+        self.finished = deque()
+        self.durations = {}
+
+    def add_board(self, timer):
+        now = time.monotonic()
+        self.finished.append(now)
+        for key, seconds in timer.totals().items():
+            self.durations.setdefault(
+                key, deque(maxlen=HISTORY_SIZE)).append(seconds)
+        self.updated.emit()
+
+    def boards_per_hour(self):
+        now = time.monotonic()
+        while self.finished and now - self.finished[0] > RATE_WINDOW:
+            self.finished.popleft()
+        return len(self.finished)
+
+    def stats(self):
+        """Returns (kind, name, count, median, p95) per step, slowest p95
+        first."""
+        rows = [(kind, name, len(values), statistics.median(values),
+                 percentile(values, 0.95))
+                for (kind, name), values in self.durations.items()]
+        return sorted(rows, key=lambda row: row[4], reverse=True)
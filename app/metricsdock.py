@@ -0,0 +1,65 @@
+from PyQt5.QtWidgets import (
+    QDockWidget, QWidget, QLabel, QVBoxLayout, QTableWidget,
+    QTableWidgetItem, QHeaderView)
+from PyQt5.QtCore import Qt
+
+# Rows shown in the dashboard's step table.
+TABLE_ROWS = 20
+
+
+class MetricsDock(QDockWidget):
+    """Dashboard showing the station's throughput, the median and p95 time
+    of each step and the slowest step of the selected fixture's board."""
+
+    def __init__(self, main_window, station):
+        super().__init__("Throughput", main_window)
+        self.main_window = main_window
+        self.station = station
+        self.setObjectName("throughput_dock")
+
+        self.rate_lbl = QLabel()
+        self.slowest_lbl = QLabel()
+        self.slowest_lbl.setWordWrap(True)
+        self.table = QTableWidget(0, 4)
+        self.table.setHorizontalHeaderLabels(["Step", "Boards", "Median (s)",
+                                              "P95 (s)"])
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(
+            0, QHeaderView.Stretch)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.rate_lbl)
+        layout.addWidget(self.slowest_lbl)
+        layout.addWidget(self.table)
+        widget = QWidget()
+        widget.setLayout(layout)
+        self.setWidget(widget)
+
+        self.station.updated.connect(self.refresh)
+        self.refresh()
+
+    def refresh(self):
+        self.rate_lbl.setText(
+            f"Boards in the last hour: {self.station.boards_per_hour()}")
+
+        fixture = self.main_window.current_fixture()
+        slowest = fixture.timer.slowest() if fixture else None
+        if slowest:
+            kind, name, seconds = slowest
+            self.slowest_lbl.setText(f"Slowest step on Fixture "
+                                     f"{fixture.number}: {kind} {name} "
+                                     f"({seconds:.1f} s)")
+        else:
+            self.slowest_lbl.setText("Slowest step: -")
+
+        rows = self.station.stats()[:TABLE_ROWS]
+        self.table.setRowCount(len(rows))
+        for i, (kind, name, count, median, p95) in enumerate(rows):
+            values = [f"{kind} {name}", str(count), f"{median:.2f}",
+                      f"{p95:.2f}"]
+            for j, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if j:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(i, j, item)
@@ -9,6 +9,84 @@ class ValueNotSet(Exception):
     pass
 
 
+class Range:
+    """Passes values between two limits."""
+
+    def __init__(self, minimum, maximum, max_inclusive=True):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.max_inclusive = max_inclusive
+        self.depends = ()
+
+    def compile(self, limits):
+        low = limits[self.minimum]
+        high = limits[self.maximum]
+        if self.max_inclusive:
+            return lambda value, measurements: low <= value <= high
+        return lambda value, measurements: low <= value < high
+
+
+class Threshold:
+    """Passes values at or above a minimum, or below a maximum."""
+
+    def __init__(self, minimum=None, maximum=None):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.depends = ()
+
+    def compile(self, limits):
+        if self.minimum is not None:
+            low = limits[self.minimum]
+            return lambda value, measurements: value >= low
+        high = limits[self.maximum]
+        return lambda value, measurements: value < high
+
+
+class Tolerance:
+    """Passes values within a fraction of another measurement."""
+
+    def __init__(self, reference, tolerance, inclusive=True):
+        self.reference = reference
+        self.tolerance = tolerance
+        self.inclusive = inclusive
+        self.depends = (reference,)
+
+    def compile(self, limits):
+        reference = self.reference
+        low = 1 - limits[self.tolerance]
+        high = 1 + limits[self.tolerance]
+        if self.inclusive:
+            return lambda value, measurements: (
+                low * measurements[reference] <= value <=
+                high * measurements[reference])
+        return lambda value, measurements: (
+            low * measurements[reference] < value <
+            high * measurements[reference])
+
+
+# Test key : check, in terms of the names in Model.limits.
+LIMIT_TABLE = {
+    "input_v": Range("v_input_min", "v_input_max"),
+    "input_i": Range("i_input_min", "i_input_max", max_inclusive=False),
+    "supply_2v": Range("2v_min", "2v_max"),
+    "coin_cell_v": Threshold(minimum="coin_v_min"),
+    "supply_5v": Range("5v_min", "5v_max"),
+    "uart_5v": Tolerance("supply_5v", "5v_uart_tolerance", inclusive=False),
+    "off_5v": Threshold(maximum="5v_uart_off"),
+    "bat_v": Tolerance("input_v", "bat_v_tolerance"),
+    "deep_sleep_i": Range("deep_sleep_min", "deep_sleep_max"),
+    "solar_v": Range("solar_v_min", "solar_v_max"),
+    "solar_i_min": Threshold(minimum="solar_i_min"),
+}
+
+
+def compile_limits(limits, table=LIMIT_TABLE):
+    """Returns test key : (check function, dependencies) with the limit
+    values bound in, so checking a value is a single call."""
+    return {key: (spec.compile(limits), spec.depends)
+            for key, spec in table.items()}
+
+
 class Model:
     """The model class for storing test limits and other relevant data and 
     checking recorded values against the limits.
@@ -16,11 +94,17 @@ class Model:
     Instance variables:
     limits        --  Test variable ranges and limits.
     tac           --  Tac Ids, lead length and other values.
+    checks        --  Test key : (check function, dependencies), compiled
+                      from the limits and LIMIT_TABLE.
+    measurements  --  Values checked so far, by test key.
     internal_5v   --  Internally measured 5 V supply voltage.
     input_v       --  Externally measured supply voltage.
 
     Instance methods:
+    set_limits         --  Replace the limits and recompile the checks.
     compare_to_limit   --  Compare value against limits and return result.
+    check_all          --  Check a dictionary of measurements at once.
+    check_batch        --  Check a list of measurement dictionaries.
     """
 
     def __init__(self):
@@ -53,67 +137,59 @@ class Model:
             "2": 0.250,
             "3": 0.500
         }
-        self.internal_5v = None
-        self.input_v = None
-
-    def compare_to_limit(self, limit, value):
-        """Compare input value against limit and return the result as a bool."""
+        self.checks = compile_limits(self.limits)
+        # Values checked so far, by test key.
+        self.measurements = {}
 
-        if limit == "input_v":
-            self.input_v = value
-            return (value >= self.limits["v_input_min"] and
-                    value <= self.limits["v_input_max"])
+    @property
+    def internal_5v(self):
+        return self.measurements.get("supply_5v")
 
-        elif limit == "input_i":
-            return (value >= self.limits["i_input_min"] and
-                    value < self.limits["i_input_max"])
+    @internal_5v.setter
+    def internal_5v(self, value):
+        self.measurements["supply_5v"] = value
 
-        elif limit == "supply_2v":
-            return (value >= self.limits["2v_min"] and
-                    value <= self.limits["2v_max"])
+    @property
+    def input_v(self):
+        return self.measurements.get("input_v")
 
-        elif limit == "coin_cell_v":
-            return value >= self.limits["coin_v_min"]
-
-        elif limit == "supply_5v":
-            self.internal_5v = value
-            if (value >= self.limits["5v_min"] and
-                    value <= self.limits["5v_max"]):
-                return True
-            else:
-                return False
-
-        elif limit == "uart_5v":
-            if (self.internal_5v):
-                tolerance = self.limits["5v_uart_tolerance"]
-                max_v = (1 + tolerance) * self.internal_5v
-                min_v = (1 - tolerance) * self.internal_5v
-                return (value < max_v and value > min_v)
-            else:
-                raise ValueNotSet
+    @input_v.setter
+    def input_v(self, value):
+        self.measurements["input_v"] = value
 
-        elif limit == "off_5v":
-            return (value < self.limits["5v_uart_off"])
+    def set_limits(self, limits):
+        """Replaces the limits and recompiles the checks."""
+        self.limits = limits
+        self.checks = compile_limits(limits)
 
-        elif limit == "bat_v":
-            if (self.input_v):
-                tolerance = self.limits["bat_v_tolerance"]
-                max_v = (1 + tolerance) * self.input_v
-                min_v = (1 - tolerance) * self.input_v
-                return (value <= max_v and value >= min_v)
+    def compare_to_limit(self, limit, value):
+        """Compare input value against limit and return the result as a bool.
+        The value is kept for checks that depend on it."""
+        if limit not in self.checks:
+            raise InvalidLimit
+        check, depends = self.checks[limit]
+        self.measurements[limit] = value
+        if not all(self.measurements.get(key) for key in depends):
+            raise ValueNotSet
+        return check(value, self.measurements)
+
+    def check_all(self, measurements):
+        """Checks every measurement that has a limit in one call. Returns
+        test key : bool, or None where a measurement it depends on is
+        missing."""
+        results = {}
+        for key, value in measurements.items():
+            entry = self.checks.get(key)
+            if entry is None or value is None:
+                continue
+            check, depends = entry
+            if all(measurements.get(d) for d in depends):
+                results[key] = check(value, measurements)
             else:
-                raise ValueNotSet
-
-        elif limit == "deep_sleep_i":
-            return (value >= self.limits["deep_sleep_min"] and
-                    value <= self.limits["deep_sleep_max"])
+                results[key] = None
+        return results
 
-        elif limit == "solar_v":
-            return (value >= self.limits["solar_v_min"] and
-                    value <= self.limits["solar_v_max"])
-
-        elif limit == "solar_i_min":
-            return (value >= self.limits["solar_i_min"])
-
-        else:
-            raise InvalidLimit
+    def check_batch(self, records):
+        """Checks a list of measurement dictionaries, e.g. the records of
+        old reports, and returns a list of check_all results."""
+        return [self.check_all(record) for record in records]
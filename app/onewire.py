@@ -1,5 +1,7 @@
 import utilities
-import re
+import steps
+import hexfile
+from progress import ProgressReporter
 from pathlib import Path
 from PyQt5.QtWidgets import (
     QWizardPage, QWizard, QLabel, QVBoxLayout, QCheckBox, QGridLayout,
@@ -13,7 +15,8 @@ class OneWireMaster(QWizardPage):
     """Third QWizard page. Handles OneWire Master programming."""
     command_signal = pyqtSignal(str)
     reprogram_signal = pyqtSignal()
-    file_write_signal = pyqtSignal(str)
+    reprogram_pages_signal = pyqtSignal()
+    records_write_signal = pyqtSignal(object)
     one_wire_test_signal = pyqtSignal()
     complete_signal = pyqtSignal()
 
@@ -26,6 +29,10 @@ class OneWireMaster(QWizardPage):
         self.report = report
         self.one_wire_master_file = None
         self.hex_files_dir = None
+        self.board_version = None
+        self.delta_records = None
+        self.records = None
+        self.upload_summary = ""
 
         self.system_font = QApplication.font().family()
         self.label_font = QFont(self.system_font, 12)
@@ -33,6 +40,8 @@ class OneWireMaster(QWizardPage):
         self.one_wire_lbl = QLabel("Program One-Wire-Master")
         self.one_wire_lbl.setFont(self.label_font)
         self.one_wire_pbar = QProgressBar()
+        self.progress = ProgressReporter(self.one_wire_pbar,
+                                         self.one_wire_lbl)
 
         self.one_wire_layout = QVBoxLayout()
         self.one_wire_layout.addWidget(self.one_wire_lbl)
@@ -65,16 +74,26 @@ class OneWireMaster(QWizardPage):
         self.setTitle("Program 1-Wire Master")
 
     def initializePage(self):
-        self.pbar_value = 0
         self.is_complete = False
-        self.sm.line_written.disconnect()
+        # The page is shown again if the board is reprogrammed; drop the
+        # progress and upload connections made the first time.
+        try:
+            self.sm.line_written.disconnect(self.progress.update)
+        except TypeError:
+            pass
+        try:
+            self.sm.hex_upload_finished.disconnect(self.upload_finished)
+        except TypeError:
+            pass
         self.command_signal.connect(self.sm.sc)
-        self.file_write_signal.connect(self.sm.write_hex_file)
+        self.records_write_signal.connect(self.sm.write_hex_records)
         self.reprogram_signal.connect(self.sm.reprogram_one_wire)
+        self.reprogram_pages_signal.connect(self.sm.reprogram_one_wire_pages)
         self.one_wire_test_signal.connect(self.sm.one_wire_test)
         self.complete_signal.connect(self.completeChanged)
         self.sm.data_ready.connect(self.compare_versions)
-        self.sm.line_written.connect(self.update_pbar)
+        self.sm.line_written.connect(self.progress.update)
+        self.sm.hex_upload_finished.connect(self.upload_finished)
         self.d505.button(QWizard.NextButton).setEnabled(False)
         self.check_version()
 
@@ -94,11 +113,9 @@ class OneWireMaster(QWizardPage):
 
     def compare_versions(self, data):
         self.sm.data_ready.disconnect()
-        pattern = r"([0-9]+\.[0-9a-zA-Z]+)"
-        m = re.search(pattern, data)
-        if m:
-            board_version = m.group()
-        else:
+        board_version = steps.parse_version(data)
+        self.board_version = board_version
+        if not board_version:
             # If no version data present, start programming hex file.
             # This catches edge cases where there's version data present but the
             # serial data is corrupted so doesn't match the regex pattern. These
@@ -116,8 +133,7 @@ class OneWireMaster(QWizardPage):
                                       " skipping..")
             self.tu.one_wire_prog_status.setText("1-Wire Programming: PASS")
             self.tu.one_wire_prog_status.setStyleSheet(self.d505.status_style_pass)
-            self.one_wire_pbar.setRange(0, 1)
-            self.one_wire_pbar.setValue(1)
+            self.progress.finish()
             self.report.write_data("onewire_ver", self.one_wire_master_ver,
                                    "PASS")
             self.is_complete = True
@@ -126,55 +142,91 @@ class OneWireMaster(QWizardPage):
     def isComplete(self):
         return self.is_complete
 
-    def start_programming(self):
-        self.one_wire_pbar.setRange(0, 0)
-        self.reprogram_signal.emit()
-        self.one_wire_lbl.setText("Erasing flash. . .")
-
-    def send_hex_file(self, data):
-        self.sm.data_ready.disconnect()
+    def changed_records(self):
+        """Returns the records in pages that differ from the version on the
+        board, or None if only a full upload is possible."""
+        if (self.tu.settings.value("onewire_delta") != "true" or
+                not self.board_version):
+            return None
+        old = hexfile.read_page_index(self.hex_files_dir).get(
+            self.board_version)
+        if not old or old.get("page_size") != hexfile.PAGE_SIZE:
+            return None
+        try:
+            return hexfile.delta_records(self.one_wire_master_file,
+                                         old["pages"])
+        except (ValueError, OSError):
+            return None
 
-        # Get file length
-        count = 0
+    def start_programming(self):
+        self.delta_records = self.changed_records()
+        # The file is read before the board is put in the bootloader, which
+        # also switches it to the bulk baud rate, so a bad file doesn't
+        # leave the upload half started. It is usually already parsed while
+        # the Xmega was being flashed.
         try:
-            with open(self.one_wire_master_file, "r") as f:
-                for line in f:
-                    count += 1
-            self.one_wire_pbar.setRange(0, count)
+            if self.delta_records is not None:
+                self.records = self.delta_records
+            else:
+                self.records = hexfile.load(self.one_wire_master_file)
         except IOError:
+            self.sm.data_ready.disconnect()
             QMessageBox.warning(self, "Warning",
                                 "Can't open one-wire-master file!")
             return
+        except ValueError as e:
+            self.sm.data_ready.disconnect()
+            QMessageBox.warning(self, "Warning",
+                                f"Bad one-wire-master file: {e}")
+            return
+
+        if self.delta_records is not None:
+            self.reprogram_pages_signal.emit()
+            self.progress.busy("Preparing changed pages. . .")
+        else:
+            self.reprogram_signal.emit()
+            self.progress.busy("Erasing flash. . .")
+
+    def send_hex_file(self, data):
+        self.sm.data_ready.disconnect()
+        records = self.records
 
         # Check for response from board before proceeding
-        pattern = r"download hex records now..."
-        if (re.search(pattern, data)):
-            self.one_wire_lbl.setText("Programming 1-wire master. . .")
+        if steps.hex_upload_ready(data):
+            self.progress.start(len(records),
+                                sum(len(record) for record in records),
+                                "Programming 1-wire master")
             self.sm.data_ready.connect(self.data_parser)
-            self.file_write_signal.emit(str(self.one_wire_master_file))
+            self.records_write_signal.emit(records)
         else:
             QMessageBox.warning(self, "Xmega1", "Bad command response.")
 
-    def update_pbar(self):
-        self.pbar_value += 1
-        self.one_wire_pbar.setValue(self.pbar_value)
+    def upload_finished(self, num_bytes, duration, acknowledged):
+        try:
+            self.sm.hex_upload_finished.disconnect(self.upload_finished)
+        except TypeError:
+            pass
+        rate = num_bytes / duration / 1000 if duration else 0
+        pacing = "acknowledged" if acknowledged else "timed"
+        self.upload_summary = f"{rate:.1f} kB/s, {pacing}"
+        self.progress.finish(f"Uploaded {num_bytes} bytes "
+                             f"({self.upload_summary}). . .")
 
     def data_parser(self, data):
         self.sm.data_ready.disconnect()
         self.sm.data_ready.connect(self.record_version)
-        pattern = r"lock bits set"
-        if (re.search(pattern, data)):
-            self.one_wire_lbl.setText("Programming complete.")
+        if steps.hex_upload_done(data):
+            self.one_wire_lbl.setText(
+                f"Programming complete ({self.upload_summary}).")
             self.one_wire_test_signal.emit()
         else:
             QMessageBox.warning(self, "Xmega2", "Bad command response.")
 
     def record_version(self, data):
         self.sm.data_ready.disconnect()
-        pattern = r"([0-9]+\.[0-9a-zA-Z]+)"
-        onewire_version = re.search(pattern, data)
-        if (onewire_version):
-            onewire_version_val = onewire_version.group()
+        onewire_version_val = steps.parse_version(data)
+        if (onewire_version_val):
+            self.save_pages(onewire_version_val)
             self.report.write_data("onewire_ver", onewire_version_val, "PASS")
             self.one_wire_lbl.setText("Version recorded.")
             self.tu.one_wire_prog_status.setText("1-Wire Programming: PASS")
@@ -188,6 +240,17 @@ class OneWireMaster(QWizardPage):
         self.is_complete = True
         self.complete_signal.emit()
 
+    def save_pages(self, version):
+        """Adds the programmed version to the page index so later upgrades
+        from it can send only the changed pages."""
+        if version != self.one_wire_master_ver:
+            return
+        try:
+            hexfile.save_pages(self.hex_files_dir, version,
+                               self.one_wire_master_file)
+        except (ValueError, OSError):
+            pass
+
     def g_led_pass(self):
         self.tu.g_led_test_status.setText("Green LED: PASS")
         self.tu.g_led_test_status.setStyleSheet(self.d505.status_style_pass)
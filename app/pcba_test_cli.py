@@ -0,0 +1,323 @@
+"""Command-line runner for the automated D505 test steps.
+
+Runs the Xmega programming, watchdog, 1-wire programming and Xmega
+interface steps against a serial port without building the GUI. Paths,
+TAC IDs and the IMEI default to the GUI's settings.
+
+Example:
+    python pcba_test_cli.py COM4 --sn D5050076 --tester 12 --input-v 6.0
+"""
+import argparse
+import sys
+from pathlib import Path
+from PyQt5.QtCore import QSettings
+import avr
+import hexfile
+import limitsets
+import metrics
+import model
+import recorder
+import report
+import sequence
+import serialmanager
+import steps
+import utilities
+
+STEPS = ["program", "watchdog", "onewire", "interfaces"]
+
+
+class StepFailed(Exception):
+    pass
+
+
+class Runner:
+    """Runs test steps by calling the SerialManager and FlashD505 slots
+    directly. Everything happens in the calling thread, so their signals are
+    delivered as soon as they are emitted."""
+
+    def __init__(self, args):
+        self.args = args
+        self.sm = serialmanager.SerialManager()
+        self.model = model.Model()
+        self.report = report.Report()
+        self.passed = True
+        self.port_lost = False
+        self.sequence = sequence.SequenceRunner(self.sm, self.model)
+        self.sequence.step_finished.connect(self.step_finished)
+        self.sequence.port_error.connect(self.port_error)
+        self.timer = metrics.BoardTimer()
+        self.sm.command_timed.connect(self.timer.serial_command)
+
+    def call(self, slot, signals, *args):
+        """Calls a slot and returns the name and arguments of the first of
+        the given signals it emitted."""
+        emitted = []
+        handlers = {}
+        for name in signals:
+            handlers[name] = (lambda name: lambda *a: emitted.append(
+                (name, a)))(name)
+            getattr(slot.__self__, name).connect(handlers[name])
+        try:
+            slot(*args)
+        finally:
+            for name, handler in handlers.items():
+                getattr(slot.__self__, name).disconnect(handler)
+        if not emitted:
+            raise StepFailed(f"No response from {slot.__name__}")
+        return emitted[0]
+
+    def command(self, slot, *args):
+        """Runs a SerialManager slot that answers with data_ready."""
+        name, values = self.call(slot, ["data_ready", "no_port_sel"], *args)
+        if name == "no_port_sel":
+            raise StepFailed("Serial port unavailable")
+        return values[0]
+
+    def record(self, key, value, passed):
+        """Writes a result to the report and prints it."""
+        status = "PASS" if passed else "FAIL"
+        self.report.write_data(key, value, status)
+        self.passed = self.passed and passed
+        print(f"  {key:<20} {str(value):<28} {status}")
+
+    def step_finished(self, result):
+        result.write_to(self.report)
+        self.passed = self.passed and result.passed
+        # Steps without a parser only care that the board answered.
+        value = result.value if result.step.parser else ""
+        if value is None:
+            value = ""
+        print(f"  {result.step.name:<20} {str(value):<28} "
+              f"{'PASS' if result.passed else 'FAIL'}")
+
+    def port_error(self):
+        self.port_lost = True
+
+    def run_steps(self, step_list):
+        """Runs a list of TestSteps and checks the port stayed open."""
+        passed = self.passed
+        self.passed = True
+        self.sequence.run(step_list)
+        if self.port_lost:
+            raise StepFailed("Serial port unavailable")
+        step_passed = self.passed
+        self.passed = passed and step_passed
+        return step_passed
+
+    def program(self):
+        """Flashes the Xmega if the board's app is older than the newest
+        main-app hex file."""
+        flash = avr.FlashD505()
+        flash.set_files(self.args.atprogram, Path(self.args.hex_dir))
+        flash.command_timed.connect(self.timer.atprogram_command)
+        flash.chained = self.args.chained
+        name, values = self.call(flash.check_files,
+                                 ["version_signal", "file_not_found_signal"])
+        if name == "file_not_found_signal":
+            raise StepFailed(f"File not found: {values[0]}")
+        main_app_ver = values[0]
+
+        name, values = self.call(self.sm.version_check,
+                                 ["version_signal", "no_version",
+                                  "serial_error_signal",
+                                  "port_unavailable_signal",
+                                  "generic_error_signal", "no_port_sel"])
+        if (name == "version_signal" and not self.args.force and
+                not utilities.newer_file_version(main_app_ver, values[0])):
+            print(f"  Board has {values[0]}, file has {main_app_ver}; "
+                  "skipping.")
+            return
+
+        flash.command_succeeded.connect(
+            lambda cmd_text: print(f"  {cmd_text:<20} done"))
+        name, values = self.call(flash.flash,
+                                 ["flash_finished", "command_failed",
+                                  "process_error_signal",
+                                  "file_not_found_signal",
+                                  "generic_error_signal"])
+        if name != "flash_finished":
+            raise StepFailed(f"Programming failed: {name} {values}")
+
+    def watchdog(self):
+        """Resets the watchdog, records the Xmega versions and turns the
+        D505 app off."""
+        if not self.run_steps(steps.watchdog_steps()):
+            raise StepFailed("Error in serial data")
+
+    def onewire(self):
+        """Programs the 1-wire master if the hex file is newer than the
+        board's version."""
+        (one_wire_file, one_wire_ver) = utilities.get_latest_version(
+            Path(self.args.hex_dir).glob("1-wire-master*.hex"))
+        if not one_wire_file:
+            raise StepFailed("Missing one-wire-master file")
+
+        board_ver = steps.parse_version(self.command(self.sm.one_wire_test))
+        if (board_ver and not self.args.force and
+                not utilities.newer_file_version(one_wire_ver, board_ver)):
+            self.record("onewire_ver", one_wire_ver, True)
+            return
+
+        old = None
+        if self.args.onewire_delta and board_ver:
+            old = hexfile.read_page_index(self.args.hex_dir).get(board_ver)
+        records = None
+        if old and old.get("page_size") == hexfile.PAGE_SIZE:
+            records = hexfile.delta_records(one_wire_file, old["pages"])
+        if records is not None:
+            print(f"  Sending {len(records)} changed records.")
+            ready = self.command(self.sm.reprogram_one_wire_pages)
+        else:
+            ready = self.command(self.sm.reprogram_one_wire)
+        if not steps.hex_upload_ready(ready):
+            self.record("onewire_ver", "N/A", False)
+            raise StepFailed("Bad command response")
+
+        if records is not None:
+            done = self.command(self.sm.write_hex_records, records)
+        else:
+            done = self.command(self.sm.write_hex_file, str(one_wire_file))
+        if not steps.hex_upload_done(done):
+            self.record("onewire_ver", "N/A", False)
+            raise StepFailed("Bad command response")
+
+        version = steps.parse_version(self.command(self.sm.one_wire_test))
+        self.record("onewire_ver", version or "N/A", bool(version))
+        if version == one_wire_ver:
+            hexfile.save_pages(self.args.hex_dir, version, one_wire_file)
+
+    def interfaces(self):
+        """Runs the Xmega interface checks."""
+        self.model.compare_to_limit("input_v", self.args.input_v)
+        self.run_steps(steps.interface_steps(self.args.sn, self.args.imei,
+                                             self.args.tac_ids))
+
+
+def parse_args(settings):
+    parser = argparse.ArgumentParser(
+        description="Run the automated D505 test steps without the GUI.")
+    parser.add_argument("port", help="serial port of the fixture, e.g. COM4")
+    parser.add_argument("--steps", nargs="+", choices=STEPS, default=STEPS,
+                        help="steps to run, in order (default: all)")
+    parser.add_argument("--sn", help="PCBA serial number, e.g. D5050076")
+    parser.add_argument("--tester", default="CLI", help="tester ID")
+    parser.add_argument("--pn", default="45321-03", help="PCBA part number")
+    parser.add_argument("--input-v", type=float,
+                        help="measured input voltage, needed for bat_v")
+    parser.add_argument("--force", action="store_true",
+                        help="program even if the board is up to date")
+    parser.add_argument("--no-report", action="store_true",
+                        help="don't write a CSV report")
+    parser.add_argument("--hex-dir",
+                        default=settings.value("hex_files_path"),
+                        help="folder of hex files (default: the GUI's)")
+    parser.add_argument("--atprogram",
+                        default=settings.value("atprogram_file_path"),
+                        help="atprogram executable (default: the GUI's)")
+    parser.add_argument("--chained", action="store_true",
+                        default=settings.value("atprogram_chained") == "true",
+                        help="program in a single atprogram call")
+    parser.add_argument("--onewire-delta", action="store_true",
+                        default=settings.value("onewire_delta") == "true",
+                        help="upload only the changed 1-wire master pages")
+    parser.add_argument("--baud", type=int,
+                        default=settings.value("baud_rate",
+                                               serialmanager.BASE_BAUD))
+    parser.add_argument("--bulk-baud", type=int,
+                        default=settings.value("bulk_baud_rate",
+                                               serialmanager.BULK_BAUD),
+                        help="baud rate for bulk transfers; the same as "
+                             "--baud to stay at one rate")
+    parser.add_argument("--traffic",
+                        help="save the serial traffic to this JSON lines "
+                             "file and print where the time went")
+    parser.add_argument("--report-dir",
+                        default=settings.value("report_file_path"),
+                        help="folder the report is written to (default: "
+                             "the GUI's)")
+    parser.add_argument("--limits",
+                        default=settings.value("limits_file_path"),
+                        help="limit set file (default: the GUI's, or the "
+                             "built-in limits)")
+    parser.add_argument("--imei")
+    parser.add_argument("--tac-ids", nargs=4)
+    args = parser.parse_args()
+
+    try:
+        args.limit_set = (limitsets.load(args.limits) if args.limits
+                          else limitsets.built_in())
+    except (OSError, limitsets.InvalidLimitSet) as e:
+        parser.error(f"can't load the limit set: {e}")
+    station = dict((key, settings.value(key))
+                   for key in limitsets.STATION_SETTINGS)
+    station.update(args.limit_set.settings)
+    if args.imei is None:
+        args.imei = station["iridium_imei"]
+    if args.tac_ids is None:
+        args.tac_ids = [station[f"port{i}_tac_id"] for i in range(1, 5)]
+
+    # Settings the GUI never saved have no value; check them before the
+    # board is touched rather than losing the results at the end.
+    if set(args.steps) & {"program", "onewire"} and not args.hex_dir:
+        parser.error("the program and onewire steps need --hex-dir")
+    if "program" in args.steps and not args.atprogram:
+        parser.error("the program step needs --atprogram")
+    if args.sn and not args.no_report and not args.report_dir:
+        parser.error("writing the report needs --report-dir, or use "
+                     "--no-report")
+    if "interfaces" in args.steps:
+        if not args.sn:
+            parser.error("the interfaces step needs --sn")
+        if args.input_v is None:
+            parser.error("the interfaces step needs --input-v")
+    return args
+
+
+def main():
+    settings = QSettings("BeadedStream", "PCBATestUtility")
+    args = parse_args(settings)
+
+    runner = Runner(args)
+    runner.model.set_limits(dict(args.limit_set.limits))
+    runner.report.write_data("limits_version", args.limit_set.version,
+                             "PASS")
+    runner.sm.set_baud_rates(args.baud, args.bulk_baud)
+    runner.sm.open_port(args.port)
+    if not runner.sm.ser.is_open:
+        print(f"Port {args.port} unavailable!")
+        return 2
+
+    if args.sn:
+        runner.sm.recorder.board = args.sn.upper()
+        runner.report.write_data("tester_id", args.tester.upper(), "PASS")
+        runner.report.write_data("pcba_sn", args.sn.upper(), "PASS")
+        runner.report.write_data("pcba_pn", args.pn, "PASS")
+
+    for step in args.steps:
+        print(f"{step}:")
+        runner.timer.enter_page(step)
+        try:
+            getattr(runner, step)()
+        except StepFailed as e:
+            print(f"  {e}")
+            runner.passed = False
+            break
+    runner.timer.leave_page()
+    runner.sm.close_port()
+
+    if args.traffic:
+        runner.sm.recorder.export(args.traffic)
+        print(recorder.format_summary(
+            recorder.summarise(runner.sm.recorder.events)))
+
+    if args.sn and not args.no_report:
+        runner.timer.write_to(runner.report)
+        runner.report.set_file_location(args.report_dir)
+        runner.report.generate_report()
+
+    print("PASS" if runner.passed else "FAIL")
+    return 0 if runner.passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
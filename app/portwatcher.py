@@ -0,0 +1,56 @@
+import serial.tools.list_ports
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal, pyqtSlot
+
+# How often the port list is refreshed when no hot-plug event arrives.
+SCAN_INTERVAL_MS = 2000
+# Windows message sent when a device is added or removed.
+WM_DEVICECHANGE = 0x0219
+
+
+def port_id(port):
+    """Identifies a port by the USB device behind it, so a fixture keeps its
+    port if the OS gives it another name. Ports that aren't USB devices are
+    identified by name."""
+    if port.vid is None:
+        return port.device
+    return f"{port.vid:04X}:{port.pid:04X}:{port.serial_number or ''}"
+
+
+class PortWatcher(QObject):
+    """Keeps a list of the serial ports on the station. Runs on its own
+    thread so enumerating ports never blocks the GUI; the list is refreshed
+    on a timer and whenever refresh is called, e.g. on a hot-plug event.
+
+    Instance variables:
+    ports  --  The ports found by the last scan, as ListPortInfo objects.
+    """
+    ports_changed = pyqtSignal(list)
+
+    def __init__(self):
+        super().__init__()
+        self.ports = []
+        self.timer = None
+
+    @pyqtSlot()
+    def start(self):
+        """Scans the ports and starts the refresh timer. Called once the
+        watcher has been moved to its thread."""
+        self.timer = QTimer(self)
+        self.timer.setInterval(SCAN_INTERVAL_MS)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start()
+        self.refresh()
+
+    @pyqtSlot()
+    def refresh(self):
+        ports = sorted(serial.tools.list_ports.comports(),
+                       key=lambda port: port.device)
+        if ([(p.device, port_id(p)) for p in ports] !=
+                [(p.device, port_id(p)) for p in self.ports]):
+            self.ports = ports
+            self.ports_changed.emit(ports)
+
+    @pyqtSlot()
+    def stop(self):
+        if self.timer:
+            self.timer.stop()
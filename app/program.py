@@ -1,6 +1,9 @@
 import utilities
 import avr
-import re
+import steps
+import sequence
+import hexfile
+from progress import ProgressReporter
 from pathlib import Path
 from PyQt5.QtWidgets import (
     QWizardPage, QWizard, QLabel, QVBoxLayout, QCheckBox, QGridLayout,
@@ -15,14 +18,13 @@ class Program(QWizardPage):
     """Second QWizard page. Handles Xmega programming, watchdog reset and
     recording some voltage values."""
 
-    command_signal = pyqtSignal(str)
-    sleep_signal = pyqtSignal(int)
     complete_signal = pyqtSignal()
     flash_signal = pyqtSignal()
     board_version_check = pyqtSignal()
     test_one_wire = pyqtSignal()
     reprogram_one_wire = pyqtSignal()
     file_write_signal = pyqtSignal(str)
+    run_signal = pyqtSignal(list)
 
     def __init__(self, d505, test_utility, serial_manager, model, report):
         super().__init__()
@@ -44,6 +46,7 @@ class Program(QWizardPage):
 
         self.flash_signal.connect(self.flash.flash)
         self.flash.command_succeeded.connect(self.flash_update)
+        self.flash.command_timed.connect(self.tu.timer.atprogram_command)
         self.flash.command_failed.connect(self.flash_failed)
         self.flash.flash_finished.connect(self.flash_finished)
         self.flash.process_error_signal.connect(self.process_error)
@@ -51,13 +54,21 @@ class Program(QWizardPage):
         self.flash.generic_error_signal.connect(self.generic_error)
         self.flash.version_signal.connect(self.set_versions)
 
-        self.sleep_signal.connect(self.sm.sleep)
         self.complete_signal.connect(self.completeChanged)
         self.board_version_check.connect(self.sm.version_check)
 
+        self.scheduler = self.d505.scheduler
+        self.scheduler.task_ready.connect(self.task_ready)
+
+        self.sequence = sequence.SequenceRunner(self.sm, self.model)
+        self.sequence.moveToThread(self.sm.thread())
+        self.run_signal.connect(self.sequence.run)
+        self.sequence.step_started.connect(self.step_started)
+        self.sequence.step_finished.connect(self.step_finished)
+        self.sequence.port_error.connect(self.port_warning)
+
         self.sm.version_signal.connect(self.compare_version)
         self.sm.no_version.connect(self.no_version)
-        self.sm.line_written.connect(self.update_pbar)
         self.sm.file_not_found_signal.connect(self.file_not_found)
         self.sm.generic_error_signal.connect(self.generic_error)
         self.sm.no_port_sel.connect(self.port_warning)
@@ -68,13 +79,14 @@ class Program(QWizardPage):
         self.system_font = QApplication.font().family()
         self.label_font = QFont(self.system_font, 12)
 
-        # Status messages are offset from the command
-        self.flash_statuses = {"chip_erase": "Programming boot-loader...",
-                               "prog_boot": "Programming app-section...",
-                               "prog_app": "Programming main-app...",
-                               "prog_main": "Writing fuses...",
-                               "write_fuses": "Writing lockbits...",
-                               "write_lockbits": "Complete!"}
+        # Shown while the operation is running
+        self.flash_statuses = {"chip_erase": "Erasing flash...",
+                               "prog_boot": "Programming boot-loader...",
+                               "prog_app": "Programming app-section...",
+                               "prog_main": "Programming main-app...",
+                               "prog_image": "Programming firmware...",
+                               "write_fuses": "Writing fuses...",
+                               "write_lockbits": "Writing lockbits..."}
 
         # Widgets
         self.batch_lbl = QLabel("Connect AVR programmer to board. Ensure serial"
@@ -91,6 +103,7 @@ class Program(QWizardPage):
         self.batch_pbar_lbl = QLabel("Flash Xmega.")
         self.batch_pbar_lbl.setFont(self.label_font)
         self.batch_pbar = QProgressBar()
+        self.flash_progress = ProgressReporter(self.batch_pbar)
 
         self.watchdog_pbar_lbl = QLabel("Resetting watchdog...")
         self.watchdog_pbar_lbl.setFont(self.label_font)
@@ -179,19 +192,11 @@ class Program(QWizardPage):
         self.setTitle("Xmega Programming and Verification")
 
     def initializePage(self):
-        self.pbar_value = 0
-
-        self.command_signal.connect(self.sm.sc)
-        self.sleep_signal.connect(self.sm.sleep)
-        self.complete_signal.connect(self.completeChanged)
-
         self.d505.button(QWizard.NextButton).setEnabled(False)
         self.d505.button(QWizard.NextButton).setAutoDefault(False)
         self.xmega_disconnect_chkbx.setEnabled(False)
 
-        self.batch_pbar.setValue(0)
-
-        self.flash_counter = 0
+        self.flash_progress.reset()
 
         # Flag for tracking page completion and allowing the next button
         # to be re-enabled.
@@ -201,6 +206,8 @@ class Program(QWizardPage):
         at_path = self.tu.settings.value("atprogram_file_path")
         hex_path = Path(self.tu.settings.value("hex_files_path"))
         self.flash.set_files(at_path, hex_path)
+        self.flash.chained = (
+            self.tu.settings.value("atprogram_chained") == "true")
 
     def generic_error(self, error):
         QMessageBox.warning(self, "Warning", error)
@@ -261,9 +268,35 @@ class Program(QWizardPage):
         self.one_wire_file_path = one_wire_file
         self.one_wire_file_version = one_wire_ver
 
+        # The 1-wire hex file is read while the Xmega is flashed. The 5 V
+        # supply is only on once the app has been told to turn it on, so the
+        # operator's measurement has to wait for the watchdog steps.
+        self.scheduler.reset()
+        self.scheduler.add("flash")
+        self.scheduler.add("onewire_preload",
+                           lambda: hexfile.load(one_wire_file))
+        self.scheduler.add("watchdog", depends=["flash"])
+        self.scheduler.add("supply_5v", depends=["watchdog"])
+        self.scheduler.add("uart_5v", depends=["supply_5v"])
+        self.scheduler.start()
+
         # Check board version.
         self.board_version_check.emit()
 
+    def task_ready(self, name):
+        """Starts the page's tasks once the ones they depend on are done.
+        Flashing is started by the board version check instead."""
+        if name == "watchdog":
+            self.scheduler.begin(name)
+            self.start_uart_tests()
+        elif name == "supply_5v":
+            self.scheduler.begin(name)
+            self.supply_5v_input.setEnabled(True)
+            self.supply_5v_input_btn.setEnabled(True)
+        elif name == "uart_5v":
+            self.scheduler.begin(name)
+            self.run_signal.emit(steps.uart_5v_steps())
+
     def compare_version(self, version: str):
         """Compare main app file version and board version using
         packaging.version LegacyVersion and flash the board with the file if
@@ -276,33 +309,33 @@ class Program(QWizardPage):
             self.tu.xmega_prog_status.setStyleSheet(
                 self.d505.status_style_pass)
             self.tu.xmega_prog_status.setText("XMega Programming: PASS")
-            self.batch_pbar.setRange(0, 1)
-            self.batch_pbar.setValue(1)
+            self.flash_progress.finish()
             self.xmega_disconnect_chkbx.setEnabled(True)
-            self.start_uart_tests()
+            self.scheduler.finish("flash")
 
     def no_version(self):
         self.start_flash()
 
-    def update_pbar(self):
-        self.pbar_value += 1
-        self.one_wire_pbar.setValue(self.pbar_value)
-
     def start_flash(self):
         """Starts flash test by emitting command."""
         #self.flash_signal.disconnect()
 
         self.batch_pbar_lbl.setText("Erasing flash...")
 
-        self.batch_pbar.setRange(0, 6)
+        self.scheduler.begin("flash")
+        self.flash_progress.start(len(self.flash.operations))
         self.flash_signal.emit()
 
     def flash_update(self, cmd_text):
         """Updates the flash programming progressbar."""
 
-        self.batch_pbar_lbl.setText(self.flash_statuses[cmd_text])
-        self.flash_counter += 1
-        self.batch_pbar.setValue(self.flash_counter)
+        cmd_texts = list(self.flash.operations)
+        done = cmd_texts.index(cmd_text) + 1
+        if done < len(cmd_texts):
+            self.batch_pbar_lbl.setText(self.flash_statuses[cmd_texts[done]])
+        else:
+            self.batch_pbar_lbl.setText("Complete!")
+        self.flash_progress.update(done)
 
     def flash_failed(self, cmd_text):
         """Handles case where flash programming failed."""
@@ -319,62 +352,48 @@ class Program(QWizardPage):
         self.tu.xmega_prog_status.setStyleSheet(self.d505.status_style_pass)
         self.tu.xmega_prog_status.setText("XMega Programming: PASS")
         self.flash_thread.quit()
-        self.start_uart_tests()
+        self.scheduler.finish("flash")
 
     def start_uart_tests(self):
-        self.sm.data_ready.connect(self.watchdog_handler)
         self.watchdog_pbar.setRange(0, 0)
-
-        # Reset serial timeout for watchdog command
-        self.sm.ser.timeout = 60
-        self.command_signal.emit("watchdog")
-
-    def watchdog_handler(self, data):
-        self.sm.data_ready.disconnect()
-        self.sm.data_ready.connect(self.app_off)
+        self.run_signal.emit(steps.watchdog_steps() +
+                             steps.uart_5v_on_steps())
+
+    def step_started(self, step):
+        if step.name == "app_off":
+            self.app0_pbar.setRange(0, 0)
+            self.app0_pbar_lbl.setText("Sending 'app 0' command...")
+
+    def step_finished(self, result):
+        """Records the result of a step and updates the page."""
+        result.write_to(self.report)
+        handlers = {"watchdog": self.watchdog_handler,
+                    "app_off": self.app_off,
+                    "uart_5v_on": self.uart_5v1_handler,
+                    "uart_5v": self.uart_5v_handler,
+                    "off_5v": self.final_5v_handler}
+        if result.step.name in handlers:
+            handlers[result.step.name](result)
+
+    def watchdog_handler(self, result):
         self.watchdog_pbar.setRange(0, 1)
         self.watchdog_pbar.setValue(1)
-        pattern = r"([0-9]+\.[0-9a-zA-Z]+)"
-        try:
-            matches = re.findall(pattern, data)
-            bootloader_version = matches[0]
-            app_version = matches[1]
-        except IndexError:
+        if not result.passed:
             QMessageBox.warning(self, "Warning",
                                 "Error in serial data.")
-            self.report.write_data("xmega_bootloader", "", "FAIL")
-            self.report.write_data("xmega_app", "", "FAIL")
-            self.watchdog_pbar.setRange(0, 1)
             self.watchdog_pbar.setValue(0)
             utilities.unchecked(self.xmega_disconnect_lbl,
                                 self.xmega_disconnect_chkbx)
-            return
-        bootloader_version = bootloader_version.strip("\r\n")
-        app_version = app_version.strip("\r\n")
-        self.report.write_data("xmega_bootloader", bootloader_version, "PASS")
-        self.report.write_data("xmega_app", app_version, "PASS")
-
-        self.app0_pbar.setRange(0, 0)
-        self.app0_pbar_lbl.setText("Sending 'app 0' command...")
-        self.command_signal.emit("app 0")
-
-    def app_off(self, data):
-        self.sm.data_ready.disconnect()
-        self.sm.data_ready.connect(self.uart_5v1_handler)
 
+    def app_off(self, result):
         self.app0_pbar.setRange(0, 1)
         self.app0_pbar.setValue(1)
         self.app0_pbar_lbl.setText("Sent 'app 0' command.")
 
-        self.command_signal.emit("5V 1")
-
-    def uart_5v1_handler(self, data):
-        self.sm.data_ready.disconnect()
-        self.supply_5v_input.setEnabled(True)
-        self.supply_5v_input_btn.setEnabled(True)
+    def uart_5v1_handler(self, result):
+        self.scheduler.finish("watchdog")
 
     def user_value_handler(self):
-        self.sm.data_ready.connect(self.uart_5v_handler)
         self.supply_5v_input.setEnabled(False)
         self.supply_5v_pbar.setRange(0, 0)
         try:
@@ -398,64 +417,38 @@ class Program(QWizardPage):
 
         self.supply_5v_input_btn.setEnabled(False)
         self.xmega_disconnect_chkbx.setEnabled(True)
-        self.command_signal.emit("5V")
+        self.scheduler.finish("supply_5v", supply_5v_val)
 
-    def uart_5v_handler(self, data):
-        self.sm.data_ready.disconnect()
-        self.sm.data_ready.connect(self.uart_5v0_handler)
-        data = data.strip("\n").split("\n")
-        try:
-            uart_5v_val = float(data[1].strip("\n"))
-        except ValueError:
+    def uart_5v_handler(self, result):
+        if result.value is None:
             QMessageBox.warning(self, "Warning",
                                 "Error in serial data.")
             return
 
-        value_pass = self.model.compare_to_limit("uart_5v", uart_5v_val)
-
-        if (value_pass):
-            self.report.write_data("uart_5v", uart_5v_val, "PASS")
+        if (result.passed):
             self.tu.uart_5v_status.setStyleSheet(self.d505.status_style_pass)
         else:
-            self.report.write_data("uart_5v", uart_5v_val, "FAIL")
             self.tu.uart_5v_status.setStyleSheet(self.d505.status_style_fail)
 
-        self.tu.uart_5v_status.setText(f"5V UART {uart_5v_val} V")
-        self.command_signal.emit("5V 0")
-
-    def uart_5v0_handler(self, data):
-        self.sm.data_ready.disconnect()
-        self.sm.sleep_finished.connect(self.sleep_handler)
-        self.sleep_signal.emit(10)
+        self.tu.uart_5v_status.setText(f"5V UART {result.value} V")
 
-    def sleep_handler(self):
-        self.sm.sleep_finished.disconnect()
-        self.sm.data_ready.connect(self.final_5v_handler)
-        self.command_signal.emit("5V")
-
-    def final_5v_handler(self, data):
-        self.sm.data_ready.disconnect()
-        self.supply_5v_pbar.valueChanged.connect(self.completeChanged)
+    def final_5v_handler(self, result):
         self.supply_5v_pbar.setRange(0, 1)
         self.supply_5v_pbar.setValue(1)
-        data = data.strip("\n").split("\n")
-        try:
-            uart_off_val = float(data[1].strip("\n"))
-        except ValueError:
+        self.scheduler.finish("uart_5v")
+        self.report.write_data("critical_path", self.scheduler.summary(), "")
+        if result.value is None:
             QMessageBox.warning(self, "Warning",
                                 "Error in serial data.")
             return
-        value_pass = self.model.compare_to_limit("off_5v", uart_off_val)
 
-        if (value_pass):
-            self.report.write_data("off_5v", uart_off_val, "PASS")
+        if (result.passed):
             self.tu.uart_off_status.setStyleSheet(self.d505.status_style_pass)
             self.supply_5v_pbar_lbl.setText("Complete.")
         else:
-            self.report.write_data("off_5v", uart_off_val, "FAIL")
             self.tu.uart_off_status.setStyleSheet(self.d505.status_style_fail)
             self.supply_5v_pbar_lbl.setText("Failed.")
 
-        self.tu.uart_off_status.setText(f"5 V Off: {uart_off_val} V")
+        self.tu.uart_off_status.setText(f"5 V Off: {result.value} V")
         self.is_complete = True
         self.complete_signal.emit()
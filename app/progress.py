@@ -0,0 +1,118 @@
+import time
+from PyQt5.QtCore import QObject, QTimer, pyqtSlot
+
+# Progress bars are repainted at most this often.
+FRAME_INTERVAL_MS = 50
+
+
+class ProgressReporter(QObject):
+    """Drives a QProgressBar, and optionally a status label, from progress
+    updates. Updates only store the latest count, so any number of them
+    from a worker thread cost one repaint per frame. The label shows the
+    transfer rate and time left when the total bytes are known.
+
+    Instance variables:
+    pbar         --  The QProgressBar shown.
+    label        --  QLabel for the status text, or None.
+    total        --  Count at which the work is done.
+    total_bytes  --  Bytes the work moves in total, 0 if not a transfer.
+    done         --  Latest count reported.
+    """
+
+    def __init__(self, pbar, label=None):
+        super().__init__()
+        self.pbar = pbar
+        self.label = label
+        self.text = ""
+        self.total = 0
+        self.total_bytes = 0
+        self.done = 0
+        self.start_time = None
+        self.dirty = False
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(FRAME_INTERVAL_MS)
+        self.timer.timeout.connect(self.repaint)
+
+    def start(self, total, total_bytes=0, text=""):
+        """Starts tracking work with the given total count."""
+        self.total = total
+        self.total_bytes = total_bytes
+        self.text = text
+        self.done = 0
+        self.start_time = time.monotonic()
+        self.pbar.setRange(0, total)
+        self.pbar.setValue(0)
+        self.dirty = False
+        self.timer.start()
+
+    def busy(self, text=""):
+        """Shows work of unknown length."""
+        self.timer.stop()
+        self.pbar.setRange(0, 0)
+        if self.label and text:
+            self.label.setText(text)
+
+    @pyqtSlot(int)
+    def update(self, done):
+        self.done = done
+        self.dirty = True
+
+    def finish(self, text=None):
+        """Shows the work as done and stops repainting. The label shows
+        text if given, otherwise the final rate."""
+        self.timer.stop()
+        if not self.total:
+            self.pbar.setRange(0, 1)
+            self.pbar.setValue(1)
+        else:
+            self.done = self.total
+            self.repaint(force=True)
+        if self.label and text is not None:
+            self.label.setText(text)
+
+    def reset(self):
+        self.timer.stop()
+        self.pbar.setRange(0, 1)
+        self.pbar.setValue(0)
+
+    def elapsed(self):
+        if self.start_time is None:
+            return 0
+        return time.monotonic() - self.start_time
+
+    def rate(self):
+        """Bytes per second so far, or None if unknown."""
+        elapsed = self.elapsed()
+        if not (self.total and self.total_bytes and elapsed and self.done):
+            return None
+        return self.total_bytes * self.done / self.total / elapsed
+
+    def eta(self):
+        """Seconds left at the current pace, or None if unknown."""
+        elapsed = self.elapsed()
+        if not (self.total and self.done and elapsed):
+            return None
+        return elapsed * (self.total - self.done) / self.done
+
+    def summary(self):
+        """Rate and time left, e.g. '3.2 kB/s, 12 s left'."""
+        parts = []
+        rate = self.rate()
+        if rate is not None:
+            parts.append(f"{rate / 1000:.1f} kB/s")
+        eta = self.eta()
+        if eta is not None and self.done < self.total:
+            parts.append(f"{eta:.0f} s left")
+        return ", ".join(parts)
+
+    @pyqtSlot()
+    def repaint(self, force=False):
+        if not (self.dirty or force):
+            return
+        self.dirty = False
+        self.pbar.setValue(min(self.done, self.total))
+        if self.label and self.text:
+            summary = self.summary()
+            self.label.setText(f"{self.text} ({summary}). . ."
+                               if summary else f"{self.text}. . .")
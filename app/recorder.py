@@ -0,0 +1,188 @@
+"""Serial traffic recorder for profiling the test steps.
+
+Every write to and non-empty read from a fixture's port is kept in a ring
+buffer with a monotonic timestamp, its byte count, the command it belongs to
+and the board under test. The buffer can be exported as JSON lines and
+summarised per command, to show where the time goes.
+
+Example:
+    python recorder.py traffic.jsonl --board D5050076
+"""
+import argparse
+import json
+import sys
+import time
+from collections import deque
+import serial
+
+# Events kept per port; the oldest are dropped first.
+RING_SIZE = 100000
+# Command name used for the newline sent to resynchronise with the board.
+RESYNC = "(resync)"
+HEX_RECORDS = "(hex records)"
+
+
+class Event:
+    """A single write to or read from the port. start is set on the write
+    that sends a command."""
+    __slots__ = ("time", "direction", "size", "command", "board", "start")
+
+    def __init__(self, time, direction, size, command, board, start=False):
+        self.time = time
+        self.direction = direction
+        self.size = size
+        self.command = command
+        self.board = board
+        self.start = start
+
+    def to_dict(self):
+        return {"t": round(self.time, 6), "dir": self.direction,
+                "bytes": self.size, "command": self.command,
+                "board": self.board, "start": self.start}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["t"], d["dir"], d["bytes"], d["command"], d["board"],
+                   d.get("start", False))
+
+
+class TrafficRecorder:
+    """Ring buffer of the traffic on one port.
+
+    Instance variables:
+    events   --  The recorded Events, oldest first.
+    command  --  Command the traffic is currently attributed to.
+    board    --  Serial number of the board under test, "" if unknown.
+    enabled  --  Whether traffic is recorded.
+    """
+
+    def __init__(self, size=RING_SIZE):
+        self.events = deque(maxlen=size)
+        self.command = ""
+        self.board = ""
+        self.enabled = True
+
+    def written(self, data):
+        """Records a write. A line ending in a newline starts a command."""
+        if not self.enabled:
+            return
+        data = bytes(data)
+        start = False
+        if data.startswith(b":"):
+            start = self.command != HEX_RECORDS
+            self.command = HEX_RECORDS
+        elif data.endswith((b"\r", b"\n")):
+            line = data.decode(errors="replace").strip()
+            self.command = line or RESYNC
+            start = True
+        self.record("w", len(data), start)
+
+    def read(self, size):
+        if self.enabled and size:
+            self.record("r", size)
+
+    def record(self, direction, size, start=False):
+        self.events.append(Event(time.monotonic(), direction, size,
+                                 self.command, self.board, start))
+
+    def clear(self):
+        self.events.clear()
+
+    def export(self, file_path):
+        """Writes the events to a JSON lines file."""
+        with open(file_path, "w") as f:
+            for event in list(self.events):
+                f.write(json.dumps(event.to_dict()) + "\n")
+
+
+class RecordingSerial(serial.Serial):
+    """serial.Serial that reports its writes and reads to a recorder."""
+
+    def __init__(self, recorder, *args, **kwargs):
+        self.recorder = recorder
+        super().__init__(*args, **kwargs)
+
+    def write(self, data):
+        self.recorder.written(data)
+        return super().write(data)
+
+    def read(self, size=1):
+        data = super().read(size)
+        self.recorder.read(len(data))
+        return data
+
+
+def load(file_path):
+    """Reads events exported by TrafficRecorder.export."""
+    with open(file_path) as f:
+        return [Event.from_dict(json.loads(line))
+                for line in f if line.strip()]
+
+
+def summarise(events):
+    """Splits the traffic into exchanges, each running from a command's
+    first write to the last byte before the next command, and totals them
+    per (board, command). Returns a list of dicts, slowest first, with the
+    count, total and first-byte wait in seconds and the bytes each way."""
+    exchanges = []
+    for event in events:
+        if event.start or (exchanges and
+                           (exchanges[-1]["command"] != event.command or
+                            exchanges[-1]["board"] != event.board)):
+            exchanges.append({"board": event.board,
+                              "command": event.command,
+                              "start": event.time, "end": event.time,
+                              "first_rx": None, "written": 0, "read": 0})
+        if not exchanges:
+            continue
+        exchange = exchanges[-1]
+        exchange["end"] = event.time
+        if event.direction == "w":
+            exchange["written"] += event.size
+        else:
+            exchange["read"] += event.size
+            if exchange["first_rx"] is None:
+                exchange["first_rx"] = event.time
+
+    totals = {}
+    for exchange in exchanges:
+        key = (exchange["board"], exchange["command"])
+        total = totals.setdefault(key, {
+            "board": key[0], "command": key[1], "count": 0, "time": 0.0,
+            "wait": 0.0, "written": 0, "read": 0})
+        total["count"] += 1
+        total["time"] += exchange["end"] - exchange["start"]
+        if exchange["first_rx"] is not None:
+            total["wait"] += exchange["first_rx"] - exchange["start"]
+        total["written"] += exchange["written"]
+        total["read"] += exchange["read"]
+    return sorted(totals.values(), key=lambda t: t["time"], reverse=True)
+
+
+def format_summary(totals):
+    lines = [f"{'Board':<10} {'Command':<32} {'Count':>5} {'Time s':>8} "
+             f"{'Wait s':>8} {'Out B':>7} {'In B':>7}"]
+    for t in totals:
+        lines.append(f"{t['board']:<10} {t['command'][:32]:<32} "
+                     f"{t['count']:>5} {t['time']:>8.3f} {t['wait']:>8.3f} "
+                     f"{t['written']:>7} {t['read']:>7}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Show where the time goes in recorded serial traffic.")
+    parser.add_argument("file", help="JSON lines file exported from the "
+                                     "test utility")
+    parser.add_argument("--board", help="only show this board")
+    args = parser.parse_args()
+
+    events = load(args.file)
+    if args.board:
+        events = [e for e in events if e.board == args.board.upper()]
+    print(format_summary(summarise(events)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
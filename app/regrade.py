@@ -0,0 +1,213 @@
+"""Re-grades old test reports against a new limit set.
+
+Reads every CSV report in a folder, checks the recorded measurements against
+the limit set's limits with Model's checks and prints, per limit, how many
+results would change. By default only the latest report of each board is
+counted, i.e. the boards that shipped.
+
+Example:
+    python regrade.py /path/to/report/folder --limits limits-2026.10.json
+"""
+import argparse
+import csv
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+import limitsets
+import model
+import report
+
+# Report key : Model limit key, for the report rows that were graded
+# against a limit.
+GRADED = {
+    "input_v": "input_v",
+    "input_i": "input_i",
+    "supply_2v": "supply_2v",
+    "coin_cell_v": "coin_cell_v",
+    "supply_5v": "supply_5v",
+    "uart_5v": "uart_5v",
+    "off_5v": "off_5v",
+    "bat_v": "bat_v",
+    "deep_sleep_i": "deep_sleep_i",
+    "solar_v": "solar_v",
+    "solar_i": "solar_i_min",
+}
+# Reports are parsed in chunks of this many per worker task.
+CHUNK_SIZE = 256
+
+
+class Record:
+    """The graded values of one report.
+
+    Instance variables:
+    path          --  Report file.
+    sn            --  PCBA serial number.
+    timestamp     --  When the report was written, as a datetime.
+    measurements  --  Limit key : measured value.
+    recorded      --  Limit key : whether it passed when tested.
+    """
+
+    def __init__(self, path, sn, timestamp, measurements, recorded):
+        self.path = path
+        self.sn = sn
+        self.timestamp = timestamp
+        self.measurements = measurements
+        self.recorded = recorded
+
+
+def parse_report(path):
+    """Reads a report CSV. Returns a Record, or None if the file isn't a
+    readable report."""
+    try:
+        board = report.Report.from_csv(path)
+    except (OSError, UnicodeDecodeError, csv.Error):
+        return None
+    sn = board.data["pcba_sn"][1]
+    if not sn:
+        return None
+    try:
+        timestamp = datetime.strptime(board.timestamp, "%Y-%m-%d %H:%M:%S")
+    except (TypeError, ValueError):
+        timestamp = None
+
+    measurements = {}
+    recorded = {}
+    for key, limit in GRADED.items():
+        value, status = board.data[key][1:3]
+        try:
+            measurements[limit] = float(value)
+        except (TypeError, ValueError):
+            continue
+        recorded[limit] = status == "PASS"
+    return Record(str(path), sn, timestamp, measurements, recorded)
+
+
+def parse_chunk(paths):
+    return [parse_report(path) for path in paths]
+
+
+def parse_reports(paths, workers=None):
+    """Parses the reports in parallel and returns the Records."""
+    chunks = [paths[i:i + CHUNK_SIZE]
+              for i in range(0, len(paths), CHUNK_SIZE)]
+    if len(chunks) <= 1 or workers == 1:
+        results = [parse_chunk(chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            results = list(executor.map(parse_chunk, chunks))
+    return [record for chunk in results for record in chunk if record]
+
+
+def latest_per_board(records):
+    """Keeps the last report of each serial number."""
+    latest = {}
+    for record in records:
+        current = latest.get(record.sn)
+        if (current is None or
+                (record.timestamp or datetime.min) >=
+                (current.timestamp or datetime.min)):
+            latest[record.sn] = record
+    return list(latest.values())
+
+
+def grade(records, limits):
+    """Checks every record against the limits with Model.check_batch.
+    Returns limit key : list of True/False/None per record, None where the
+    value or a measurement it depends on is missing."""
+    m = model.Model()
+    m.set_limits(limits)
+    checked = m.check_batch([record.measurements for record in records])
+    return {key: [result.get(key) for result in checked]
+            for key in dict.fromkeys(GRADED.values())}
+
+
+def deltas(records, results):
+    """Returns one row per limit with the number of records graded, failed
+    when tested, failed now, newly failed and newly passed."""
+    rows = []
+    for key, column in results.items():
+        graded = failed_then = failed_now = newly_failed = newly_passed = 0
+        for record, passed in zip(records, column):
+            if passed is None:
+                continue
+            before = record.recorded.get(key, True)
+            graded += 1
+            failed_then += not before
+            failed_now += not passed
+            newly_failed += before and not passed
+            newly_passed += passed and not before
+        rows.append({"limit": key, "graded": graded,
+                     "failed_then": failed_then, "failed_now": failed_now,
+                     "newly_failed": newly_failed,
+                     "newly_passed": newly_passed})
+    return rows
+
+
+def newly_failing_boards(records, results):
+    """Returns (serial number, [limit keys]) of each board that passed every
+    graded limit when tested but fails at least one now."""
+    boards = []
+    for i, record in enumerate(records):
+        if not all(record.recorded.values()):
+            continue
+        failed = [key for key, column in results.items()
+                  if column[i] is False]
+        if failed:
+            boards.append((record.sn, failed))
+    return boards
+
+
+def format_deltas(rows):
+    lines = [f"{'Limit':<14} {'Graded':>7} {'Failed then':>12} "
+             f"{'Failed now':>11} {'Newly failed':>13} {'Newly passed':>13}"]
+    for r in rows:
+        lines.append(f"{r['limit']:<14} {r['graded']:>7} "
+                     f"{r['failed_then']:>12} {r['failed_now']:>11} "
+                     f"{r['newly_failed']:>13} {r['newly_passed']:>13}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Re-grade test reports against a limit set.")
+    parser.add_argument("report_dir", help="folder of CSV reports, searched "
+                                           "recursively")
+    parser.add_argument("--limits", help="limit set file (default: the "
+                                         "built-in limits)")
+    parser.add_argument("--all", action="store_true",
+                        help="grade every report, not just the latest of "
+                             "each board")
+    parser.add_argument("--boards", action="store_true",
+                        help="list the boards that would now fail")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="processes used to parse the reports")
+    args = parser.parse_args()
+
+    try:
+        limit_set = (limitsets.load(args.limits) if args.limits
+                     else limitsets.built_in())
+    except (OSError, limitsets.InvalidLimitSet) as e:
+        parser.error(f"can't load the limit set: {e}")
+
+    paths = sorted(str(p) for p in Path(args.report_dir).rglob("*.csv"))
+    records = parse_reports(paths, args.workers)
+    if not args.all:
+        records = latest_per_board(records)
+
+    results = grade(records, limit_set.limits)
+    print(f"{len(records)} reports graded against limit set "
+          f"{limit_set.version}.")
+    print(format_deltas(deltas(records, results)))
+
+    if args.boards:
+        boards = newly_failing_boards(records, results)
+        print(f"\n{len(boards)} boards that passed would now fail:")
+        for sn, failed in boards:
+            print(f"{sn}: {', '.join(failed)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,9 @@
 import csv
+import sqlite3
 from os import path
+from pathlib import Path
 from datetime import datetime as dt
+import results
 
 
 class Report:
@@ -11,11 +14,15 @@ class Report:
     date        -- Stores date in dd--mm--yy format.
     test_result -- Boolean storing success or failure of the sum of the tests.
     data        -- Dictionary of test variables and their results and values.
+    timings     -- Dictionary of step names and the seconds they took.
+    store_error -- Why the results store couldn't be written, if it failed.
 
     Instance Methods
     write_data          -- Updates data model.
+    write_timing        -- Records how long a step took.
     set_file_location   -- Sets file path for report location.
-    generate_report     -- Generates report and saves to path location.
+    generate_report     -- Generates report and saves to path location,
+                           and adds it to the folder's results store.
     """
 
     def __init__(self):
@@ -28,6 +35,7 @@ class Report:
             # key : ["Name", value, PASS/FAIL]
             "timestamp": ["Timestamp", None, "PASS"],
             "pcba_pn": ["PCBA PN", None, None],
+            "limits_version": ["Limit Set Version", None, None],
             "pcba_sn": ["PCBA SN", None, None],
             "tester_id": ["Tester ID", None, None],
             "input_v": ["Input Voltage (V)", None, None],
@@ -61,10 +69,37 @@ class Report:
             "uart_comms": ["UART Power", None, None],
             "g_led_test": ["Green LED Test", None, None],
             "b_led_test": ["Blue LED Test", None, None],
-            "r_led_test": ["Red LED Test", None, None]
+            "r_led_test": ["Red LED Test", None, None],
+            "critical_path": ["Programming Critical Path", None, None]
         }
+        self.timings = {}
+        self.store_error = None
         self.file_path = ""
 
+    @classmethod
+    def from_csv(cls, file_path):
+        """Reads a report written by generate_report. Values are kept as
+        the text in the file. Raises OSError, UnicodeDecodeError or
+        csv.Error if it can't be read."""
+        board = cls()
+        names = {entry[0]: key for key, entry in board.data.items()}
+        with open(file_path, newline="") as f:
+            for row in csv.reader(f):
+                if len(row) < 3:
+                    continue
+                if row[0] == "Test Result":
+                    board.test_result = row[2]
+                elif row[0] in names:
+                    board.write_data(names[row[0]], row[1] or None,
+                                     row[2] or None)
+                elif row[0].endswith(" Time (s)"):
+                    try:
+                        board.timings[row[0][:-9]] = float(row[1])
+                    except ValueError:
+                        pass
+        board.timestamp = board.data["timestamp"][1]
+        return board
+
     def write_data(self, data_key, data_value, status):
         """Updates the data model with the received value and a bool
         indicating if the test passed or not. If the test failed and isn't
@@ -73,6 +108,10 @@ class Report:
         self.data[data_key][1] = data_value
         self.data[data_key][2] = status
 
+    def write_timing(self, name, seconds):
+        """Records the time a step took, written after the test data."""
+        self.timings[name] = seconds
+
     def set_file_location(self, file_path):
         """Sets the file path for the report's save location."""
         self.file_path = file_path
@@ -109,4 +148,41 @@ class Report:
         csvwriter.writerow(["Test Result", "", self.test_result])
         for _, test in self.data.items():
             csvwriter.writerow([test[0], test[1], test[2]])
+        for step, seconds in self.timings.items():
+            csvwriter.writerow([f"{step} Time (s)", f"{seconds:.2f}", ""])
         f.close()
+
+        # The CSV is the record of the test; a store that can't be written
+        # is reported but doesn't lose it.
+        try:
+            results.ResultsStore(self.file_path).add(self, name)
+        except sqlite3.Error as e:
+            self.store_error = str(e)
+
+
+def index_reports(directory):
+    """Brings the results store of a report folder up to date with its CSV
+    files. Only reports that are new or whose mtime changed are read, and
+    reports that were deleted are dropped. Returns the number of board
+    reports read."""
+    store = results.ResultsStore(directory)
+    indexed = store.indexed_files()
+    files = {p.name: p for p in Path(directory).glob("*.csv")}
+    read = 0
+    for name, file_path in files.items():
+        if indexed.get(name) == file_path.stat().st_mtime:
+            continue
+        try:
+            board = Report.from_csv(file_path)
+        except OSError:
+            # Maybe locked by another station; tried again next time.
+            continue
+        except (UnicodeDecodeError, csv.Error):
+            board = None
+        if board and board.data["pcba_sn"][1]:
+            store.add(board, file_path)
+            read += 1
+        else:
+            store.skip_file(file_path)
+    store.remove_missing([name for name in indexed if name not in files])
+    return read
@@ -0,0 +1,36 @@
+import os
+import sqlite3
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+import report
+import results
+
+
+class ReportIndexer(QObject):
+    """Keeps the report folder's results store up to date and looks up
+    boards in it. Runs on its own thread, as the folder is often on a
+    network share."""
+    indexed = pyqtSignal(int)
+    history_ready = pyqtSignal(str, list)
+    failed = pyqtSignal(str)
+
+    @pyqtSlot(str)
+    def index(self, report_dir):
+        """Reads the reports added to or changed in the folder since it was
+        last indexed."""
+        if not os.path.isdir(report_dir):
+            return
+        try:
+            self.indexed.emit(report.index_reports(report_dir))
+        except (OSError, sqlite3.Error) as e:
+            self.failed.emit(str(e))
+
+    @pyqtSlot(str, str)
+    def history(self, report_dir, sn):
+        """Sends the earlier tests of a board, see ResultsStore.history."""
+        if not os.path.isdir(report_dir):
+            return
+        try:
+            self.history_ready.emit(
+                sn, results.ResultsStore(report_dir).history(sn))
+        except sqlite3.Error as e:
+            self.failed.emit(str(e))
@@ -0,0 +1,271 @@
+"""SQLite store of test results, kept next to the CSV reports.
+
+Every finished board is appended as one row of the boards table, with a
+value and a status column for each key in Report.data. Failed tests are also
+listed in the failures table and step times in the timings table, so boards
+can be looked up by serial number, tester, date or failed test without
+reading the CSV files. The report_files table holds the name and mtime of
+every CSV that has been read, including ones that aren't board reports, so
+the store doubles as an index of the folder that report.index_reports keeps
+up to date.
+
+Example:
+    python results.py /path/to/reports --failed uart_5v --since 2026-10-01
+"""
+import argparse
+import sqlite3
+import sys
+from datetime import datetime
+from pathlib import Path
+
+DB_NAME = "results.sqlite3"
+# Report keys whose values are stored as numbers.
+NUMERIC_KEYS = {
+    "input_v", "input_i", "supply_2v", "coin_cell_v", "supply_5v",
+    "uart_5v", "off_5v", "bat_v", "sonic_connected", "solar_v", "solar_i",
+    "deep_sleep_i"
+}
+# Columns of the boards table that aren't Report.data keys.
+# The serial number and tester are created up front so they can be indexed.
+BOARD_COLUMNS = [("id", "INTEGER PRIMARY KEY"), ("tested_at", "TEXT"),
+                 ("test_result", "TEXT"), ("report_file", "TEXT"),
+                 ("pcba_sn", "TEXT"), ("tester_id", "TEXT")]
+
+
+def column_type(key):
+    return "REAL" if key in NUMERIC_KEYS else "TEXT"
+
+
+def to_column(key, value):
+    """Converts a report value to the column's type; values that aren't
+    numbers are kept as text."""
+    if value is None:
+        return None
+    if key in NUMERIC_KEYS:
+        try:
+            return float(str(value).split()[0])
+        except (ValueError, IndexError):
+            pass
+    return str(value)
+
+
+class ResultsStore:
+    """Append-only results database in a report folder."""
+
+    def __init__(self, directory):
+        self.path = Path(directory, DB_NAME)
+
+    def connect(self, keys=()):
+        connection = sqlite3.connect(str(self.path), timeout=10)
+        connection.row_factory = sqlite3.Row
+        # The report folder is often a network share, where WAL's shared
+        # memory doesn't work across stations. The rollback journal only
+        # needs file locks. Setting it also converts a store that was
+        # created in WAL mode.
+        connection.execute("PRAGMA journal_mode=DELETE")
+        self.create_schema(connection, keys)
+        return connection
+
+    @staticmethod
+    def create_schema(connection, keys=()):
+        """Creates the tables and indexes, and adds columns for any of the
+        report keys that were added since the database was created."""
+        columns = ", ".join(f"{name} {kind}" for name, kind in BOARD_COLUMNS)
+        connection.execute(f"CREATE TABLE IF NOT EXISTS boards ({columns})")
+        existing = {row["name"] for row in
+                    connection.execute("PRAGMA table_info(boards)")}
+        for name, kind in BOARD_COLUMNS[1:]:
+            if name not in existing:
+                connection.execute(f"ALTER TABLE boards ADD COLUMN {name} "
+                                   f"{kind}")
+                existing.add(name)
+        for key in keys:
+            if key not in existing:
+                connection.execute(f"ALTER TABLE boards ADD COLUMN {key} "
+                                   f"{column_type(key)}")
+            if f"{key}_status" not in existing:
+                connection.execute(f"ALTER TABLE boards ADD COLUMN "
+                                   f"{key}_status TEXT")
+        connection.execute("CREATE TABLE IF NOT EXISTS failures "
+                           "(board_id INTEGER, test TEXT)")
+        connection.execute("CREATE TABLE IF NOT EXISTS timings "
+                           "(board_id INTEGER, step TEXT, seconds REAL)")
+        connection.execute("CREATE TABLE IF NOT EXISTS report_files "
+                           "(name TEXT PRIMARY KEY, mtime REAL)")
+        for table, column in [("boards", "pcba_sn"), ("boards", "tester_id"),
+                              ("boards", "tested_at"),
+                              ("boards", "report_file"), ("failures", "test"),
+                              ("failures", "board_id"),
+                              ("timings", "board_id")]:
+            connection.execute(f"CREATE INDEX IF NOT EXISTS "
+                               f"{table}_{column} ON {table} ({column})")
+
+    def add(self, board_report, report_file=None):
+        """Appends a finished report, and indexes its CSV if given. A row
+        already added for the same CSV is replaced. Returns the board's row
+        id."""
+        row = {"tested_at": tested_at(board_report.timestamp),
+               "test_result": board_report.test_result,
+               "report_file": Path(report_file).name if report_file
+               else None}
+        for key, entry in board_report.data.items():
+            row[key] = to_column(key, entry[1])
+            row[f"{key}_status"] = entry[2]
+        names = ", ".join(row)
+        marks = ", ".join("?" for _ in row)
+
+        connection = self.connect(board_report.data)
+        try:
+            with connection:
+                if report_file:
+                    self.index_file(connection, report_file)
+                board_id = connection.execute(
+                    f"INSERT INTO boards ({names}) VALUES ({marks})",
+                    list(row.values())).lastrowid
+                connection.executemany(
+                    "INSERT INTO failures VALUES (?, ?)",
+                    [(board_id, key) for key, entry in
+                     board_report.data.items() if entry[2] == "FAIL"])
+                connection.executemany(
+                    "INSERT INTO timings VALUES (?, ?, ?)",
+                    [(board_id, name, seconds) for name, seconds in
+                     board_report.timings.items()])
+        finally:
+            connection.close()
+        return board_id
+
+    @classmethod
+    def index_file(cls, connection, report_file):
+        """Records a CSV as read at its current mtime, dropping the rows
+        added for an earlier version of it."""
+        cls.remove_file(connection, Path(report_file).name)
+        connection.execute("INSERT INTO report_files VALUES (?, ?)",
+                           (Path(report_file).name,
+                            Path(report_file).stat().st_mtime))
+
+    @staticmethod
+    def remove_file(connection, report_file):
+        """Deletes the rows added for a CSV."""
+        ids = [(r["id"],) for r in connection.execute(
+            "SELECT id FROM boards WHERE report_file = ?", (report_file,))]
+        connection.executemany("DELETE FROM boards WHERE id = ?", ids)
+        connection.executemany("DELETE FROM failures WHERE board_id = ?",
+                               ids)
+        connection.executemany("DELETE FROM timings WHERE board_id = ?", ids)
+        connection.execute("DELETE FROM report_files WHERE name = ?",
+                           (report_file,))
+
+    def skip_file(self, report_file):
+        """Indexes a CSV that isn't a board report, so it isn't read
+        again until it changes."""
+        connection = self.connect()
+        try:
+            with connection:
+                self.index_file(connection, report_file)
+        finally:
+            connection.close()
+
+    def indexed_files(self):
+        """Returns CSV name : mtime of every CSV that has been read."""
+        connection = self.connect()
+        try:
+            return {row["name"]: row["mtime"] for row in
+                    connection.execute("SELECT * FROM report_files")}
+        finally:
+            connection.close()
+
+    def remove_missing(self, report_files):
+        """Drops the rows of CSVs that are no longer in the folder."""
+        connection = self.connect()
+        try:
+            with connection:
+                for report_file in report_files:
+                    self.remove_file(connection, report_file)
+        finally:
+            connection.close()
+
+    def history(self, sn):
+        """Returns (tested at, result, tester, [failed tests]) of each test
+        of a board, newest first."""
+        connection = self.connect()
+        try:
+            rows = connection.execute(
+                "SELECT tested_at, test_result, tester_id, "
+                "(SELECT group_concat(test) FROM failures "
+                "WHERE board_id = boards.id) AS failed "
+                "FROM boards WHERE pcba_sn = ? ORDER BY tested_at DESC",
+                (sn.upper(),)).fetchall()
+        finally:
+            connection.close()
+        return [(row["tested_at"], row["test_result"], row["tester_id"],
+                 row["failed"].split(",") if row["failed"] else [])
+                for row in rows]
+
+    def find(self, sn=None, tester=None, since=None, until=None,
+             failed=None):
+        """Returns the boards matching all of the given filters, newest
+        first. since and until are dates or datetimes in ISO format; failed
+        is a Report.data key."""
+        clauses = []
+        args = []
+        if sn:
+            clauses.append("pcba_sn = ?")
+            args.append(sn.upper())
+        if tester:
+            clauses.append("tester_id = ?")
+            args.append(tester.upper())
+        if since:
+            clauses.append("tested_at >= ?")
+            args.append(since)
+        if until:
+            # A bare date includes the whole day.
+            clauses.append("tested_at < ?" if len(until) > 10
+                           else "tested_at < date(?, '+1 day')")
+            args.append(until)
+        if failed:
+            clauses.append("id IN (SELECT board_id FROM failures "
+                           "WHERE test = ?)")
+            args.append(failed)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        connection = self.connect()
+        try:
+            return connection.execute(
+                f"SELECT * FROM boards {where} ORDER BY tested_at DESC",
+                args).fetchall()
+        finally:
+            connection.close()
+
+
+def tested_at(timestamp):
+    """Converts a report timestamp to ISO format, which sorts correctly."""
+    try:
+        return datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S").isoformat(
+            sep=" ")
+    except (TypeError, ValueError):
+        return datetime.now().isoformat(sep=" ", timespec="seconds")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Look up boards in a report folder's results store.")
+    parser.add_argument("report_dir")
+    parser.add_argument("--sn", help="PCBA serial number")
+    parser.add_argument("--tester", help="tester ID")
+    parser.add_argument("--since", help="first date, e.g. 2026-10-01")
+    parser.add_argument("--until", help="last date, e.g. 2026-10-31")
+    parser.add_argument("--failed", help="only boards that failed this "
+                                         "test, e.g. uart_5v")
+    args = parser.parse_args()
+
+    boards = ResultsStore(args.report_dir).find(
+        args.sn, args.tester, args.since, args.until, args.failed)
+    for board in boards:
+        print(f"{board['tested_at']}  {board['pcba_sn']}  "
+              f"tester {board['tester_id']}  {board['test_result']}")
+    print(f"{len(boards)} boards")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+
+
+class Task:
+    """A unit of work in a board's test schedule.
+
+    Instance variables:
+    name     --  Identifies the task.
+    func     --  Callable run on the scheduler's worker pool. None for tasks
+                 driven elsewhere, e.g. atprogram on the flash thread or a
+                 value the operator enters.
+    depends  --  Names of the tasks that have to finish first.
+    start    --  Monotonic time the task started, None until then.
+    end      --  Monotonic time the task finished, None until then.
+    result   --  Value returned by func, or passed to Scheduler.finish.
+    error    --  Exception raised by func, if any.
+    """
+
+    def __init__(self, name, func=None, depends=()):
+        self.name = name
+        self.func = func
+        self.depends = list(depends)
+        self.start = None
+        self.end = None
+        self.ready = False
+        self.result = None
+        self.error = None
+
+    @property
+    def duration(self):
+        if self.start is None or self.end is None:
+            return None
+        return self.end - self.start
+
+
+class Scheduler(QObject):
+    """Starts each task as soon as the tasks it depends on have finished, so
+    independent work overlaps. Tasks with a callable run on a worker pool;
+    for the others task_ready is emitted and the owner calls begin and
+    finish. Keeps the timings so the critical path can be reported."""
+    task_ready = pyqtSignal(str)
+    task_finished = pyqtSignal(str)
+    all_finished = pyqtSignal()
+    work_done = pyqtSignal(str, int, object, object)
+
+    def __init__(self, max_workers=2):
+        super().__init__()
+        self.executor = ThreadPoolExecutor(max_workers)
+        self.tasks = {}
+        # Bumped on reset so work left over from the previous board is
+        # ignored when it finishes.
+        self.generation = 0
+        self.work_done.connect(self.work_finished)
+
+    def reset(self):
+        """Drops all tasks, ready for the next board."""
+        self.tasks = {}
+        self.generation += 1
+
+    def add(self, name, func=None, depends=()):
+        self.tasks[name] = Task(name, func, depends)
+
+    def start(self):
+        """Starts every task that isn't waiting on another."""
+        self.dispatch()
+
+    def dispatch(self):
+        for task in list(self.tasks.values()):
+            if task.ready or task.end is not None:
+                continue
+            if not all(self.tasks[d].end is not None for d in task.depends):
+                continue
+            task.ready = True
+            if task.func:
+                task.start = time.monotonic()
+                future = self.executor.submit(task.func)
+                future.add_done_callback(
+                    lambda f, name=task.name, gen=self.generation:
+                    self.work_done.emit(name, gen, None if f.exception()
+                                        else f.result(), f.exception()))
+            else:
+                self.task_ready.emit(task.name)
+
+    @pyqtSlot(str, int, object, object)
+    def work_finished(self, name, generation, result, error):
+        if generation != self.generation or name not in self.tasks:
+            return
+        self.tasks[name].error = error
+        self.finish(name, result)
+
+    def begin(self, name):
+        """Marks an externally driven task as started."""
+        if name in self.tasks:
+            self.tasks[name].start = time.monotonic()
+
+    def finish(self, name, result=None):
+        """Marks a task as finished and starts the tasks waiting on it."""
+        task = self.tasks.get(name)
+        if not task or task.end is not None:
+            return
+        task.end = time.monotonic()
+        if task.start is None:
+            task.start = task.end
+        task.result = result
+        self.task_finished.emit(name)
+        self.dispatch()
+        if all(t.end is not None for t in self.tasks.values()):
+            self.all_finished.emit()
+
+    def result(self, name):
+        """Returns the task's result, or None if it hasn't finished."""
+        task = self.tasks.get(name)
+        return task.result if task else None
+
+    def critical_path(self):
+        """Returns the chain of finished tasks that set the total time,
+        ending with the last task to finish. Each task is preceded by the
+        dependency that finished last, i.e. the one it was waiting on."""
+        finished = [t for t in self.tasks.values() if t.end is not None]
+        if not finished:
+            return []
+        path = [max(finished, key=lambda t: t.end)]
+        while True:
+            depends = [self.tasks[d] for d in path[0].depends
+                       if self.tasks[d].end is not None]
+            if not depends:
+                break
+            path.insert(0, max(depends, key=lambda t: t.end))
+        return path
+
+    def summary(self):
+        """Describes the critical path, e.g.
+        'flash 41.2 s > watchdog 3.1 s (44.3 s)'."""
+        path = self.critical_path()
+        if not path:
+            return ""
+        steps = " > ".join(f"{t.name} {t.duration:.1f} s" for t in path)
+        return f"{steps} ({path[-1].end - path[0].start:.1f} s)"
@@ -0,0 +1,213 @@
+import time
+import serial
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+from model import ValueNotSet
+
+
+class TestStep:
+    """A single automated test step.
+
+    Instance variables:
+    name        --  Identifies the step in results.
+    command     --  Console command to send, or a callable taking the
+                    SerialManager for tests that need more than one command.
+                    Callables that run a complete test return pass/fail.
+    parser      --  Turns the response into a value. Returns None or raises
+                    ValueError if the response is bad.
+    limit       --  Model limit key the value is checked against.
+    check       --  Callable checking the value when there is no limit. May
+                    return a list of results for a list of report keys.
+    report_key  --  Report key, or list of keys, for the value.
+    timeout     --  Response deadline, defaults to the command's.
+    retries     --  Times the step is repeated if it fails.
+    delay       --  Seconds to wait before sending the command.
+    required    --  Stop the sequence if this step fails.
+    label       --  Status text shown while the step runs.
+    """
+
+    def __init__(self, name, command, parser=None, limit=None, check=None,
+                 report_key=None, timeout=None, retries=0, delay=0,
+                 required=False, label=""):
+        self.name = name
+        self.command = command
+        self.parser = parser
+        self.limit = limit
+        self.check = check
+        self.report_key = report_key
+        self.timeout = timeout
+        self.retries = retries
+        self.delay = delay
+        self.required = required
+        self.label = label
+
+    def batchable(self):
+        """Whether the step is a single command that can be sent straight
+        after the previous one."""
+        return isinstance(self.command, str) and not self.delay
+
+
+class StepResult:
+    """Outcome of a test step.
+
+    Instance variables:
+    step      --  The TestStep that was run.
+    value     --  Parsed value, None if the response couldn't be parsed.
+    passed    --  Whether the step passed.
+    outcomes  --  Pass/fail per report key.
+    elapsed   --  Seconds taken, including retries.
+    attempts  --  Number of times the step was run.
+    """
+
+    def __init__(self, step, value, outcomes, elapsed, attempts):
+        self.step = step
+        self.value = value
+        self.outcomes = outcomes
+        self.passed = all(outcomes)
+        self.elapsed = elapsed
+        self.attempts = attempts
+
+    def write_to(self, report):
+        """Writes the result to the report under the step's report key(s)."""
+        if not self.step.report_key:
+            return
+        keys = self.step.report_key
+        if isinstance(keys, str):
+            keys = [keys]
+            values = [self.value]
+        elif self.value is None:
+            values = [""] * len(keys)
+        else:
+            values = list(self.value)
+
+        outcomes = self.outcomes
+        if len(outcomes) == 1:
+            outcomes = outcomes * len(keys)
+        for key, value, passed in zip(keys, values, outcomes):
+            if value is None:
+                value = ""
+            report.write_data(key, value, "PASS" if passed else "FAIL")
+
+
+class SequenceRunner(QObject):
+    """Runs a list of TestSteps back-to-back. Lives on the serial thread and
+    talks to the SerialManager directly, emitting a result per step and all
+    of the results once the sequence is done."""
+    step_started = pyqtSignal(object)
+    step_finished = pyqtSignal(object)
+    results_ready = pyqtSignal(list)
+    sequence_finished = pyqtSignal(bool)
+    port_error = pyqtSignal()
+
+    def __init__(self, serial_manager, model):
+        super().__init__()
+        self.sm = serial_manager
+        self.model = model
+
+    @pyqtSlot(list)
+    def run(self, steps):
+        """Runs the steps in order. Consecutive single-command steps are sent
+        as one batch. Stops early if a required step fails or the port is
+        lost."""
+        if not self.sm.ser.is_open:
+            self.port_error.emit()
+            return
+
+        results = []
+        i = 0
+        while i < len(steps):
+            group = [steps[i]]
+            while (group[-1].batchable() and not group[-1].required and
+                   i + len(group) < len(steps) and
+                   steps[i + len(group)].batchable()):
+                group.append(steps[i + len(group)])
+            i += len(group)
+
+            for step in group:
+                self.step_started.emit(step)
+            try:
+                if len(group) > 1:
+                    group_results = self.run_batch(group)
+                else:
+                    group_results = [self.sm.resume(self.run_step, group[0])]
+            except serial.serialutil.SerialException:
+                self.port_error.emit()
+                return
+
+            for result in group_results:
+                results.append(result)
+                self.step_finished.emit(result)
+            if group[-1].required and not group_results[-1].passed:
+                break
+
+        self.results_ready.emit(results)
+        self.sequence_finished.emit(all(r.passed for r in results))
+
+    def run_batch(self, steps):
+        """Sends the steps' commands back-to-back. Steps that fail and allow
+        retries are then rerun on their own. The batch time is shared evenly
+        between the steps."""
+        start = time.monotonic()
+        responses = self.sm.run_batch([step.command for step in steps],
+                                      [step.timeout for step in steps])
+        elapsed = (time.monotonic() - start) / len(steps)
+
+        results = []
+        for step, response in zip(steps, responses):
+            value, outcomes = self.evaluate(
+                step, response.decode(errors="replace"))
+            result = StepResult(step, value, outcomes, elapsed, 1)
+            if not result.passed and step.retries:
+                result = self.run_step(step, attempts=1)
+                result.elapsed += elapsed
+            results.append(result)
+        return results
+
+    def run_step(self, step, attempts=0):
+        """Runs a single step, retrying it if it fails. attempts is the
+        number of tries already used up."""
+        start = time.monotonic()
+        while True:
+            attempts += 1
+            if step.delay:
+                time.sleep(step.delay)
+            value, outcomes = self.evaluate(step, self.send(step))
+            if all(outcomes) or attempts > step.retries:
+                break
+        return StepResult(step, value, outcomes, time.monotonic() - start,
+                          attempts)
+
+    def send(self, step):
+        """Sends the step's command and returns the response."""
+        self.sm.flush_buffers()
+        if callable(step.command):
+            return step.command(self.sm)
+        return self.sm.query(step.command, timeout=step.timeout).decode(
+            errors="replace")
+
+    def evaluate(self, step, response):
+        """Parses the response and checks the value. Returns the value and
+        the list of outcomes."""
+        # Tests that run several commands report pass/fail themselves.
+        if isinstance(response, bool):
+            return ("", [response])
+
+        try:
+            value = step.parser(response) if step.parser else response
+        except (ValueError, IndexError):
+            value = None
+        if value is None:
+            return (None, [False])
+
+        try:
+            if step.limit:
+                outcome = self.model.compare_to_limit(step.limit, value)
+            elif step.check:
+                outcome = step.check(value)
+            else:
+                outcome = True
+        except ValueNotSet:
+            outcome = False
+
+        if isinstance(outcome, list):
+            return (value, outcome)
+        return (value, [outcome])
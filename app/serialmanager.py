@@ -1,16 +1,80 @@
 import re
 import time
+from contextlib import contextmanager
 import serial
 import serial.tools.list_ports
+import hexfile
+import portwatcher
+import recorder
 from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
 
+# Deadline in seconds for a command's response. Commands that aren't listed
+# use DEFAULT_TIMEOUT; the reader returns as soon as the prompt or an expected
+# pattern arrives, so these only bound how long a silent board is waited on.
+DEFAULT_TIMEOUT = 10
+COMMAND_TIMEOUTS = {
+    "watchdog": 60,
+    "version": 3,
+    "data": 30,
+    "gps-rx": 3,
+    "reprogram-1-wire-master": 10,
+    "reprogram-1-wire-master-pages": 10,
+}
+# How often the reader checks the port for new bytes.
+POLL_INTERVAL = 0.02
+# Time the line has to stay quiet before a reply without a prompt is treated
+# as complete.
+SETTLE_TIME = 0.1
+# Deadline for the prompt when resynchronising with the board.
+RESYNC_TIMEOUT = 0.5
+# The RTC alarm is set to go off five seconds after the clock is set.
+RTC_ALARM_TIMEOUT = 7
+RTC_POLL_INTERVAL = 0.5
+# The 1-wire test and the Iridium pass-through print no marker when they are
+# ready for the next key or command. Each wait is as long as the fixed sleeps
+# it replaced; only the prompt ends it early. Going quiet doesn't, as the
+# modem and the 1-wire master can be silent while they are still working.
+ONE_WIRE_TEST_DELAYS = (1, 0.3)
+IRIDIUM_DELAY = 2
+# Hex upload pacing. A record counts as acknowledged once the bootloader
+# echoes its line ending or sends ASCII ACK.
+HEX_RECORD_ACKS = [b"\n", b"\x06"]
+HEX_ACK_TIMEOUT = 0.1
+# Delay per record when the bootloader doesn't acknowledge records. Not
+# measured here: it is the 60 ms the line-by-line upload has always used,
+# which the original code documents as a 50 ms minimum per line plus
+# margin. Measure against the bootloader before lowering it.
+HEX_RECORD_DELAY = 0.060
+# Bytes of records sent per write, at most the bootloader's receive buffer.
+# Its size isn't documented and hasn't been measured, and a frame larger
+# than the buffer is overrun without any error, so by default one record is
+# sent per write, as the bootloader has always been sent. Raise it, e.g. to
+# 256, only once the buffer size is confirmed from the bootloader source.
+HEX_RX_BUFFER = 1
+# Upload progress is reported at most 20 times a second.
+PROGRESS_INTERVAL = 0.05
+HEX_UPLOAD_READY = b"download hex records now..."
+HEX_UPLOAD_DONE = b"lock bits set"
+HEX_DONE_TIMEOUT = 10
+# Bootloader command that programs uploaded pages without a full erase.
+ONE_WIRE_PAGES_COMMAND = "reprogram-1-wire-master-pages"
+# Seconds waited before each attempt to reopen a port that dropped out.
+RECONNECT_DELAYS = (0.5, 1, 2, 4, 8)
+# Console baud rate, and the rate bulk transfers switch to. The console is
+# switched with "baud <rate>"; equal rates disable the high-speed mode.
+BASE_BAUD = 115200
+BULK_BAUD = 115200
+BAUD_COMMAND = "baud"
+
 
 class SerialManager(QObject):
     """Class that handles the serial connection."""
     data_ready = pyqtSignal(str)
+    batch_ready = pyqtSignal(list)
     no_port_sel = pyqtSignal()
     sleep_finished = pyqtSignal()
-    line_written = pyqtSignal()
+    line_written = pyqtSignal(int)
+    hex_upload_finished = pyqtSignal(int, float, bool)
     flash_test_succeeded = pyqtSignal()
     flash_test_failed = pyqtSignal()
     gps_test_succeeded = pyqtSignal()
@@ -25,17 +89,32 @@ class SerialManager(QObject):
     serial_error_signal = pyqtSignal()
     file_not_found_signal = pyqtSignal(str)
     generic_error_signal = pyqtSignal(str)
+    reconnecting = pyqtSignal(int)
+    reconnected = pyqtSignal(str)
+    command_timed = pyqtSignal(str, float)
 
     def __init__(self):
         super().__init__()
-        self.ser = serial.Serial(None, 115200, timeout=60,
-                                 parity=serial.PARITY_NONE, rtscts=False,
-                                 xonxoff=False, dsrdtr=False)
+        # Every write and read is timed, see recorder.
+        self.recorder = recorder.TrafficRecorder()
+        self.ser = recorder.RecordingSerial(
+            self.recorder, None, BASE_BAUD, timeout=60,
+            parity=serial.PARITY_NONE, rtscts=False, xonxoff=False,
+            dsrdtr=False)
         self.end = b"\r\n>"
-
-    def scan_ports():
-        """Scan and return list of connected comm ports."""
-        return serial.tools.list_ports.comports()
+        self.timed_out = False
+        # Whether the last response ended on the prompt, i.e. the board is
+        # known to be waiting for a command.
+        self.line_synced = False
+        self.hex_streaming = True
+        self.hex_rx_buffer = HEX_RX_BUFFER
+        # USB VID/PID/serial number of the open port, see portwatcher.
+        self.port_id = None
+        self.base_baud = BASE_BAUD
+        self.bulk_baud = BULK_BAUD
+        # Cleared if the board doesn't follow a baud switch, so later bulk
+        # transfers on this port stay at the base rate.
+        self.bulk_baud_ok = True
 
     @pyqtSlot(str)
     def sc(self, command):
@@ -47,9 +126,7 @@ class SerialManager(QObject):
                 #print(command)
                 self.flush_buffers()
 
-                command = (command + "\r\n").encode()
-                self.ser.write(command)
-                data = self.ser.read_until(self.end).decode()
+                data = self.resume(self.query, command).decode()
 
                 # Debug items pt.2
                 #now = time.time()
@@ -62,23 +139,33 @@ class SerialManager(QObject):
         else:
             self.no_port_sel.emit()
 
+    @pyqtSlot(list)
+    def batch(self, commands):
+        """Sends a list of commands back-to-back and emits all of the
+        responses at once."""
+        if self.ser.is_open:
+            try:
+                responses = self.run_batch(commands)
+                self.batch_ready.emit([r.decode(errors="replace")
+                                       for r in responses])
+            except serial.serialutil.SerialException:
+                self.no_port_sel.emit()
+        else:
+            self.no_port_sel.emit()
+
     @pyqtSlot()
     def version_check(self):
         command = "version"
         p = r"[0-9]+\.[0-9]+[a-z]"
 
-        # Set short timeout in case board is unprogrammed and stalls on no response
-        self.ser.timeout = 3
-
         if self.ser.is_open:
             try:
                 self.flush_buffers()
-                self.ser.write((command + "\r\n").encode())
 
                 try:
-                    time.sleep(1)
-                    # response = self.ser.read_until(self.end).decode()
-                    response = self.ser.read(self.ser.in_waiting).decode()
+                    # Short deadline in case the board is unprogrammed and
+                    # never answers.
+                    response = self.resume(self.query, command).decode()
                 except UnicodeDecodeError:
                     self.serial_error_signal.emit()
                     return
@@ -104,13 +191,7 @@ class SerialManager(QObject):
         if self.ser.is_open:
             try:
                 self.flush_buffers()
-
-                self.ser.write("1-wire-test\r".encode())
-                time.sleep(1)
-                self.ser.write(" ".encode())
-                time.sleep(0.3)
-                self.ser.write(".".encode())
-                data = self.ser.read_until(self.end).decode()
+                data = self.resume(self.read_one_wire_test).decode()
                 self.data_ready.emit(data)
             except serial.serialutil.SerialException:
                 self.no_port_sel.emit()
@@ -120,37 +201,94 @@ class SerialManager(QObject):
     @pyqtSlot()
     def reprogram_one_wire(self):
         """Sends command to reprogram one wire master."""
+        self.start_one_wire_upload("reprogram-1-wire-master")
+
+    @pyqtSlot()
+    def reprogram_one_wire_pages(self):
+        """Sends command to reprogram only the one wire master pages that
+        are uploaded, leaving the rest of its flash as it is. Needs a
+        bootloader that supports page writes."""
+        self.start_one_wire_upload(ONE_WIRE_PAGES_COMMAND)
+
+    def start_one_wire_upload(self, command):
         if self.ser.is_open:
             try:
-                self.ser.write("reprogram-1-wire-master\r\n".encode())
-                # Wait for serial buffer to fill, reduce this time if possible
-                time.sleep(5)
-                num_bytes = self.ser.in_waiting
-                data = self.ser.read(num_bytes).decode()
-                self.data_ready.emit(data)
+                # Back at the base rate once the upload has finished or
+                # failed, see write_hex_records.
+                self.enter_high_speed()
+                data = self.query(command, [HEX_UPLOAD_READY])
+                if HEX_UPLOAD_READY not in data:
+                    # No upload follows to switch back.
+                    self.restore_base_baud()
+                self.data_ready.emit(data.decode())
             except serial.serialutil.SerialException:
+                self.restore_base_baud()
                 self.no_port_sel.emit()
         else:
             self.no_port_sel.emit()
 
     @pyqtSlot(str)
     def write_hex_file(self, file_path):
-        """Writes hex file line-by-line with appropriate delay between
-        each name."""
+        """Writes hex file record-by-record. The file is only read and
+        checked if it isn't already in the hex record cache."""
+        try:
+            records = hexfile.load(file_path)
+        except (ValueError, OSError) as e:
+            self.restore_base_baud()
+            self.generic_error_signal.emit(str(e))
+            return
+        self.write_hex_records(records)
+
+    @pyqtSlot(object)
+    def write_hex_records(self, records):
+        """Writes hex records, either a HexRecords or a list of records,
+        without reading the file. Records are packed into writes that fit
+        the bootloader's receive buffer. In streaming mode each write is
+        sent as soon as the bootloader acknowledges every record in the
+        previous one. If the bootloader doesn't acknowledge records, or
+        streaming is off, the minimum delay per record is kept instead.
+        line_written reports the number of records sent, at most every
+        PROGRESS_INTERVAL seconds."""
         if self.ser.is_open:
+            response = bytearray()
+            acks = self.hex_streaming
+            total_bytes = 0
+            sent = 0
+            last_progress = 0
             try:
-                with open(file_path, "rb") as f:
-                    for line in f:
-                        self.ser.write(line)
-                        self.line_written.emit()
-                        # minimum of 50 ms delay required after each line
-                        time.sleep(0.060)
+                start = time.monotonic()
+                for frame, count in self.hex_frames(records):
+                    written = time.monotonic()
+                    self.ser.write(frame)
+                    total_bytes += len(frame)
+                    sent += count
+                    if written - last_progress >= PROGRESS_INTERVAL:
+                        self.line_written.emit(sent)
+                        last_progress = written
+
+                    if acks:
+                        data, received = self.wait_for_acks(count)
+                        response += data
+                        # No acknowledgement; pace by time from here on.
+                        acks = received >= count
+                    if not acks:
+                        elapsed = time.monotonic() - written
+                        time.sleep(max(0, HEX_RECORD_DELAY * count - elapsed))
+                self.line_written.emit(sent)
+                duration = time.monotonic() - start
+                self.command_timed.emit("hex upload", duration)
+                self.hex_upload_finished.emit(total_bytes, duration, acks)
+
+                if not self.response_complete(response, [HEX_UPLOAD_DONE]):
+                    response += self.read_response([HEX_UPLOAD_DONE],
+                                                   HEX_DONE_TIMEOUT)
             except serial.serialutil.SerialException:
                 self.no_port_sel.emit()
-
-            time.sleep(3)
-            data = self.ser.read_until(self.end).decode()
-            self.data_ready.emit(data)
+                return
+            finally:
+                # Entered in start_one_wire_upload.
+                self.restore_base_baud()
+            self.data_ready.emit(response.decode())
         else:
             self.no_port_sel.emit()
 
@@ -160,19 +298,7 @@ class SerialManager(QObject):
         if self.ser.is_open:
             try:
                 self.flush_buffers()
-
-                self.ser.write(b"iridium\r\n")
-                time.sleep(2)
-                num_bytes = self.ser.in_waiting
-                self.ser.read(num_bytes)
-                self.ser.write(b"at+gsn\r\n")
-                time.sleep(2)
-                num_bytes = self.ser.in_waiting
-                data = self.ser.read(num_bytes).decode()
-                self.ser.write(b".\r\n")
-                time.sleep(2)
-                self.ser.read_until(self.end)
-                self.data_ready.emit(data)
+                self.data_ready.emit(self.resume(self.read_imei))
             except serial.serialutil.SerialException:
                 self.no_port_sel.emit()
         else:
@@ -185,46 +311,10 @@ class SerialManager(QObject):
         if self.ser.is_open:
             try:
                 self.flush_buffers()
-
-                # Make sure there are no logs to start with
-                self.ser.write(b"clear\r\n")
-                self.ser.read_until(b"[Y/N]")
-                self.ser.write(b"Y")
-                self.ser.read_until(self.end)
-
-                self.ser.write(b"flash-fill 1 3 1 1 1 1\r\n")
-                self.ser.read_until(self.end)
-
-                self.ser.write(b"data\r\n")
-                data = self.ser.read_until(self.end)
-                if b"... 3 records" not in data:
-                    self.flash_test_failed.emit()
-                    return
-
-                self.ser.write(b"psoc-log-usage\r\n")
-                data = self.ser.read_until(self.end)
-                if b"used: 3" not in data:
-                    self.flash_test_failed.emit()
-                    return
-
-                self.ser.write(b"clear\r\n")
-                self.ser.read_until(b"[Y/N]")
-                self.ser.write(b"Y")
-                self.ser.read_until(self.end)
-
-                self.ser.write(b"data\r\n")
-                data = self.ser.read_until(self.end)
-                if b"No data!" not in data:
-                    self.flash_test_failed.emit()
-                    return
-
-                self.ser.write(b"psoc-log-usage\r\n")
-                data = self.ser.read_until(self.end)
-                if b"used: 0" not in data:
+                if self.resume(self.check_flash):
+                    self.flash_test_succeeded.emit()
+                else:
                     self.flash_test_failed.emit()
-                    return
-                self.flash_test_succeeded.emit()
-
             except serial.serialutil.SerialException:
                 self.no_port_sel.emit()
         else:
@@ -236,22 +326,10 @@ class SerialManager(QObject):
         if self.ser.is_open:
             try:
                 self.flush_buffers()
-
-                self.ser.write(b"gps-rx\r\n")
-                time.sleep(0.3)
-                # Throw away 'gps-rx' command echo
-                self.ser.read_until(b"\r\n")
-                # Read first line of GPS data
-                data = self.ser.read_until(b"\r\n")
-                # Stop gps data
-                self.ser.write(b".\r\n")
-
-                if b"$GNTXT" not in data:
+                if self.resume(self.check_gps):
+                    self.gps_test_succeeded.emit()
+                else:
                     self.gps_test_failed.emit()
-                    return
-
-                self.gps_test_succeeded.emit()
-
             except serial.serialutil.SerialException:
                 self.no_port_sel.emit()
 
@@ -260,17 +338,12 @@ class SerialManager(QObject):
         """Sets the serial port."""
         if self.ser.is_open:
             try:
-                self.flush_buffers
-                s = serial_num + "\r\n"
-                self.ser.write(s.encode())
-                time.sleep(0.3)
-                data = self.ser.read_until(self.end).decode()
+                self.flush_buffers()
+                data = self.resume(self.query, serial_num).decode()
                 # Try to get serial number twice
                 if serial_num not in data:
-                    self.flush_buffers
-                    self.ser.write(s.encode())
-                    time.sleep(0.3)
-                    data = self.ser.read_until(self.end).decode()
+                    self.flush_buffers()
+                    data = self.resume(self.query, serial_num).decode()
                     if serial_num not in data:
                         self.serial_test_failed.emit(data)
                         return
@@ -285,36 +358,90 @@ class SerialManager(QObject):
         is set."""
         if self.ser.is_open:
             try:
-                self.flush_buffers
-                # Make sure D505 app is off.
-                self.ser.write(b"app 0\r\n")
-                time.sleep(0.5)
-                self.ser.read_until(self.end)
-                self.ser.write(b"rtc-set 030719 115955\r\n")
-                time.sleep(0.5)
-                self.ser.read_until(self.end)
-                self.ser.write(b"rtc-alarm 12:00\r\n")
-                time.sleep(0.5)
-                self.ser.read_until(self.end)
-                time.sleep(0.5)
-                self.ser.write(b"rtc-alarmed\r\n")
-                data = self.ser.read_until(self.end).decode()
-                if "0" not in data:
+                self.flush_buffers()
+                if self.resume(self.check_rtc):
+                    self.rtc_test_succeeded.emit()
+                else:
                     self.rtc_test_failed.emit()
-                    return
+            except serial.serialutil.SerialException:
+                self.no_port_sel.emit()
 
-                time.sleep(5)
-                self.ser.write(b"rtc-alarmed\r\n")
-                time.sleep(0.5)
-                data = self.ser.read_until(self.end).decode()
-                if "1" not in data:
-                    self.rtc_test_failed.emit()
-                    return
+    def read_one_wire_test(self):
+        """Runs the 1-wire test and returns the response."""
+        self.ser.write("1-wire-test\r".encode())
+        self.read_response(timeout=ONE_WIRE_TEST_DELAYS[0])
+        self.ser.write(" ".encode())
+        self.read_response(timeout=ONE_WIRE_TEST_DELAYS[1])
+        self.ser.write(".".encode())
+        return self.read_response()
+
+    def read_imei(self):
+        """Reads the IMEI from the iridium modem and returns the response."""
+        self.query("iridium", timeout=IRIDIUM_DELAY)
+        data = self.query("at+gsn", [b"OK\r\n", b"ERROR"],
+                          timeout=IRIDIUM_DELAY).decode()
+        self.query(".", timeout=IRIDIUM_DELAY)
+        return data
+
+    def check_flash(self):
+        """Fills the log flash with dummy records, checks they were written
+        and clears them again. Returns True if the flash works. Runs at the
+        bulk baud rate, as the log dump is the bulk of the traffic."""
+        with self.high_speed():
+            return self.fill_and_clear_flash()
+
+    def fill_and_clear_flash(self):
+        # Make sure there are no logs to start with
+        self.query("clear", [b"[Y/N]"])
+        self.ser.write(b"Y")
+        self.read_response()
+
+        self.query("flash-fill 1 3 1 1 1 1")
+
+        if b"... 3 records" not in self.query("data"):
+            return False
+        if b"used: 3" not in self.query("psoc-log-usage"):
+            return False
 
-                self.rtc_test_succeeded.emit()
+        self.query("clear", [b"[Y/N]"])
+        self.ser.write(b"Y")
+        self.read_response()
 
-            except serial.serialutil.SerialException:
-                self.no_port_sel.emit()
+        if b"No data!" not in self.query("data"):
+            return False
+        return b"used: 0" in self.query("psoc-log-usage")
+
+    def check_gps(self):
+        """Returns True if the GPS module sends data."""
+        # Stream GPS data until the module's text sentence shows up
+        data = self.query("gps-rx", [re.compile(rb"\$GNTXT.*\r\n")])
+        # Stop gps data
+        self.query(".")
+        return b"$GNTXT" in data
+
+    def check_serial(self, serial_num):
+        """Sends the serial number and returns True if the board echoes
+        it back."""
+        return serial_num in self.query(serial_num).decode()
+
+    def check_rtc(self):
+        """Sets the time and an alarm five seconds later and returns True if
+        the alarm goes off."""
+        # Make sure D505 app is off.
+        self.query("app 0")
+        self.query("rtc-set 030719 115955")
+        self.query("rtc-alarm 12:00")
+        if "0" not in self.query("rtc-alarmed").decode():
+            return False
+
+        # Poll for the alarm rather than sleeping through the whole
+        # interval.
+        deadline = time.monotonic() + RTC_ALARM_TIMEOUT
+        while "1" not in self.query("rtc-alarmed").decode():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(RTC_POLL_INTERVAL)
+        return True
 
     @pyqtSlot(int)
     def sleep(self, interval):
@@ -322,31 +449,263 @@ class SerialManager(QObject):
         time.sleep(interval)
         self.sleep_finished.emit()
 
+    def command_timeout(self, command):
+        """Returns the response deadline for a command."""
+        name = command.split(" ")[0]
+        return COMMAND_TIMEOUTS.get(name, DEFAULT_TIMEOUT)
+
+    def query(self, command, expected=None, timeout=None, quiet=None):
+        """Sends a command and returns its response. See read_response."""
+        if timeout is None:
+            timeout = self.command_timeout(command)
+        start = time.monotonic()
+        self.ser.write((command + "\r\n").encode())
+        try:
+            return self.read_response(expected, timeout, quiet)
+        finally:
+            self.command_timed.emit(command.split(" ")[0],
+                                    time.monotonic() - start)
+
+    def hex_frames(self, records):
+        """Packs records into (bytes, record count) frames no larger than
+        the bootloader's receive buffer. A record that is larger on its own
+        is sent by itself."""
+        frame = bytearray()
+        count = 0
+        for record in records:
+            if frame and len(frame) + len(record) > self.hex_rx_buffer:
+                yield (bytes(frame), count)
+                frame = bytearray()
+                count = 0
+            frame += record
+            count += 1
+        if frame:
+            yield (bytes(frame), count)
+
+    def wait_for_acks(self, count):
+        """Reads until the bootloader has acknowledged count records or
+        HEX_ACK_TIMEOUT per record has passed. Returns what was read and
+        the number of acknowledgements in it. Once the bootloader reports
+        the upload done every record counts as acknowledged."""
+        deadline = time.monotonic() + HEX_ACK_TIMEOUT * count
+        data = bytearray()
+        received = 0
+        while received < count:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            data += self.read_response(HEX_RECORD_ACKS + [HEX_UPLOAD_DONE],
+                                       remaining)
+            if HEX_UPLOAD_DONE in data:
+                received = count
+                break
+            received = max(data.count(ack) for ack in HEX_RECORD_ACKS)
+            if self.timed_out:
+                break
+        return (bytes(data), received)
+
+    def run_batch(self, commands, timeouts=None):
+        """Sends each command as soon as the previous one has answered and
+        returns the list of responses. The line is only resynchronised
+        before the first command and after one that timed out."""
+        timeouts = timeouts or [None] * len(commands)
+        responses = []
+        self.ser.reset_input_buffer()
+        for command, timeout in zip(commands, timeouts):
+            if not self.line_synced:
+                self.flush_buffers()
+            responses.append(self.resume(self.query, command,
+                                         timeout=timeout))
+        return responses
+
+    def read_response(self, expected=None, timeout=DEFAULT_TIMEOUT,
+                      quiet=None):
+        """Streams bytes in until the prompt or one of the expected patterns
+        (bytes or compiled regexes) has arrived and returns everything read.
+        If quiet is given, also returns once data has been received and the
+        line then stays silent for that many seconds. Whatever arrived before
+        the deadline is returned on a timeout and timed_out is set. Unless
+        the response ended on the prompt the line state is marked unknown."""
+        patterns = [self.end] + list(expected or [])
+        deadline = time.monotonic() + timeout
+        last_rx = None
+        data = bytearray()
+        self.timed_out = False
+
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                self.timed_out = True
+                break
+            if quiet and last_rx and now - last_rx >= quiet:
+                break
+
+            self.ser.timeout = min(POLL_INTERVAL, deadline - now)
+            chunk = self.ser.read(self.ser.in_waiting or 1)
+            if chunk:
+                data += chunk
+                last_rx = time.monotonic()
+                if self.response_complete(data, patterns):
+                    break
+
+        self.line_synced = (not self.timed_out and
+                            data.rstrip().endswith(self.end.rstrip()))
+        return bytes(data)
+
+    @staticmethod
+    def response_complete(data, patterns):
+        """Checks received data for any of the given patterns."""
+        for pattern in patterns:
+            if isinstance(pattern, bytes):
+                if pattern in data:
+                    return True
+            elif pattern.search(data):
+                return True
+        return False
+
     def is_connected(self, port):
-        """Checks for serial connection."""
+        """Checks the given port is the one open."""
+        return self.ser.port == port and self.ser.is_open
+
+    @pyqtSlot(int, int)
+    def set_baud_rates(self, base_baud, bulk_baud):
+        """Sets the console and bulk transfer baud rates."""
+        self.base_baud = base_baud
+        self.bulk_baud = bulk_baud
+        self.bulk_baud_ok = True
+        self.ser.baudrate = base_baud
+
+    def switch_baud(self, baud):
+        """Asks the board to switch its console to baud and follows it.
+        Returns True if the board answers at the new rate. Otherwise the
+        board is asked to switch back and the host returns to the old
+        rate."""
+        old = self.ser.baudrate
+        if baud == old:
+            return True
+        self.flush_buffers()
+        self.ser.write(f"{BAUD_COMMAND} {baud}\r\n".encode())
+        # Let the command's echo drain before the host changes rate.
+        self.ser.flush()
+        self.read_response(timeout=RESYNC_TIMEOUT, quiet=SETTLE_TIME)
+        self.ser.baudrate = baud
+        self.line_synced = False
+        self.flush_buffers()
+        if self.line_synced:
+            return True
+
+        self.ser.write(f"{BAUD_COMMAND} {old}\r\n".encode())
+        self.ser.flush()
+        time.sleep(SETTLE_TIME)
+        self.ser.baudrate = old
+        self.line_synced = False
+        self.flush_buffers()
+        return False
+
+    def enter_high_speed(self):
+        """Switches to the bulk baud rate if it is enabled and the board
+        has followed it before. Returns True if the rate was changed."""
+        if (self.bulk_baud == self.base_baud or not self.bulk_baud_ok or
+                self.ser.baudrate == self.bulk_baud):
+            return False
+        self.bulk_baud_ok = self.switch_baud(self.bulk_baud)
+        return self.bulk_baud_ok
+
+    def leave_high_speed(self):
+        """Switches back to the base baud rate for interactive commands."""
+        if self.ser.baudrate != self.base_baud:
+            self.switch_baud(self.base_baud)
+
+    def restore_base_baud(self):
+        """Leaves the high-speed mode after a transfer that spans several
+        slots, whether or not it succeeded. If the port dropped out the
+        board restarts at the base rate, so the host just returns to it."""
         try:
-            self.ser.write(b"\r\n")
-            time.sleep(0.1)
-            self.ser.read(self.ser.in_waiting)
+            self.leave_high_speed()
         except serial.serialutil.SerialException:
+            try:
+                self.ser.baudrate = self.base_baud
+            except serial.serialutil.SerialException:
+                pass
+
+    @contextmanager
+    def high_speed(self):
+        """Runs a bulk transfer at the bulk baud rate, falling back to the
+        base rate if the board doesn't follow the switch."""
+        self.enter_high_speed()
+        try:
+            yield
+        finally:
+            self.leave_high_speed()
+
+    @staticmethod
+    def find_port(port_id):
+        """Returns the name the port with the given identity currently has,
+        or None if it isn't plugged in."""
+        for port in serial.tools.list_ports.comports():
+            if portwatcher.port_id(port) == port_id:
+                return port.device
+        return None
+
+    def reconnect(self):
+        """Reopens the port after it dropped out. The same USB device is
+        looked for, as it may come back under another name, with increasing
+        delays between attempts. Returns True once the port is open again."""
+        if not self.port_id:
             return False
-        return self.ser.port == port and self.ser.is_open
+        try:
+            self.ser.close()
+        except serial.serialutil.SerialException:
+            pass
+        for attempt, delay in enumerate(RECONNECT_DELAYS, 1):
+            self.reconnecting.emit(attempt)
+            time.sleep(delay)
+            port = self.find_port(self.port_id)
+            if not port:
+                continue
+            try:
+                self.ser.port = port
+                self.ser.open()
+            except serial.serialutil.SerialException:
+                continue
+            self.line_synced = False
+            self.reconnected.emit(port)
+            return True
+        return False
+
+    def resume(self, action, *args, **kwargs):
+        """Runs an exchange with the board. If the port drops out it is
+        reopened and only that exchange is run again, so a test in progress
+        carries on. Raises SerialException if the port doesn't come back."""
+        try:
+            return action(*args, **kwargs)
+        except serial.serialutil.SerialException:
+            if not self.reconnect():
+                raise
+        self.flush_buffers()
+        return action(*args, **kwargs)
 
-    def open_port(self, port):
+    def open_port(self, port, port_id=None):
         """Opens serial port."""
         try:
             self.ser.close()
             self.ser.port = port
+            self.port_id = port_id or port
+            self.ser.baudrate = self.base_baud
+            self.bulk_baud_ok = True
             self.ser.open()
+            self.line_synced = False
         except serial.serialutil.SerialException:
             self.port_unavailable_signal.emit()
 
     def flush_buffers(self):
-        """Flushes the serial buffer by writing to the buffer and then reading
-        all the available bytes."""
-        self.ser.write("\r\n".encode())
-        time.sleep(0.5)
-        self.ser.read(self.ser.in_waiting)
+        """Discards any unread bytes. Only when the line state is unknown,
+        e.g. after a timeout or on a freshly opened port, is a newline sent
+        and the prompt waited for."""
+        self.ser.reset_input_buffer()
+        if not self.line_synced:
+            self.ser.write("\r\n".encode())
+            self.read_response(timeout=RESYNC_TIMEOUT)
 
     def close_port(self):
         """Closes serial port."""
@@ -0,0 +1,160 @@
+import re
+from sequence import TestStep
+from serialmanager import SerialManager
+
+VERSION_PATTERN = r"([0-9]+\.[0-9a-zA-Z]+)"
+BAT_V_PATTERN = r"([0-9])+.([0-9])+"
+IMEI_PATTERN = r"([0-9]){15}"
+BOARD_ID_PATTERN = r"([0-9A-Fa-f][0-9A-Fa-f]\s+){7}([0-9A-Fa-f][0-9A-Fa-f]){1}"
+SNOW_DEPTH_PATTERN = r"[0-9]+\scm"
+HEX_READY_PATTERN = r"download hex records now..."
+HEX_DONE_PATTERN = r"lock bits set"
+
+# Expected last byte of the board ID.
+BOARD_ID_FAMILY = "28"
+TAC_PORTS = ["T1", "T2", "T3", "T4"]
+UART_5V_OFF_DELAY = 10
+
+
+def parse_versions(data):
+    """Returns the (bootloader, app) versions printed after a watchdog reset,
+    or None if they can't be found."""
+    matches = re.findall(VERSION_PATTERN, data)
+    if len(matches) < 2:
+        return None
+    return (matches[0].strip("\r\n"), matches[1].strip("\r\n"))
+
+
+def parse_version(data):
+    """Returns the first version number in the data, or None."""
+    m = re.search(VERSION_PATTERN, data)
+    return m.group() if m else None
+
+
+def parse_5v(data):
+    """Returns the voltage reported by the '5V' command. Raises ValueError
+    if the reading is missing or not a number."""
+    lines = data.strip("\n").split("\n")
+    try:
+        return float(lines[1].strip("\n"))
+    except IndexError:
+        raise ValueError("Missing 5V reading")
+
+
+def parse_bat_v(data):
+    """Returns the battery voltage as a float, or None."""
+    m = re.search(BAT_V_PATTERN, data)
+    return float(m.group()) if m else None
+
+
+def parse_imei(data):
+    """Returns the 15-digit Iridium IMEI, or None."""
+    m = re.search(IMEI_PATTERN, data)
+    return m.group() if m else None
+
+
+def parse_board_id(data):
+    """Returns the 1-wire board ID, or None."""
+    m = re.search(BOARD_ID_PATTERN, data)
+    return m.group() if m else None
+
+
+def board_id_passed(board_id):
+    """Checks the board ID belongs to the expected 1-wire family."""
+    return board_id[-2:] == BOARD_ID_FAMILY
+
+
+def parse_tac_ids(data):
+    """Returns the TAC ID reported on each of the four ports. Ports with no
+    ID listed are None."""
+    lines = data.split("\n")
+    ids = [None] * len(TAC_PORTS)
+    for i, port in enumerate(TAC_PORTS):
+        for idx, line in enumerate(lines):
+            if line[0:2] == port and idx + 1 < len(lines):
+                ids[i] = lines[idx + 1][0:8]
+    return ids
+
+
+def parse_snow_depth(data):
+    """Returns the range finder distance in cm as a string, or None."""
+    m = re.search(SNOW_DEPTH_PATTERN, data)
+    # Get rid of units
+    return m.group()[:-3] if m else None
+
+
+def hex_upload_ready(data):
+    """Checks the board is waiting for hex records."""
+    return bool(re.search(HEX_READY_PATTERN, data))
+
+
+def hex_upload_done(data):
+    """Checks the board finished writing the uploaded hex file."""
+    return bool(re.search(HEX_DONE_PATTERN, data))
+
+
+def watchdog_steps():
+    """Steps run once the Xmega is programmed: reset the watchdog, record
+    the versions and turn the D505 app off."""
+    return [
+        TestStep("watchdog", "watchdog", parser=parse_versions,
+                 report_key=["xmega_bootloader", "xmega_app"],
+                 required=True, label="Resetting watchdog"),
+        TestStep("app_off", "app 0", label="Sending 'app 0' command"),
+    ]
+
+
+def uart_5v_on_steps():
+    """Turns on the UART 5 V supply so the operator can measure the 5 V
+    supply."""
+    return [TestStep("uart_5v_on", "5V 1", label="Turning on UART 5 V")]
+
+
+def uart_5v_steps():
+    """Steps that check the UART 5 V supply against the measured 5 V
+    supply and that it turns off."""
+    return [
+        TestStep("uart_5v", "5V", parser=parse_5v, limit="uart_5v",
+                 report_key="uart_5v", required=True,
+                 label="Testing supply 5v"),
+        TestStep("uart_5v_off", "5V 0", label="Turning off UART 5 V"),
+        # The supply takes a while to drop after it is switched off.
+        TestStep("off_5v", "5V", parser=parse_5v, limit="off_5v",
+                 report_key="off_5v", delay=UART_5V_OFF_DELAY,
+                 label="Testing supply 5v is off"),
+    ]
+
+
+def interface_steps(serial_num, imei, tac_ids):
+    """Xmega interface checks. The IMEI and TAC IDs are the values the
+    board is expected to report. board_id and tac-get-info are next to each
+    other so they are sent as one batch."""
+    return [
+        TestStep("serial_command", f"serial {serial_num}",
+                 label="Checking serial number"),
+        TestStep("serial",
+                 lambda sm: sm.check_serial(serial_num), retries=1,
+                 label="Checking serial number"),
+        TestStep("bat_v", "bat_v", parser=parse_bat_v, limit="bat_v",
+                 report_key="bat_v", label="Verifying battery voltage"),
+        TestStep("iridium", SerialManager.read_imei, parser=parse_imei,
+                 check=lambda value: value == imei,
+                 report_key="iridium_match", label="Checking IMEI number"),
+        TestStep("board_id", "board_id", parser=parse_board_id,
+                 check=board_id_passed, report_key="board_id",
+                 label="Verifying board id"),
+        TestStep("tac", "tac-get-info", parser=parse_tac_ids,
+                 check=lambda ids: [a == b for a, b in zip(ids, tac_ids)],
+                 report_key=["tac_connected_1", "tac_connected_2",
+                             "tac_connected_3", "tac_connected_4"],
+                 label="Checking TAC ports"),
+        TestStep("flash", SerialManager.check_flash,
+                 report_key="flash_comms", label="Checking flash"),
+        TestStep("rtc", SerialManager.check_rtc, report_key="rtc_alarm",
+                 label="Testing alarm"),
+        TestStep("gps", SerialManager.check_gps, report_key="gps_comms",
+                 label="Checking GPS connection"),
+        TestStep("snow_depth", "snow-depth", parser=parse_snow_depth,
+                 report_key="sonic_connected",
+                 label="Checking range finder"),
+    ]
@@ -1,7 +1,6 @@
 import re
 from packaging.version import LegacyVersion
 from pathlib import Path
-from PyQt5.QtWidgets import QCheckBox, QLabel
 
 def checked(lbl, chkbx):
     """Utility function for formatted a checked Qcheckbox."""
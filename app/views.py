@@ -2,16 +2,25 @@ import os
 import re
 import wizard
 import serialmanager
+import portwatcher
+import metrics
+import metricsdock
+import limitsets
 import model
 import report
+import reportindex
 import sys
 from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QPushButton, QVBoxLayout, QApplication, QLabel,
     QLineEdit, QComboBox, QGridLayout, QGroupBox, QHBoxLayout,
-    QMessageBox, QAction, QActionGroup, QFileDialog, QDialog, QMenu
+    QMessageBox, QAction, QActionGroup, QFileDialog, QDialog, QMenu,
+    QTabWidget, QCheckBox
 )
 from PyQt5.QtGui import QPixmap, QFont
-from PyQt5.QtCore import QSettings, Qt, QThread
+from PyQt5.QtCore import QSettings, Qt, QThread, QTimer, pyqtSignal
+
+if sys.platform == "win32":
+    import ctypes.wintypes
 
 
 VERSION_NUM = "1.1.7"
@@ -19,6 +28,15 @@ VERSION_NUM = "1.1.7"
 WINDOW_WIDTH = 1500
 WINDOW_HEIGHT = 800
 
+MAX_FIXTURES = 4
+# Earlier tests of a board listed on the start page.
+HISTORY_ROWS = 3
+# The history is looked up once the serial number hasn't changed for this
+# long.
+HISTORY_DELAY_MS = 300
+
+BAUD_RATES = ["115200", "230400", "460800", "921600"]
+
 ABOUT_TEXT = f"""
              PCB assembly test utility. Copyright Beaded Streams, 2019.
              v{VERSION_NUM}
@@ -30,38 +48,21 @@ class InvalidMsgType(Exception):
 
 
 
-class TestUtility(QMainWindow):
-    """Main class for the PCBA Test Utility.
-    Creates main window for the program, the file menu, status bar, and the
-    settings/configuration window.
+class Fixture(QMainWindow):
+    """A single test fixture. Owns the serial connection, model and report
+    for the board in that fixture and hosts its start page and test
+    procedure. Fixtures are shown as tabs in the TestUtility main window.
     """
-    def __init__(self):
-        super().__init__()
-        self.system_font = QApplication.font().family()
-        self.label_font = QFont(self.system_font, 12)
-        self.config_font = QFont(self.system_font, 12)
-        self.config_path_font = QFont(self.system_font, 12)
+    baud_rates_signal = pyqtSignal(int, int)
+    history_signal = pyqtSignal(str, str)
 
-        self.settings = QSettings("BeadedStream", "PCBATestUtility")
-
-        settings_defaults = {
-            "port1_tac_id": "",
-            "port2_tac_id": "",
-            "port3_tac_id": "",
-            "port4_tac_id": "",
-            "iridium_imei": "300434063218220",
-            "lat_start": "48 01 N",
-            "lat_stop": "48 04 N",
-            "lon_start": "123 02 W",
-            "lon_stop": "123 05 W",
-            "hex_files_path": "/path/to/hex/files",
-            "report_file_path": "/path/to/report/folder",
-            "atprogram_file_path": "/path/to/atprogram.exe"
-        }
-
-        for key in settings_defaults:
-            if not self.settings.value(key):
-                self.settings.setValue(key, settings_defaults[key])
+    def __init__(self, main_window, number):
+        super().__init__()
+        self.main_window = main_window
+        self.number = number
+        self.settings = main_window.settings
+        self.label_font = main_window.label_font
+        self.procedure = None
 
         self.sm = serialmanager.SerialManager()
         self.serial_thread = QThread()
@@ -70,8 +71,23 @@ class TestUtility(QMainWindow):
 
         self.m = model.Model()
         self.r = report.Report()
+        self.limit_set = main_window.limit_watcher.current
+        self.timer = metrics.BoardTimer()
 
         self.sm.port_unavailable_signal.connect(self.port_unavailable)
+        self.sm.command_timed.connect(self.timer.serial_command)
+        self.timer.updated.connect(main_window.metrics_dock.refresh)
+        self.baud_rates_signal.connect(self.sm.set_baud_rates)
+        self.set_baud_rates()
+        self.sm.reconnecting.connect(self.port_reconnecting)
+        self.sm.reconnected.connect(self.port_reconnected)
+
+        self.history_timer = QTimer(self)
+        self.history_timer.setSingleShot(True)
+        self.history_timer.setInterval(HISTORY_DELAY_MS)
+        self.history_timer.timeout.connect(self.request_history)
+        self.history_signal.connect(main_window.report_indexer.history)
+        main_window.report_indexer.history_ready.connect(self.show_history)
 
         # Part number : [serial prefix, procedure class]
         self.product_data = {
@@ -79,57 +95,16 @@ class TestUtility(QMainWindow):
             "45321-02": ["D505", wizard.D505]
         }
 
-        # Create program actions.
-        self.config = QAction("Settings", self)
-        self.config.setShortcut("Ctrl+E")
-        self.config.setStatusTip("Program Settings")
-        self.config.triggered.connect(self.configuration)
-
-        self.quit = QAction("Quit", self)
-        self.quit.setShortcut("Ctrl+Q")
-        self.quit.setStatusTip("Exit Program")
-        self.quit.triggered.connect(self.close)
-
-        self.about_tu = QAction("About PCBA Test Utility", self)
-        self.about_tu.setShortcut("Ctrl+U")
-        self.about_tu.setStatusTip("About Program")
-        self.about_tu.triggered.connect(self.about_program)
-
-        self.aboutqt = QAction("About Qt", self)
-        self.aboutqt.setShortcut("Ctrl+I")
-        self.aboutqt.setStatusTip("About Qt")
-        self.aboutqt.triggered.connect(self.about_qt)
-
-        # Create menubar
-        self.menubar = self.menuBar()
-        self.file_menu = self.menubar.addMenu("&File")
-        self.file_menu.addAction(self.config)
-        self.file_menu.addAction(self.quit)
-
-        self.serial_menu = self.menubar.addMenu("&Serial")
-        self.serial_menu.installEventFilter(self)
-        self.ports_menu = QMenu("&Ports", self)
-        self.serial_menu.addMenu(self.ports_menu)
-        self.ports_menu.aboutToShow.connect(self.populate_ports)
-        self.ports_group = QActionGroup(self)
-        self.ports_group.triggered.connect(self.connect_port)
-
-        self.help_menu = self.menubar.addMenu("&Help")
-        self.help_menu.addAction(self.about_tu)
-        self.help_menu.addAction(self.aboutqt)
-
         self.initUI()
-        self.center()
 
-    def center(self):
-        """Centers the application on the screen the mouse pointer is
-        currently on."""
-        frameGm = self.frameGeometry()
-        screen = QApplication.desktop().screenNumber(
-            QApplication.desktop().cursor().pos())
-        centerPoint = QApplication.desktop().screenGeometry(screen).center()
-        frameGm.moveCenter(centerPoint)
-        self.move(frameGm.topLeft())
+    def title(self):
+        """Returns the tab title for the fixture."""
+        title = f"Fixture {self.number}"
+        if self.sm.ser.is_open:
+            title += f" ({self.sm.ser.port})"
+        if self.procedure:
+            title += f" - {self.pcba_sn}"
+        return title
 
     def resource_path(self, relative_path):
         """Gets the path of the application relative root path to allow us
@@ -156,6 +131,10 @@ class TestUtility(QMainWindow):
         self.tester_id_input.setFixedWidth(LINE_EDIT_WIDTH)
         self.pcba_sn_input.setFixedWidth(LINE_EDIT_WIDTH)
         self.pcba_sn_input.setText("D5050")
+        self.pcba_sn_input.textChanged.connect(self.sn_changed)
+        self.history_lbl = QLabel()
+        self.history_lbl.setFixedWidth(LINE_EDIT_WIDTH + RIGHT_SPACING)
+        self.history_lbl.setWordWrap(True)
 
         self.pcba_pn_input = QComboBox()
         self.pcba_pn_input.addItem("45321-03")
@@ -194,6 +173,10 @@ class TestUtility(QMainWindow):
         hbox_sn.addWidget(self.pcba_sn_input)
         hbox_sn.addSpacing(RIGHT_SPACING)
 
+        hbox_history = QHBoxLayout()
+        hbox_history.addStretch()
+        hbox_history.addWidget(self.history_lbl)
+
         hbox_start_btn = QHBoxLayout()
         hbox_start_btn.addStretch()
         hbox_start_btn.addWidget(self.start_btn)
@@ -208,14 +191,15 @@ class TestUtility(QMainWindow):
         vbox.addLayout(hbox_pn)
         vbox.addSpacing(50)
         vbox.addLayout(hbox_sn)
+        vbox.addLayout(hbox_history)
         vbox.addSpacing(50)
         vbox.addLayout(hbox_start_btn)
         vbox.addStretch()
 
         self.central_widget.setLayout(vbox)
         self.setCentralWidget(self.central_widget)
-        self.setFixedSize(WINDOW_WIDTH, WINDOW_HEIGHT)
-        self.setWindowTitle("BeadedStream Manufacturing Test Utility")
+        self.procedure = None
+        self.main_window.update_tab_titles()
 
     def create_messagebox(self, type, title, text, info_text):
         """A helper method for creating message boxes."""
@@ -233,50 +217,63 @@ class TestUtility(QMainWindow):
             raise InvalidMsgType
         return msgbox
 
-    def about_program(self):
-        """Displays information about the program."""
-        QMessageBox.about(self, "About PCBA Test Utility", ABOUT_TEXT)
-
-    def about_qt(self):
-        """Displays information about Qt."""
-        QMessageBox.aboutQt(self, "About Qt")
-
-    def populate_ports(self):
-        """Doc string goes here."""
-        ports = serialmanager.SerialManager.scan_ports()
-        self.ports_menu.clear()
-
-        if not ports:
-            self.ports_menu.addAction("None")
-            self.sm.close_port()
-
-        for port in ports:
-            port_description = port.description
-            action = self.ports_menu.addAction(port_description)
-            port_name = port.device
-            if self.sm.is_connected(port_name):
-                action.setCheckable(True)
-                action.setChecked(True)
-            self.ports_group.addAction(action)
-
-    def connect_port(self, action: QAction):
-        """Connects to a COM port by parsing the text from a clicked QAction
-        menu object."""
-
-        p = "COM[0-9]+"
-        m = re.search(p, action.text())
-        if m:
-            port_name = m.group()
-            if (self.sm.is_connected(port_name)):
-                action.setChecked
-            self.sm.open_port(port_name)
-        else:
-            QMessageBox.warning(self, "Warning", "Invalid port selection!")
-
     def port_unavailable(self):
         """Displays warning message about unavailable port."""
         QMessageBox.warning(self, "Warning", "Port unavailable!")
 
+    def set_baud_rates(self):
+        """Applies the baud rates from the settings to the serial manager.
+        The rates are changed on the serial thread, and only between boards:
+        a fixture testing a board picks them up when the next one starts."""
+        self.baud_rates_signal.emit(int(self.settings.value("baud_rate")),
+                                    int(self.settings.value("bulk_baud_rate")))
+
+    def station_value(self, key):
+        """Returns a station setting, e.g. a TAC ID, from the board's limit
+        set if it overrides it, otherwise from the settings."""
+        return self.limit_set.settings.get(key, self.settings.value(key))
+
+    def port_reconnecting(self, attempt):
+        """Shows that the fixture's port dropped out and is being reopened."""
+        self.main_window.statusBar().showMessage(
+            f"Fixture {self.number}: port lost, reconnecting "
+            f"(attempt {attempt})...")
+
+    def port_reconnected(self, port):
+        """Shows the port the fixture reconnected on."""
+        self.main_window.statusBar().showMessage(
+            f"Fixture {self.number}: reconnected on {port}.", 5000)
+        self.main_window.update_tab_titles()
+
+    def sn_changed(self, sn):
+        """Looks up the board's earlier tests once a full serial number has
+        been entered and typing has paused."""
+        self.history_lbl.clear()
+        self.history_timer.stop()
+        if len(sn) == 8:
+            self.history_timer.start()
+
+    def request_history(self):
+        if not self.procedure:
+            self.history_signal.emit(self.settings.value("report_file_path"),
+                                     self.pcba_sn_input.text().upper())
+
+    def show_history(self, sn, history):
+        """Lists the earlier tests of the board sent by the report
+        indexer, if its serial number is still the one entered."""
+        if self.procedure or sn != self.pcba_sn_input.text().upper():
+            return
+        if not history:
+            self.history_lbl.setText("No earlier tests of this board.")
+            return
+        lines = [f"Tested {len(history)} time(s) before:"]
+        for tested_at, result, tester, failed in history[:HISTORY_ROWS]:
+            line = f"{tested_at} {result} ({tester})"
+            if failed:
+                line += f", failed: {', '.join(failed)}"
+            lines.append(line)
+        self.history_lbl.setText("\n".join(lines))
+
     def parse_values(self):
         """Parses and validates input values from the start page."""
         self.tester_id = self.tester_id_input.text().upper()
@@ -284,6 +281,14 @@ class TestUtility(QMainWindow):
         self.pcba_sn = self.pcba_sn_input.text().upper()
 
         if (self.tester_id and self.pcba_pn and self.pcba_sn):
+            # Start every board with a clean model and report. The board
+            # keeps the limit set it starts with, even if it is replaced.
+            self.limit_set = self.main_window.limit_watcher.current
+            self.m = model.Model()
+            self.m.set_limits(dict(self.limit_set.limits))
+            self.r = report.Report()
+            self.r.write_data("limits_version", self.limit_set.version,
+                              "PASS")
 
             # The serial number should be eight characters long and start with
             # the specific prefix for the given product.
@@ -310,6 +315,9 @@ class TestUtility(QMainWindow):
         """Sets up procedure layout by creating test statuses and initializing
         the appropriate board class (currently D505, potentially others in
         the future)."""
+        self.sm.recorder.board = self.pcba_sn
+        self.timer.reset(self.pcba_sn)
+        self.set_baud_rates()
         central_widget = QWidget()
 
         status_lbl_stylesheet = ("QLabel {border: 2px solid grey;"
@@ -394,7 +402,7 @@ class TestUtility(QMainWindow):
 
         # Use the product data dictionary to call the procdure class that
         # corresponds to the part number. Create an instance of it passing it
-        # the instances of test_utility, model, serial_manager and report.
+        # the fixture and its model, serial_manager and report.
         self.procedure = self.product_data[self.pcba_pn][1](self, self.m,
                                                             self.sm, self.r)
 
@@ -410,6 +418,308 @@ class TestUtility(QMainWindow):
         central_widget.setLayout(grid)
 
         self.setCentralWidget(central_widget)
+        self.main_window.update_tab_titles()
+
+    def stop(self):
+        """Stops the fixture's serial thread."""
+        self.serial_thread.quit()
+        self.serial_thread.wait()
+
+
+class TestUtility(QMainWindow):
+    """Main class for the PCBA Test Utility.
+    Creates main window for the program, the file menu, status bar, and the
+    settings/configuration window. Each test fixture connected to the
+    station gets its own tab.
+    """
+    refresh_ports_signal = pyqtSignal()
+    stop_port_watcher_signal = pyqtSignal()
+    index_reports_signal = pyqtSignal(str)
+
+    def __init__(self):
+        super().__init__()
+        self.system_font = QApplication.font().family()
+        self.label_font = QFont(self.system_font, 12)
+        self.config_font = QFont(self.system_font, 12)
+        self.config_path_font = QFont(self.system_font, 12)
+
+        self.settings = QSettings("BeadedStream", "PCBATestUtility")
+
+        settings_defaults = {
+            "port1_tac_id": "",
+            "port2_tac_id": "",
+            "port3_tac_id": "",
+            "port4_tac_id": "",
+            "iridium_imei": "300434063218220",
+            "lat_start": "48 01 N",
+            "lat_stop": "48 04 N",
+            "lon_start": "123 02 W",
+            "lon_stop": "123 05 W",
+            "hex_files_path": "/path/to/hex/files",
+            "report_file_path": "/path/to/report/folder",
+            "atprogram_file_path": "/path/to/atprogram.exe",
+            "fixture_count": "1",
+            "atprogram_chained": "false",
+            "onewire_delta": "false",
+            "baud_rate": str(serialmanager.BASE_BAUD),
+            "bulk_baud_rate": str(serialmanager.BULK_BAUD),
+            "limits_file_path": ""
+        }
+
+        for key in settings_defaults:
+            if not self.settings.value(key):
+                self.settings.setValue(key, settings_defaults[key])
+
+        # Create program actions.
+        self.config = QAction("Settings", self)
+        self.config.setShortcut("Ctrl+E")
+        self.config.setStatusTip("Program Settings")
+        self.config.triggered.connect(self.configuration)
+
+        self.quit = QAction("Quit", self)
+        self.quit.setShortcut("Ctrl+Q")
+        self.quit.setStatusTip("Exit Program")
+        self.quit.triggered.connect(self.close)
+
+        self.about_tu = QAction("About PCBA Test Utility", self)
+        self.about_tu.setShortcut("Ctrl+U")
+        self.about_tu.setStatusTip("About Program")
+        self.about_tu.triggered.connect(self.about_program)
+
+        self.aboutqt = QAction("About Qt", self)
+        self.aboutqt.setShortcut("Ctrl+I")
+        self.aboutqt.setStatusTip("About Qt")
+        self.aboutqt.triggered.connect(self.about_qt)
+
+        # Create menubar
+        self.menubar = self.menuBar()
+        self.file_menu = self.menubar.addMenu("&File")
+        self.file_menu.addAction(self.config)
+        self.file_menu.addAction(self.quit)
+
+        self.serial_menu = self.menubar.addMenu("&Serial")
+        self.serial_menu.installEventFilter(self)
+        self.ports_menu = QMenu("&Ports", self)
+        self.serial_menu.addMenu(self.ports_menu)
+        self.ports_menu.aboutToShow.connect(self.populate_ports)
+        self.export_traffic_action = QAction("Export Traffic...", self)
+        self.export_traffic_action.setStatusTip(
+            "Save the selected fixture's serial traffic for profiling")
+        self.export_traffic_action.triggered.connect(self.export_traffic)
+        self.serial_menu.addAction(self.export_traffic_action)
+        self.ports_group = QActionGroup(self)
+        self.ports_group.triggered.connect(self.connect_port)
+
+        # Ports are enumerated on the watcher's thread and cached here, so
+        # the menu opens without touching the hardware.
+        self.ports = []
+        self.port_watcher = portwatcher.PortWatcher()
+        self.port_thread = QThread()
+        self.port_watcher.moveToThread(self.port_thread)
+        self.port_watcher.ports_changed.connect(self.ports_changed)
+        self.port_thread.started.connect(self.port_watcher.start)
+        self.refresh_ports_signal.connect(self.port_watcher.refresh)
+        self.stop_port_watcher_signal.connect(self.port_watcher.stop)
+        self.port_thread.start()
+
+        self.fixtures_menu = self.menubar.addMenu("F&ixtures")
+        self.fixtures_group = QActionGroup(self)
+        self.fixtures_group.triggered.connect(
+            lambda action: self.set_fixture_count(action.data()))
+        for count in range(1, MAX_FIXTURES + 1):
+            action = self.fixtures_menu.addAction(f"{count} Fixture(s)")
+            action.setData(count)
+            action.setCheckable(True)
+            self.fixtures_group.addAction(action)
+
+        self.limit_watcher = limitsets.LimitWatcher()
+        self.limit_watcher.limits_changed.connect(self.limits_changed)
+        self.limit_watcher.load_failed.connect(self.limits_load_failed)
+        self.limit_watcher.watch(self.settings.value("limits_file_path"))
+
+        # Reports copied in, or written by older versions, are indexed in
+        # the background so they show in the board history.
+        self.report_indexer = reportindex.ReportIndexer()
+        self.index_thread = QThread()
+        self.report_indexer.moveToThread(self.index_thread)
+        self.report_indexer.indexed.connect(self.show_reports_indexed)
+        self.report_indexer.failed.connect(self.report_index_failed)
+        self.index_reports_signal.connect(self.report_indexer.index)
+        self.index_thread.start()
+        self.index_reports_signal.emit(
+            self.settings.value("report_file_path"))
+
+        self.metrics = metrics.StationMetrics()
+        self.view_menu = self.menubar.addMenu("&View")
+
+        self.help_menu = self.menubar.addMenu("&Help")
+        self.help_menu.addAction(self.about_tu)
+        self.help_menu.addAction(self.aboutqt)
+
+        self.fixtures = []
+        self.tabs = QTabWidget()
+        self.tabs.setTabBarAutoHide(True)
+
+        self.metrics_dock = metricsdock.MetricsDock(self, self.metrics)
+        self.addDockWidget(Qt.RightDockWidgetArea, self.metrics_dock)
+        self.view_menu.addAction(self.metrics_dock.toggleViewAction())
+        self.tabs.currentChanged.connect(self.metrics_dock.refresh)
+
+        self.set_fixture_count(int(self.settings.value("fixture_count")))
+
+        self.initUI()
+        self.center()
+
+    def center(self):
+        """Centers the application on the screen the mouse pointer is
+        currently on."""
+        frameGm = self.frameGeometry()
+        screen = QApplication.desktop().screenNumber(
+            QApplication.desktop().cursor().pos())
+        centerPoint = QApplication.desktop().screenGeometry(screen).center()
+        frameGm.moveCenter(centerPoint)
+        self.move(frameGm.topLeft())
+
+    def initUI(self):
+        """"Sets up the main window around the fixture tabs."""
+        self.setCentralWidget(self.tabs)
+        self.setFixedSize(WINDOW_WIDTH, WINDOW_HEIGHT)
+        self.setWindowTitle("BeadedStream Manufacturing Test Utility")
+
+    def current_fixture(self):
+        """Returns the fixture whose tab is selected."""
+        return self.tabs.currentWidget()
+
+    def set_fixture_count(self, count):
+        """Adds or removes fixture tabs. A fixture that is testing a board
+        is never removed."""
+        while len(self.fixtures) > count:
+            fixture = self.fixtures[-1]
+            if fixture.procedure:
+                QMessageBox.warning(self, "Warning",
+                                    f"Fixture {fixture.number} is testing a "
+                                    "board!")
+                break
+            self.tabs.removeTab(self.tabs.indexOf(fixture))
+            fixture.sm.close_port()
+            fixture.stop()
+            self.fixtures.pop()
+            fixture.deleteLater()
+
+        while len(self.fixtures) < count:
+            fixture = Fixture(self, len(self.fixtures) + 1)
+            self.fixtures.append(fixture)
+            self.tabs.addTab(fixture, fixture.title())
+
+        self.settings.setValue("fixture_count", str(len(self.fixtures)))
+        for action in self.fixtures_group.actions():
+            action.setChecked(action.data() == len(self.fixtures))
+
+    def update_tab_titles(self):
+        """Refreshes the tab titles with each fixture's port and board."""
+        for fixture in self.fixtures:
+            self.tabs.setTabText(self.tabs.indexOf(fixture), fixture.title())
+
+    def port_owner(self, port_name):
+        """Returns the fixture that has the port open, if any."""
+        for fixture in self.fixtures:
+            if fixture.sm.ser.is_open and fixture.sm.ser.port == port_name:
+                return fixture
+        return None
+
+    def about_program(self):
+        """Displays information about the program."""
+        QMessageBox.about(self, "About PCBA Test Utility", ABOUT_TEXT)
+
+    def about_qt(self):
+        """Displays information about Qt."""
+        QMessageBox.aboutQt(self, "About Qt")
+
+    def limits_changed(self, version):
+        """Reports that a limit set was loaded."""
+        self.statusBar().showMessage(f"Limit set {version} loaded; it "
+                                     "applies from the next board.")
+
+    def limits_load_failed(self, error):
+        """Reports a limit set file that couldn't be loaded."""
+        self.statusBar().showMessage(f"Limit set not loaded, keeping "
+                                     f"{self.limit_watcher.current.version}:"
+                                     f" {error}")
+
+    def show_reports_indexed(self, count):
+        """Reports how many reports were added to the results store."""
+        if count:
+            self.statusBar().showMessage(f"{count} report(s) indexed.", 5000)
+
+    def report_index_failed(self, error):
+        """Reports a report folder that couldn't be indexed."""
+        self.statusBar().showMessage(f"Report folder not indexed: {error}")
+
+    def ports_changed(self, ports):
+        """Caches the port list sent by the port watcher."""
+        self.ports = ports
+
+    def nativeEvent(self, event_type, message):
+        """Rescans the ports as soon as Windows reports a device being
+        plugged in or removed, rather than waiting for the next scan."""
+        if event_type == b"windows_generic_MSG":
+            msg = ctypes.wintypes.MSG.from_address(int(message))
+            if msg.message == portwatcher.WM_DEVICECHANGE:
+                self.refresh_ports_signal.emit()
+        return super().nativeEvent(event_type, message)
+
+    def populate_ports(self):
+        """Lists the available ports for the selected fixture. Ports open on
+        other fixtures are shown but can't be selected."""
+        fixture = self.current_fixture()
+        self.ports_menu.clear()
+
+        if not self.ports:
+            self.ports_menu.addAction("None")
+            fixture.sm.close_port()
+
+        for port in self.ports:
+            port_description = port.description
+            action = self.ports_menu.addAction(port_description)
+            action.setData(portwatcher.port_id(port))
+            owner = self.port_owner(port.device)
+            if owner is fixture:
+                action.setCheckable(True)
+                action.setChecked(True)
+            elif owner:
+                action.setText(f"{port_description} (Fixture {owner.number})")
+                action.setEnabled(False)
+            self.ports_group.addAction(action)
+
+    def export_traffic(self):
+        """Saves the selected fixture's recorded serial traffic as JSON
+        lines, for recorder.py to summarise."""
+        fixture = self.current_fixture()
+        file_path = QFileDialog.getSaveFileName(
+            self,
+            "Export serial traffic.",
+            f"traffic-fixture{fixture.number}.jsonl",
+            "JSON lines (*.jsonl)"
+        )[0]
+        if not file_path:
+            return
+        try:
+            fixture.sm.recorder.export(file_path)
+        except OSError as e:
+            QMessageBox.warning(self, "Warning",
+                                f"Couldn't save the traffic: {e}")
+
+    def connect_port(self, action: QAction):
+        """Connects the selected fixture to the port of the clicked QAction,
+        found by the USB VID/PID/serial number stored in its data."""
+        ports = {portwatcher.port_id(port): port for port in self.ports}
+        port = ports.get(action.data())
+        if port:
+            fixture = self.current_fixture()
+            fixture.sm.open_port(port.device, action.data())
+            self.update_tab_titles()
+        else:
+            QMessageBox.warning(self, "Warning", "Invalid port selection!")
 
     def configuration(self):
         """Sets up configuration/settings window elements."""
@@ -478,6 +788,29 @@ class TestUtility(QMainWindow):
         location_limits_group = QGroupBox("Location Limits")
         location_limits_group.setLayout(location_layout)
 
+        baud_lbl = QLabel("Console:")
+        baud_lbl.setFont(self.config_font)
+        self.baud_rate = QComboBox()
+        self.baud_rate.setEditable(True)
+        self.baud_rate.addItems(BAUD_RATES)
+        self.baud_rate.setCurrentText(self.settings.value("baud_rate"))
+        bulk_baud_lbl = QLabel("Bulk transfers:")
+        bulk_baud_lbl.setFont(self.config_font)
+        self.bulk_baud_rate = QComboBox()
+        self.bulk_baud_rate.setEditable(True)
+        self.bulk_baud_rate.addItems(BAUD_RATES)
+        self.bulk_baud_rate.setCurrentText(
+            self.settings.value("bulk_baud_rate"))
+
+        baud_layout = QGridLayout()
+        baud_layout.addWidget(baud_lbl, 0, 0)
+        baud_layout.addWidget(self.baud_rate, 0, 1)
+        baud_layout.addWidget(bulk_baud_lbl, 1, 0)
+        baud_layout.addWidget(self.bulk_baud_rate, 1, 1)
+
+        baud_group = QGroupBox("Baud Rates")
+        baud_group.setLayout(baud_layout)
+
         self.hex_btn = QPushButton("[...]")
         self.hex_btn.setFixedWidth(FILE_BTN_WIDTH)
         self.hex_btn.clicked.connect(self.set_hex_dir)
@@ -506,6 +839,26 @@ class TestUtility(QMainWindow):
             "atprogram_file_path"))
         self.atprogram_path_lbl.setFont(self.config_path_font)
         self.atprogram_path_lbl.setStyleSheet("QLabel {color: blue}")
+        self.atprogram_chained = QCheckBox("Program in a single atprogram "
+                                           "call")
+        self.atprogram_chained.setFont(self.config_font)
+        self.atprogram_chained.setChecked(
+            self.settings.value("atprogram_chained") == "true")
+        self.onewire_delta = QCheckBox("Upload only changed 1-wire master "
+                                       "pages")
+        self.onewire_delta.setFont(self.config_font)
+        self.onewire_delta.setChecked(
+            self.settings.value("onewire_delta") == "true")
+
+        self.limits_btn = QPushButton("[...]")
+        self.limits_btn.setFixedWidth(FILE_BTN_WIDTH)
+        self.limits_btn.clicked.connect(self.choose_limits_file)
+        self.limits_lbl = QLabel("Select limit set file (none for built-in "
+                                 "limits).")
+        self.limits_lbl.setFont(self.config_font)
+        self.limits_path_lbl = QLabel(self.settings.value("limits_file_path"))
+        self.limits_path_lbl.setFont(self.config_path_font)
+        self.limits_path_lbl.setStyleSheet("QLabel {color: blue}")
 
         save_loc_layout = QGridLayout()
         save_loc_layout.addWidget(self.hex_lbl, 0, 0)
@@ -517,6 +870,11 @@ class TestUtility(QMainWindow):
         save_loc_layout.addWidget(self.atprogram_lbl, 4, 0)
         save_loc_layout.addWidget(self.atprogram_btn, 4, 1)
         save_loc_layout.addWidget(self.atprogram_path_lbl, 5, 0)
+        save_loc_layout.addWidget(self.atprogram_chained, 6, 0)
+        save_loc_layout.addWidget(self.onewire_delta, 7, 0)
+        save_loc_layout.addWidget(self.limits_lbl, 8, 0)
+        save_loc_layout.addWidget(self.limits_btn, 8, 1)
+        save_loc_layout.addWidget(self.limits_path_lbl, 9, 0)
 
         save_loc_group = QGroupBox("Save Locations")
         save_loc_group.setLayout(save_loc_layout)
@@ -535,6 +893,7 @@ class TestUtility(QMainWindow):
         hbox_top.addWidget(port_group)
         hbox_top.addWidget(iridium_group)
         hbox_top.addWidget(location_limits_group)
+        hbox_top.addWidget(baud_group)
 
         hbox_bottom = QHBoxLayout()
         hbox_bottom.addStretch()
@@ -581,6 +940,17 @@ class TestUtility(QMainWindow):
         )[0]
         self.atprogram_path_lbl.setText(atprogram_file_path)
 
+    def choose_limits_file(self):
+        """Opens file dialog for selecting the limit set file."""
+
+        limits_file_path = QFileDialog.getOpenFileName(
+            self,
+            "Select limit set file.",
+            "",
+            "Limit set (*.json)"
+        )[0]
+        self.limits_path_lbl.setText(limits_file_path)
+
     def cancel_settings(self):
         """Close the settings widget without applying changes."""
 
@@ -609,15 +979,40 @@ class TestUtility(QMainWindow):
                                     "E.g.: 000a5296")
                 return
 
+        for baud in (self.baud_rate, self.bulk_baud_rate):
+            if not baud.currentText().isdigit():
+                QMessageBox.warning(self.settings_widget, "Warning!",
+                                    "Bad baud rate!\n"
+                                    "E.g.: 115200")
+                return
+
         self.settings.setValue("iridium_imei", self.iridium_imei.text())
         self.settings.setValue("lat_start", self.lat_start.text())
         self.settings.setValue("lat_stop", self.lat_stop.text())
         self.settings.setValue("lon_start", self.lon_start.text())
         self.settings.setValue("lon_stop", self.lon_stop.text())
         self.settings.setValue("hex_files_path", self.hex_path_lbl.text())
+        if self.report_path_lbl.text() != self.settings.value(
+                "report_file_path"):
+            self.index_reports_signal.emit(self.report_path_lbl.text())
         self.settings.setValue("report_file_path", self.report_path_lbl.text())
         self.settings.setValue("atprogram_file_path",
                                self.atprogram_path_lbl.text())
+        self.settings.setValue("atprogram_chained",
+                               "true" if self.atprogram_chained.isChecked()
+                               else "false")
+        self.settings.setValue("onewire_delta",
+                               "true" if self.onewire_delta.isChecked()
+                               else "false")
+        self.settings.setValue("limits_file_path",
+                               self.limits_path_lbl.text())
+        self.limit_watcher.watch(self.limits_path_lbl.text())
+        self.settings.setValue("baud_rate", self.baud_rate.currentText())
+        self.settings.setValue("bulk_baud_rate",
+                               self.bulk_baud_rate.currentText())
+        for fixture in self.fixtures:
+            if not fixture.procedure:
+                fixture.set_baud_rates()
 
         QMessageBox.information(self.settings_widget, "Information",
                                 "Settings applied!")
@@ -636,8 +1031,13 @@ class TestUtility(QMainWindow):
                                             QMessageBox.No)
 
         if confirmation == QMessageBox.Yes:
-            self.serial_thread.quit()
-            self.serial_thread.wait()
+            for fixture in self.fixtures:
+                fixture.stop()
+            self.stop_port_watcher_signal.emit()
+            self.port_thread.quit()
+            self.port_thread.wait()
+            self.index_thread.quit()
+            self.index_thread.wait()
             event.accept()
         else:
             event.ignore()
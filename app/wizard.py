@@ -15,6 +15,7 @@ from interfaces import XmegaInterfaces
 from uartpower import UartPower
 from deepsleep import DeepSleep
 from final import FinalPage
+from scheduler import Scheduler
 
 
 class InvalidType(Exception):
@@ -44,6 +45,9 @@ class D505(QWizard):
 
         self.button(QWizard.NextButton).setEnabled(False)
 
+        # Lets the pages overlap work that doesn't depend on each other.
+        self.scheduler = Scheduler()
+
         # This fixes a bug in the default style which hides the QWizard
         # buttons until the window is resized.
         self.setWizardStyle(0)
@@ -75,6 +79,13 @@ class D505(QWizard):
 
         self.tu = test_utility
         self.report = report
+        self.currentIdChanged.connect(self.page_changed)
+
+    def page_changed(self, page_id):
+        """Times each page from when it is shown until the next one is."""
+        page = self.page(page_id)
+        if page:
+            self.tu.timer.enter_page(page.title() or type(page).__name__)
 
     def abort(self):
         """Prompt user for confirmation and abort test if confirmed."""
@@ -12,6 +12,7 @@ def test_success(qtbot):
     qtbot.addWidget(gui)
     gui.show()
     qtbot.wait_for_window_shown(gui)
+    fixture = gui.current_fixture()
 
     tester_id = str(random.randint(1, 100000))
 
@@ -19,19 +20,19 @@ def test_success(qtbot):
         r"C:\Users\samuel\Documents\BeadedStream GUI\test_reports"
     )
 
-    qtbot.mouseClick(gui.start_btn, Qt.LeftButton)
-    qtbot.mouseClick(gui.err_msg.buttons()[0], Qt.LeftButton)
-    assert gui.err_msg.informativeText() == "Missing value!"
+    qtbot.mouseClick(fixture.start_btn, Qt.LeftButton)
+    qtbot.mouseClick(fixture.err_msg.buttons()[0], Qt.LeftButton)
+    assert fixture.err_msg.informativeText() == "Missing value!"
 
-    qtbot.keyClicks(gui.tester_id_input, tester_id)
-    qtbot.mouseClick(gui.start_btn, Qt.LeftButton)
-    qtbot.mouseClick(gui.err_msg.buttons()[0], Qt.LeftButton)
-    assert gui.err_msg.informativeText() == "Missing value!"
+    qtbot.keyClicks(fixture.tester_id_input, tester_id)
+    qtbot.mouseClick(fixture.start_btn, Qt.LeftButton)
+    qtbot.mouseClick(fixture.err_msg.buttons()[0], Qt.LeftButton)
+    assert fixture.err_msg.informativeText() == "Missing value!"
 
-    qtbot.keyClicks(gui.pcba_sn_input, "654321")
-    qtbot.mouseClick(gui.start_btn, Qt.LeftButton)
-    qtbot.mouseClick(gui.err_msg.buttons()[0], Qt.LeftButton)
-    assert gui.err_msg.informativeText() == "Bad serial number!"
+    qtbot.keyClicks(fixture.pcba_sn_input, "654321")
+    qtbot.mouseClick(fixture.start_btn, Qt.LeftButton)
+    qtbot.mouseClick(fixture.err_msg.buttons()[0], Qt.LeftButton)
+    assert fixture.err_msg.informativeText() == "Bad serial number!"
 
     # Manually populate serial ports since it's difficult to simulate clicking
     # on a menu widget
@@ -41,99 +42,99 @@ def test_success(qtbot):
     # Trigger action so the port gets connected
     gui.ports_group.actions()[0].trigger()
 
-    gui.pcba_sn_input.clear()
-    qtbot.keyClicks(gui.pcba_sn_input, "D5050076")
-    qtbot.mouseClick(gui.start_btn, Qt.LeftButton)
+    fixture.pcba_sn_input.clear()
+    qtbot.keyClicks(fixture.pcba_sn_input, "D5050076")
+    qtbot.mouseClick(fixture.start_btn, Qt.LeftButton)
 
     # SETUP
-    # gui.procedure.setup_page.step_a_chkbx.click()
+    # fixture.procedure.setup_page.step_a_chkbx.click()
     qtbot.wait(2000)
-    qtbot.mouseClick(gui.procedure.setup_page.step_a_chkbx, Qt.LeftButton)
+    qtbot.mouseClick(fixture.procedure.setup_page.step_a_chkbx, Qt.LeftButton)
     qtbot.wait(5000)
-    qtbot.keyClicks(gui.procedure.setup_page.step_b_input, "6.0")
-    qtbot.keyClicks(gui.procedure.setup_page.step_c_input, "4.0")
-    qtbot.keyClicks(gui.procedure.setup_page.step_d_input, "2.0")
+    qtbot.keyClicks(fixture.procedure.setup_page.step_b_input, "6.0")
+    qtbot.keyClicks(fixture.procedure.setup_page.step_c_input, "4.0")
+    qtbot.keyClicks(fixture.procedure.setup_page.step_d_input, "2.0")
     qtbot.wait(2000)
 
-    qtbot.mouseClick(gui.procedure.setup_page.submit_button, Qt.LeftButton)
+    qtbot.mouseClick(fixture.procedure.setup_page.submit_button, Qt.LeftButton)
 
     qtbot.wait(2000)
 
-    qtbot.mouseClick(gui.procedure.button(QWizard.NextButton),
+    qtbot.mouseClick(fixture.procedure.button(QWizard.NextButton),
                      Qt.LeftButton)
     qtbot.wait(2000)
 
     # WATCHDOG
-    qtbot.mouseClick(gui.procedure.watchdog_page.batch_chkbx, Qt.LeftButton)
+    qtbot.mouseClick(fixture.procedure.watchdog_page.batch_chkbx, Qt.LeftButton)
     qtbot.wait(25000)
-    qtbot.mouseClick(gui.procedure.watchdog_page.xmega_disconnect_chkbx,
+    qtbot.mouseClick(fixture.procedure.watchdog_page.xmega_disconnect_chkbx,
                      Qt.LeftButton)
     qtbot.wait(21000)
-    qtbot.keyClicks(gui.procedure.watchdog_page.supply_5v_input, "5.0")
+    qtbot.keyClicks(fixture.procedure.watchdog_page.supply_5v_input, "5.0")
     qtbot.wait(2000)
-    qtbot.mouseClick(gui.procedure.watchdog_page.supply_5v_input_btn,
+    qtbot.mouseClick(fixture.procedure.watchdog_page.supply_5v_input_btn,
                      Qt.LeftButton)
     qtbot.wait(25000)
-    qtbot.mouseClick(gui.procedure.button(QWizard.NextButton),
+    qtbot.mouseClick(fixture.procedure.button(QWizard.NextButton),
                      Qt.LeftButton)
 
     # ONE WIRE PROGRAMMING
     qtbot.wait(45000)
-    qtbot.mouseClick(gui.procedure.button(QWizard.NextButton),
+    qtbot.mouseClick(fixture.procedure.button(QWizard.NextButton),
                      Qt.LeftButton)
 
     qtbot.wait(2000)
 
     # BLE
-    qtbot.mouseClick(gui.procedure.cypress_page.ble_btn_pass, Qt.LeftButton)
-    gui.procedure.cypress_page.psoc_disconnect_chkbx.click()
-    gui.procedure.cypress_page.pwr_cycle_chkbx.click()
-    qtbot.mouseClick(gui.procedure.cypress_page.bt_comm_btn_pass,
+    qtbot.mouseClick(fixture.procedure.cypress_page.ble_btn_pass, Qt.LeftButton)
+    fixture.procedure.cypress_page.psoc_disconnect_chkbx.click()
+    fixture.procedure.cypress_page.pwr_cycle_chkbx.click()
+    qtbot.mouseClick(fixture.procedure.cypress_page.bt_comm_btn_pass,
                      Qt.LeftButton)
     qtbot.wait(3000)
 
-    qtbot.mouseClick(gui.procedure.button(QWizard.NextButton),
+    qtbot.mouseClick(fixture.procedure.button(QWizard.NextButton),
                      Qt.LeftButton)
 
     # XMEGA INTERFACE TESTING
     qtbot.wait(80000)
 
-    qtbot.mouseClick(gui.procedure.button(QWizard.NextButton),
+    qtbot.mouseClick(fixture.procedure.button(QWizard.NextButton),
                      Qt.LeftButton)
 
     qtbot.wait(2000)
 
     # UART
-    gui.procedure.uart_page.uart_pwr_chkbx.click()
+    fixture.procedure.uart_page.uart_pwr_chkbx.click()
     qtbot.wait(3000)
-    gui.procedure.uart_page.red_led_chkbx.click()
+    fixture.procedure.uart_page.red_led_chkbx.click()
     qtbot.wait(1000)
-    gui.procedure.uart_page.leds_chkbx.click()
+    fixture.procedure.uart_page.leds_chkbx.click()
     qtbot.wait(2000)
 
-    qtbot.mouseClick(gui.procedure.button(QWizard.NextButton),
+    qtbot.mouseClick(fixture.procedure.button(QWizard.NextButton),
                      Qt.LeftButton)
 
     qtbot.wait(2000)
 
     # DEEP SLEEP / SOLAR
-    gui.procedure.deep_sleep_page.ble_chkbx.click()
-    qtbot.keyClicks(gui.procedure.deep_sleep_page.input_i_input, "63")
-    gui.procedure.deep_sleep_page.solar_chkbx.click()
+    fixture.procedure.deep_sleep_page.ble_chkbx.click()
+    qtbot.keyClicks(fixture.procedure.deep_sleep_page.input_i_input, "63")
+    fixture.procedure.deep_sleep_page.solar_chkbx.click()
     qtbot.wait(1000)
-    qtbot.keyClicks(gui.procedure.deep_sleep_page.solar_v_input, "6.0")
-    qtbot.keyClicks(gui.procedure.deep_sleep_page.solar_i_input, "53")
+    qtbot.keyClicks(fixture.procedure.deep_sleep_page.solar_v_input, "6.0")
+    qtbot.keyClicks(fixture.procedure.deep_sleep_page.solar_i_input, "53")
     qtbot.wait(1000)
-    qtbot.mouseClick(gui.procedure.deep_sleep_page.submit_button,
+    qtbot.mouseClick(fixture.procedure.deep_sleep_page.submit_button,
                      Qt.LeftButton)
 
     qtbot.wait(2000)
-    qtbot.mouseClick(gui.procedure.button(QWizard.NextButton),
+    qtbot.mouseClick(fixture.procedure.button(QWizard.NextButton),
                      Qt.LeftButton)
 
     qtbot.wait(5000)
 
-    qtbot.mouseClick(gui.procedure.button(QWizard.FinishButton), Qt.LeftButton)
+    qtbot.mouseClick(fixture.procedure.button(QWizard.FinishButton), Qt.LeftButton)
 
     qtbot.wait(3000)
 
@@ -0,0 +1,198 @@
+import os
+import time
+import pytest
+import hexfile
+
+
+def write_hex(path, records):
+    """Writes (type, address, data) records, ending with an EOF record."""
+    with open(path, "w", newline="") as f:
+        for rec_type, address, data in records:
+            f.write(hexfile.make_record(rec_type, address, data))
+        f.write(hexfile.make_record(hexfile.EOF, 0, b""))
+    return path
+
+
+def test_parse_record():
+    assert hexfile.parse_record(b":0300300002337A1E\r\n") == (
+        hexfile.DATA, 0x0030, b"\x02\x33\x7a")
+    assert hexfile.parse_record(b":00000001FF") == (hexfile.EOF, 0, b"")
+
+
+def test_parse_record_checksum():
+    with pytest.raises(ValueError, match="line 3"):
+        hexfile.parse_record(b":0300300002337A1F\r\n", 3)
+    with pytest.raises(ValueError):
+        hexfile.parse_record(b"0300300002337A1E")
+    with pytest.raises(ValueError):
+        hexfile.parse_record(b":0400300002337A1E")
+    with pytest.raises(ValueError):
+        hexfile.parse_record(b":03003000XX337A1E")
+
+
+def test_make_record():
+    record = hexfile.make_record(hexfile.DATA, 0x0030, b"\x02\x33\x7a")
+    assert record == ":0300300002337A1E\r\n"
+    assert hexfile.parse_record(record.encode()) == (
+        hexfile.DATA, 0x0030, b"\x02\x33\x7a")
+
+
+def test_hex_records(tmp_path):
+    path = write_hex(tmp_path / "a.hex", [
+        (hexfile.DATA, 0x0000, b"\x01\x02"),
+        (hexfile.EXTENDED_LINEAR_ADDRESS, 0, b"\x00\x01"),
+        (hexfile.DATA, 0x0010, b"\x03"),
+    ])
+    records = hexfile.HexRecords(path)
+    assert len(records) == 4
+    assert list(records.types) == [hexfile.DATA,
+                                   hexfile.EXTENDED_LINEAR_ADDRESS,
+                                   hexfile.DATA, hexfile.EOF]
+    assert records.addresses[0] == 0x0000
+    assert records.addresses[2] == 0x10010
+    assert bytes(records.record_data(0)) == b"\x01\x02"
+    assert bytes(records.record(3)) == b":00000001FF\r\n"
+    assert b"".join(records) == path.read_bytes()
+    assert records.total_bytes == len(path.read_bytes())
+
+
+def test_hex_records_bad_line(tmp_path):
+    path = tmp_path / "bad.hex"
+    path.write_bytes(b":0300300002337A1E\r\n\r\n:0300300002337A1F\r\n")
+    with pytest.raises(ValueError, match="line 3"):
+        hexfile.HexRecords(path)
+
+
+def test_load_caches_until_changed(tmp_path):
+    path = write_hex(tmp_path / "a.hex", [(hexfile.DATA, 0, b"\x01")])
+    records = hexfile.load(path)
+    assert hexfile.load(path) is records
+
+    write_hex(path, [(hexfile.DATA, 0, b"\x01\x02")])
+    reloaded = hexfile.load(path)
+    assert reloaded is not records
+    assert bytes(reloaded.record_data(0)) == b"\x01\x02"
+
+
+def test_merge(tmp_path):
+    boot = write_hex(tmp_path / "boot.hex", [
+        (hexfile.DATA, 0x0000, b"\x01\x02"),
+        (hexfile.DATA, 0x0002, b"\x03"),
+    ])
+    app = write_hex(tmp_path / "app.hex", [
+        (hexfile.DATA, 0x0001, b"\x02\x03\x04"),
+        (hexfile.DATA, 0x0100, b"\xaa"),
+    ])
+    assert hexfile.merge([boot, app]) == [
+        (0x0000, bytearray(b"\x01\x02\x03\x04")),
+        (0x0100, bytearray(b"\xaa")),
+    ]
+
+
+def test_merge_conflict(tmp_path):
+    a = write_hex(tmp_path / "a.hex", [(hexfile.DATA, 0x0000, b"\x01\x02")])
+    b = write_hex(tmp_path / "b.hex", [(hexfile.DATA, 0x0001, b"\x03")])
+    with pytest.raises(ValueError, match="0x1"):
+        hexfile.merge([a, b])
+
+
+def test_write_image(tmp_path):
+    segments = [(0x0000, bytearray(range(40))),
+                (0x1FFF8, bytearray(b"\xee" * 16))]
+    image = tmp_path / "image.hex"
+    hexfile.write_image(segments, image)
+    assert hexfile.merge([image]) == segments
+    records = hexfile.load(image)
+    assert max(len(records.record_data(i))
+               for i in range(len(records))) == hexfile.RECORD_SIZE
+
+
+def test_cached_image(tmp_path):
+    a = write_hex(tmp_path / "a.hex", [(hexfile.DATA, 0x0000, b"\x01")])
+    b = write_hex(tmp_path / "b.hex", [(hexfile.DATA, 0x0010, b"\x02")])
+    image = hexfile.cached_image([a, b])
+    assert hexfile.merge([image]) == [(0x0000, bytearray(b"\x01")),
+                                      (0x0010, bytearray(b"\x02"))]
+    assert hexfile.cached_image([a, b]) == image
+
+    write_hex(b, [(hexfile.DATA, 0x0010, b"\x03\x04")])
+    rebuilt = hexfile.cached_image([a, b])
+    assert rebuilt != image
+    assert hexfile.merge([rebuilt])[1] == (0x0010, bytearray(b"\x03\x04"))
+    assert [p.name for p in tmp_path.glob("*.tmp")] == []
+
+    # The old image may still be in use by another fixture, so it is only
+    # deleted once it hasn't been used for a day.
+    assert image.exists()
+    old = time.time() - hexfile.IMAGE_MAX_AGE - 60
+    os.utime(image, (old, old))
+    write_hex(b, [(hexfile.DATA, 0x0010, b"\x05\x06\x07")])
+    hexfile.cached_image([a, b])
+    assert not image.exists()
+    assert rebuilt.exists()
+
+
+def test_cached_image_built_elsewhere(tmp_path):
+    a = write_hex(tmp_path / "a.hex", [(hexfile.DATA, 0x0000, b"\x01")])
+    image = hexfile.cached_image([a])
+    mtime = image.stat().st_mtime_ns
+    (tmp_path / hexfile.MANIFEST_NAME).unlink()
+    assert hexfile.cached_image([a]) == image
+    assert image.stat().st_mtime_ns >= mtime
+    assert hexfile.read_manifest(tmp_path)["image"] == image.name
+
+
+def test_page_hashes(tmp_path):
+    path = write_hex(tmp_path / "a.hex", [
+        (hexfile.DATA, 0x0000, b"\x01" * 4),
+        (hexfile.DATA, 0x000E, b"\x02" * 4),
+    ])
+    pages = hexfile.page_hashes(path, page_size=16)
+    assert sorted(pages) == ["0", "16"]
+
+
+def test_delta_records(tmp_path):
+    records = [
+        (hexfile.DATA, 0x0000, b"\x01" * 16),
+        (hexfile.DATA, 0x0010, b"\x02" * 16),
+        (hexfile.EXTENDED_LINEAR_ADDRESS, 0, b"\x00\x01"),
+        (hexfile.DATA, 0x0000, b"\x03" * 16),
+    ]
+    old = write_hex(tmp_path / "old.hex", records)
+    old_pages = hexfile.page_hashes(old, page_size=16)
+
+    records[3] = (hexfile.DATA, 0x0000, b"\x04" * 16)
+    new = write_hex(tmp_path / "new.hex", records)
+    delta = hexfile.delta_records(new, old_pages, page_size=16)
+    assert [bytes(record) for record in delta] == [
+        hexfile.make_record(hexfile.EXTENDED_LINEAR_ADDRESS, 0,
+                            b"\x00\x01").encode(),
+        hexfile.make_record(hexfile.DATA, 0x0000, b"\x04" * 16).encode(),
+        hexfile.make_record(hexfile.EOF, 0, b"").encode(),
+    ]
+
+    assert len(hexfile.delta_records(new, {}, page_size=16)) == 5
+    assert [bytes(record) for record in
+            hexfile.delta_records(old, old_pages, page_size=16)] == [
+        hexfile.make_record(hexfile.EOF, 0, b"").encode()]
+
+
+def test_delta_records_dropped_page(tmp_path):
+    old = write_hex(tmp_path / "old.hex", [
+        (hexfile.DATA, 0x0000, b"\x01" * 16),
+        (hexfile.DATA, 0x0010, b"\x02" * 16),
+    ])
+    old_pages = hexfile.page_hashes(old, page_size=16)
+    new = write_hex(tmp_path / "new.hex", [
+        (hexfile.DATA, 0x0000, b"\x01" * 16)])
+    # The page at 0x10 would keep the old code, so only a full upload works.
+    assert hexfile.delta_records(new, old_pages, page_size=16) is None
+
+
+def test_save_pages(tmp_path):
+    path = write_hex(tmp_path / "a.hex", [(hexfile.DATA, 0, b"\x01")])
+    assert hexfile.read_page_index(tmp_path) == {}
+    hexfile.save_pages(tmp_path, "1.2a", path)
+    assert hexfile.read_page_index(tmp_path) == {
+        "1.2a": {"page_size": hexfile.PAGE_SIZE,
+                 "pages": hexfile.page_hashes(path)}}
@@ -0,0 +1,62 @@
+import json
+import pytest
+import limitsets
+import model
+
+
+def write_set(path, data):
+    path.write_text(json.dumps(data))
+    return path
+
+
+def test_parse(tmp_path):
+    path = write_set(tmp_path / "limits.json", {
+        "version": "2026.10-1",
+        "limits": {"v_input_min": 5.2, "bat_v_tolerance": 1},
+        "settings": {"iridium_imei": 300434063218220},
+    })
+    limit_set = limitsets.parse(path)
+    assert limit_set.version == "2026.10-1"
+    assert limit_set.limits == dict(model.Model().limits, v_input_min=5.2,
+                                    bat_v_tolerance=1)
+    assert limit_set.settings == {"iridium_imei": "300434063218220"}
+    assert limit_set.path == str(path)
+
+
+@pytest.mark.parametrize("data, error", [
+    ({"limits": {}}, "no version"),
+    ([], "no version"),
+    ({"version": "1", "limits": {"no_such_limit": 1.0}}, "unknown limit"),
+    ({"version": "1", "limits": {"v_input_min": "5.2"}}, "isn't a number"),
+    ({"version": "1", "limits": {"v_input_min": True}}, "isn't a number"),
+    ({"version": "1", "settings": {"lat_start": "48 01 N"}},
+     "unknown setting"),
+])
+def test_parse_invalid(tmp_path, data, error):
+    path = write_set(tmp_path / "limits.json", data)
+    with pytest.raises(limitsets.InvalidLimitSet, match=error):
+        limitsets.parse(path)
+
+
+def test_parse_bad_json(tmp_path):
+    path = tmp_path / "limits.json"
+    path.write_text("{")
+    with pytest.raises(limitsets.InvalidLimitSet, match="limits.json"):
+        limitsets.parse(path)
+    with pytest.raises(OSError):
+        limitsets.parse(tmp_path / "missing.json")
+
+
+def test_load_caches_until_changed(tmp_path):
+    path = write_set(tmp_path / "limits.json", {"version": "1"})
+    limit_set = limitsets.load(path)
+    assert limitsets.load(path) is limit_set
+    write_set(path, {"version": "22"})
+    assert limitsets.load(path).version == "22"
+
+
+def test_built_in():
+    limit_set = limitsets.built_in()
+    assert limit_set.version == limitsets.BUILT_IN_VERSION
+    assert limit_set.limits == model.Model().limits
+    assert limit_set.settings == {}
@@ -1,3 +1,4 @@
+import pytest
 import model
 
 m = model.Model()
@@ -48,3 +49,46 @@ def test_limits():
 
     for key, value in bad_vi_values.items():
         assert not m.compare_to_limit(key, value)
+
+
+def test_limit_table():
+    m = model.Model()
+    assert m.compare_to_limit("input_v", 6.0)
+    assert m.compare_to_limit("bat_v", 6.5)
+    assert not m.compare_to_limit("bat_v", 6.7)
+    assert m.compare_to_limit("input_i", 0.5)
+    assert not m.compare_to_limit("input_i", 80.0)
+    assert not m.compare_to_limit("off_5v", 0.35)
+    assert m.compare_to_limit("solar_i_min", 40)
+
+
+def test_limit_dependencies():
+    m = model.Model()
+    with pytest.raises(model.ValueNotSet):
+        m.compare_to_limit("uart_5v", 5.0)
+    assert m.compare_to_limit("supply_5v", 5.0)
+    assert m.compare_to_limit("uart_5v", 5.1)
+    assert not m.compare_to_limit("uart_5v", 5.15)
+    with pytest.raises(model.InvalidLimit):
+        m.compare_to_limit("no_such_limit", 1.0)
+
+
+def test_check_batch():
+    m = model.Model()
+    records = [
+        {"input_v": 6.0, "bat_v": 6.1, "supply_5v": 5.0, "uart_5v": 5.0,
+         "pcba_sn": "D5050076"},
+        {"input_v": 4.0, "uart_5v": 5.0},
+    ]
+    assert m.check_batch(records) == [
+        {"input_v": True, "bat_v": True, "supply_5v": True, "uart_5v": True},
+        {"input_v": False, "uart_5v": None},
+    ]
+
+
+def test_set_limits():
+    m = model.Model()
+    limits = dict(m.limits, v_input_max=8.0)
+    assert not m.compare_to_limit("input_v", 7.5)
+    m.set_limits(limits)
+    assert m.compare_to_limit("input_v", 7.5)
@@ -0,0 +1,56 @@
+import os
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import pytest
+import serialmanager
+from onewire import OneWireMaster
+from PyQt5.QtCore import QSettings
+from PyQt5.QtWidgets import QApplication, QWizard
+
+app = QApplication.instance() or QApplication([])
+
+
+class FakeTestUtility:
+    def __init__(self, hex_files_path):
+        self.settings = QSettings("BeadedStream", "PCBATestUtilityTest")
+        self.settings.setValue("hex_files_path", str(hex_files_path))
+
+
+@pytest.fixture
+def hex_dir(tmp_path):
+    (tmp_path / "1-wire-master-1.2a.hex").write_text(":00000001FF\n")
+    return tmp_path
+
+
+def test_initialize_page(hex_dir):
+    sm = serialmanager.SerialManager()
+    d505 = QWizard()
+    page = OneWireMaster(d505, FakeTestUtility(hex_dir), sm, None)
+
+    page.initializePage()
+    assert not page.isComplete()
+    assert page.one_wire_master_ver == "1.2a"
+
+    # Shown again, e.g. when the board is reprogrammed.
+    page.initializePage()
+
+
+def test_upload_finished_once(hex_dir):
+    sm = serialmanager.SerialManager()
+    d505 = QWizard()
+    page = OneWireMaster(d505, FakeTestUtility(hex_dir), sm, None)
+    finished = []
+    page.progress.finish = finished.append
+    others = []
+    sm.hex_upload_finished.connect(lambda *args: others.append(args))
+
+    # Shown twice before any upload finished.
+    page.initializePage()
+    page.initializePage()
+    sm.hex_upload_finished.emit(1000, 0.5, True)
+    assert finished == ["Uploaded 1000 bytes (2.0 kB/s, acknowledged). . ."]
+
+    # Only the page's own connection is dropped.
+    sm.hex_upload_finished.emit(1000, 0.5, True)
+    assert len(finished) == 1
+    assert len(others) == 2
@@ -0,0 +1,73 @@
+import pytest
+import recorder
+from recorder import Event
+
+
+def test_written():
+    r = recorder.TrafficRecorder()
+    r.board = "D5050076"
+    r.written(b"bat_v\r\n")
+    r.read(12)
+    r.read(0)
+    r.written(b"\n")
+    r.written(b":00000001FF\r\n")
+    r.written(b":00000001FF\r\n")
+    assert [(e.direction, e.size, e.command, e.start) for e in r.events] == [
+        ("w", 7, "bat_v", True),
+        ("r", 12, "bat_v", False),
+        ("w", 1, recorder.RESYNC, True),
+        ("w", 13, recorder.HEX_RECORDS, True),
+        ("w", 13, recorder.HEX_RECORDS, False),
+    ]
+    assert all(e.board == "D5050076" for e in r.events)
+
+    r.enabled = False
+    r.written(b"bat_v\r\n")
+    assert len(r.events) == 5
+
+
+def test_ring_size():
+    r = recorder.TrafficRecorder(size=2)
+    for command in (b"a\n", b"b\n", b"c\n"):
+        r.written(command)
+    assert [e.command for e in r.events] == ["b", "c"]
+
+
+def test_export(tmp_path):
+    r = recorder.TrafficRecorder()
+    r.written(b"bat_v\r\n")
+    r.read(12)
+    r.export(tmp_path / "traffic.jsonl")
+    events = recorder.load(tmp_path / "traffic.jsonl")
+    assert [e.to_dict() for e in events] == [e.to_dict() for e in r.events]
+
+
+def test_summarise():
+    events = [
+        Event(0.0, "w", 7, "bat_v", "A", start=True),
+        Event(0.5, "r", 4, "bat_v", "A"),
+        Event(1.0, "r", 8, "bat_v", "A"),
+        Event(1.0, "w", 5, "gps", "A", start=True),
+        Event(4.0, "r", 20, "gps", "A"),
+        Event(5.0, "w", 7, "bat_v", "A", start=True),
+        Event(5.5, "r", 12, "bat_v", "A"),
+        # A read attributed to the next board starts a new exchange.
+        Event(6.0, "r", 3, "bat_v", "B"),
+    ]
+    totals = recorder.summarise(events)
+    assert [(t["board"], t["command"]) for t in totals] == [
+        ("A", "gps"), ("A", "bat_v"), ("B", "bat_v")]
+    gps, bat_v, other = totals
+    assert gps == {"board": "A", "command": "gps", "count": 1, "time": 3.0,
+                   "wait": 3.0, "written": 5, "read": 20}
+    assert bat_v["count"] == 2
+    assert bat_v["time"] == pytest.approx(1.5)
+    assert bat_v["wait"] == pytest.approx(1.0)
+    assert (bat_v["written"], bat_v["read"]) == (14, 24)
+    assert other["count"] == 1 and other["time"] == 0.0
+
+
+def test_summarise_skips_leading_reads():
+    events = [Event(0.0, "r", 5, "", ""),
+              Event(1.0, "w", 7, "bat_v", "A", start=True)]
+    assert [t["command"] for t in recorder.summarise(events)] == ["bat_v"]
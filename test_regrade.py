@@ -0,0 +1,79 @@
+from datetime import datetime
+import model
+import regrade
+import report
+
+
+def record(sn, measurements, recorded=None, timestamp=None):
+    recorded = recorded or {key: True for key in measurements}
+    return regrade.Record(f"{sn}.csv", sn, timestamp, measurements, recorded)
+
+
+def test_grade():
+    records = [
+        record("D5050001", {"input_v": 6.0, "supply_5v": 5.0,
+                            "uart_5v": 5.0}),
+        record("D5050002", {"input_v": 4.0, "uart_5v": 5.0}),
+    ]
+    results = regrade.grade(records, model.Model().limits)
+    assert list(results) == list(dict.fromkeys(regrade.GRADED.values()))
+    assert results["input_v"] == [True, False]
+    assert results["uart_5v"] == [True, None]
+    assert results["bat_v"] == [None, None]
+
+    limits = dict(model.Model().limits, v_input_min=3.5)
+    assert regrade.grade(records, limits)["input_v"] == [True, True]
+
+
+def test_deltas():
+    records = [
+        record("D5050001", {"input_v": 6.0}, {"input_v": True}),
+        record("D5050002", {"input_v": 4.0}, {"input_v": True}),
+        record("D5050003", {"input_v": 6.0}, {"input_v": False}),
+        record("D5050004", {}),
+    ]
+    results = {"input_v": [True, False, True, None]}
+    assert regrade.deltas(records, results) == [
+        {"limit": "input_v", "graded": 3, "failed_then": 1, "failed_now": 1,
+         "newly_failed": 1, "newly_passed": 1}]
+    assert regrade.newly_failing_boards(records, results) == [
+        ("D5050002", ["input_v"])]
+
+
+def test_latest_per_board():
+    old = record("D5050001", {}, timestamp=datetime(2026, 1, 1))
+    new = record("D5050001", {}, timestamp=datetime(2026, 2, 1))
+    undated = record("D5050002", {})
+    assert regrade.latest_per_board([new, old, undated]) == [new, undated]
+
+
+def test_parse_report(tmp_path):
+    board = report.Report()
+    board.write_data("pcba_sn", "D5050076", "PASS")
+    board.write_data("tester_id", "1", "PASS")
+    board.write_data("input_v", 6.0, "PASS")
+    board.write_data("solar_i", 12.5, "FAIL")
+    board.set_file_location(str(tmp_path))
+    board.generate_report()
+
+    [path] = tmp_path.glob("*.csv")
+    parsed = regrade.parse_report(path)
+    assert parsed.sn == "D5050076"
+    assert parsed.timestamp is not None
+    assert parsed.measurements == {"input_v": 6.0, "solar_i_min": 12.5}
+    assert parsed.recorded == {"input_v": True, "solar_i_min": False}
+
+    assert regrade.parse_report(tmp_path / "missing.csv") is None
+    (tmp_path / "other.csv").write_text("Name,Value,Pass/Fail\n")
+    assert regrade.parse_report(tmp_path / "other.csv") is None
+
+
+def test_parse_reports(tmp_path):
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"{i}.csv"
+        path.write_text(f"PCBA SN,D505000{i},PASS\n"
+                        "Input Voltage (V),6.0,PASS\n")
+        paths.append(str(path))
+    records = regrade.parse_reports(paths, workers=1)
+    assert [r.sn for r in records] == ["D5050000", "D5050001", "D5050002"]
@@ -0,0 +1,108 @@
+import sqlite3
+import report
+import results
+
+
+def board(sn, timestamp, tester="1", failed=(), **values):
+    board_report = report.Report()
+    board_report.timestamp = timestamp
+    board_report.write_data("pcba_sn", sn, "PASS")
+    board_report.write_data("tester_id", tester, "PASS")
+    for key, value in values.items():
+        board_report.write_data(key, value,
+                                "FAIL" if key in failed else "PASS")
+    board_report.test_result = "FAIL" if failed else "PASS"
+    return board_report
+
+
+def test_to_column():
+    assert results.to_column("input_v", "6.01") == 6.01
+    assert results.to_column("sonic_connected", "21 cm") == 21.0
+    assert results.to_column("input_v", "error") == "error"
+    assert results.to_column("input_v", None) is None
+    assert results.to_column("pcba_sn", "D5050076") == "D5050076"
+
+
+def test_tested_at():
+    assert results.tested_at("2026-10-01 09:05:07") == "2026-10-01 09:05:07"
+    assert results.tested_at("2026-10-01 09:05:7") == "2026-10-01 09:05:07"
+    assert len(results.tested_at(None)) == 19
+
+
+def test_find(tmp_path):
+    store = results.ResultsStore(tmp_path)
+    store.add(board("D5050001", "2026-10-01 09:00:00", input_v=6.0))
+    store.add(board("D5050002", "2026-10-02 09:00:00", tester="2",
+                    failed=["uart_5v"], uart_5v=5.3))
+    store.add(board("D5050001", "2026-10-03 09:00:00", input_v="6.1"))
+
+    def sns(**filters):
+        return [row["pcba_sn"] for row in store.find(**filters)]
+
+    assert sns() == ["D5050001", "D5050002", "D5050001"]
+    assert sns(sn="d5050001") == ["D5050001", "D5050001"]
+    assert sns(tester="2") == ["D5050002"]
+    assert sns(since="2026-10-02") == ["D5050001", "D5050002"]
+    assert sns(until="2026-10-02") == ["D5050002", "D5050001"]
+    assert sns(until="2026-10-02 08:00:00") == ["D5050001"]
+    assert sns(failed="uart_5v") == ["D5050002"]
+    assert store.find(sn="D5050001")[0]["input_v"] == 6.1
+    assert store.find(sn="D5050002")[0]["uart_5v_status"] == "FAIL"
+
+
+def test_history(tmp_path):
+    store = results.ResultsStore(tmp_path)
+    first = board("D5050001", "2026-10-01 09:00:00", failed=["uart_5v"],
+                  uart_5v=5.3)
+    first.write_timing("flash", 41.2)
+    store.add(first)
+    store.add(board("D5050001", "2026-10-02 09:00:00", tester="2"))
+    assert store.history("d5050001") == [
+        ("2026-10-02 09:00:00", "PASS", "2", []),
+        ("2026-10-01 09:00:00", "FAIL", "1", ["uart_5v"]),
+    ]
+    assert store.history("D5050002") == []
+
+
+def test_report_files(tmp_path):
+    store = results.ResultsStore(tmp_path)
+    csv_file = tmp_path / "D5050001.csv"
+    csv_file.write_text("")
+    store.add(board("D5050001", "2026-10-01 09:00:00"), csv_file)
+    store.add(board("D5050001", "2026-10-02 09:00:00"), csv_file)
+    assert len(store.find(sn="D5050001")) == 1
+    assert store.find()[0]["report_file"] == "D5050001.csv"
+
+    notes = tmp_path / "notes.csv"
+    notes.write_text("")
+    store.skip_file(notes)
+    assert store.indexed_files() == {
+        "D5050001.csv": csv_file.stat().st_mtime,
+        "notes.csv": notes.stat().st_mtime}
+
+    store.remove_missing(["D5050001.csv"])
+    assert store.find() == []
+    assert list(store.indexed_files()) == ["notes.csv"]
+
+
+def test_new_report_keys(tmp_path):
+    store = results.ResultsStore(tmp_path)
+    store.add(board("D5050001", "2026-10-01 09:00:00"))
+    newer = board("D5050002", "2026-10-02 09:00:00")
+    newer.data["new_test"] = ["New Test", "1.5", "PASS"]
+    store.add(newer)
+    assert store.find(sn="D5050002")[0]["new_test"] == "1.5"
+    assert store.find(sn="D5050001")[0]["new_test"] is None
+
+
+def test_rollback_journal(tmp_path):
+    connection = sqlite3.connect(str(tmp_path / results.DB_NAME))
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.close()
+
+    connection = results.ResultsStore(tmp_path).connect()
+    try:
+        mode = connection.execute("PRAGMA journal_mode").fetchone()[0]
+    finally:
+        connection.close()
+    assert mode == "delete"
@@ -0,0 +1,100 @@
+import os
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import time
+import scheduler
+from PyQt5.QtWidgets import QApplication
+
+app = QApplication.instance() or QApplication([])
+
+
+def board_schedule():
+    s = scheduler.Scheduler()
+    s.add("flash")
+    s.add("watchdog")
+    s.add("supply_5v", depends=["watchdog"])
+    s.add("uart_5v", depends=["flash", "supply_5v"])
+    return s
+
+
+def test_dispatch_order():
+    s = board_schedule()
+    ready = []
+    finished = []
+    s.task_ready.connect(ready.append)
+    s.all_finished.connect(lambda: finished.append(True))
+
+    s.start()
+    assert ready == ["flash", "watchdog"]
+    s.finish("watchdog")
+    assert ready == ["flash", "watchdog", "supply_5v"]
+    s.finish("supply_5v", 5.02)
+    assert "uart_5v" not in ready
+    s.finish("flash")
+    assert ready[-1] == "uart_5v"
+    assert not finished
+    s.finish("uart_5v")
+    assert finished == [True]
+    assert s.result("supply_5v") == 5.02
+
+
+def test_finish_twice():
+    s = board_schedule()
+    finished = []
+    s.task_finished.connect(finished.append)
+    s.start()
+    s.finish("flash", "first")
+    s.finish("flash", "second")
+    assert finished == ["flash"]
+    assert s.result("flash") == "first"
+    assert s.result("no_such_task") is None
+
+
+def test_worker_task():
+    s = scheduler.Scheduler()
+    s.add("read", func=lambda: 42)
+    s.add("fail", func=lambda: 1 / 0)
+    s.add("after", func=lambda: s.result("read") + 1, depends=["read"])
+    done = []
+    s.all_finished.connect(lambda: done.append(True))
+    s.start()
+
+    deadline = time.monotonic() + 5
+    while not done and time.monotonic() < deadline:
+        app.processEvents()
+    assert done
+    assert s.result("after") == 43
+    assert isinstance(s.tasks["fail"].error, ZeroDivisionError)
+
+
+def test_reset_ignores_old_work():
+    s = scheduler.Scheduler()
+    s.add("read", func=lambda: 42)
+    s.start()
+    s.reset()
+    s.add("read")
+    s.executor.shutdown(wait=True)
+    app.processEvents()
+    assert s.tasks["read"].end is None
+
+
+def test_critical_path():
+    s = board_schedule()
+    times = {"flash": (0.0, 40.0), "watchdog": (0.0, 3.0),
+             "supply_5v": (3.0, 5.0), "uart_5v": (40.0, 42.0)}
+    for name, (start, end) in times.items():
+        s.tasks[name].start = start
+        s.tasks[name].end = end
+
+    assert [t.name for t in s.critical_path()] == ["flash", "uart_5v"]
+    assert s.summary() == "flash 40.0 s > uart_5v 2.0 s (42.0 s)"
+
+    s.tasks["supply_5v"].end = 41.0
+    assert [t.name for t in s.critical_path()] == [
+        "watchdog", "supply_5v", "uart_5v"]
+
+
+def test_critical_path_empty():
+    s = board_schedule()
+    assert s.critical_path() == []
+    assert s.summary() == ""
@@ -0,0 +1,113 @@
+import model
+import sequence
+from sequence import TestStep as Step
+
+
+class FakeSerialManager:
+    """Answers commands from a dict and records how they were sent."""
+
+    class Port:
+        is_open = True
+
+    def __init__(self, responses):
+        self.ser = self.Port()
+        self.responses = responses
+        self.sent = []
+
+    def run_batch(self, commands, timeouts=None):
+        self.sent.append(list(commands))
+        return [self.responses[c].encode() for c in commands]
+
+    def query(self, command, timeout=None):
+        self.sent.append(command)
+        return self.responses[command].encode()
+
+    def flush_buffers(self):
+        pass
+
+    def resume(self, action, *args, **kwargs):
+        return action(*args, **kwargs)
+
+
+def run(steps, responses):
+    sm = FakeSerialManager(responses)
+    runner = sequence.SequenceRunner(sm, model.Model())
+    results = []
+    runner.results_ready.connect(results.extend)
+    runner.run(steps)
+    return sm.sent, results
+
+
+def test_batches_consecutive_commands():
+    steps = [
+        Step("a", "a"),
+        Step("b", "b"),
+        Step("multi", lambda sm: sm.query("c") == b"ok"),
+        Step("d", "d"),
+        Step("e", "e", delay=0.001),
+        Step("f", "f"),
+    ]
+    responses = {c: "ok" for c in "abcdef"}
+    sent, results = run(steps, responses)
+    assert sent == [["a", "b"], "c", "d", "e", "f"]
+    assert [r.step.name for r in results] == ["a", "b", "multi", "d", "e",
+                                              "f"]
+    assert all(r.passed for r in results)
+
+
+def test_required_step_ends_batch():
+    steps = [
+        Step("a", "a", check=lambda value: value == "ok", required=True),
+        Step("b", "b"),
+        Step("c", "c"),
+    ]
+    sent, results = run(steps, {"a": "bad", "b": "ok", "c": "ok"})
+    assert sent == ["a"]
+    assert [r.passed for r in results] == [False]
+
+
+def test_batch_retry():
+    steps = [
+        Step("a", "a", check=lambda value: value == "ok", retries=1),
+        Step("b", "b"),
+    ]
+    sent, results = run(steps, {"a": "bad", "b": "ok"})
+    assert sent == [["a", "b"], "a"]
+    assert results[0].attempts == 2
+    assert not results[0].passed
+
+
+def test_evaluate():
+    runner = sequence.SequenceRunner(None, model.Model())
+    step = Step("input_v", "input_v", parser=float, limit="input_v")
+    assert runner.evaluate(step, "6.0") == (6.0, [True])
+    assert runner.evaluate(step, "4.0") == (4.0, [False])
+    assert runner.evaluate(step, "x") == (None, [False])
+    assert runner.evaluate(step, True) == ("", [True])
+
+    # Limits relative to a value that hasn't been measured fail.
+    step = Step("bat_v", "bat_v", parser=float, limit="bat_v")
+    assert runner.evaluate(step, "6.0") == (6.0, [False])
+
+    step = Step("ids", "ids", parser=str.split,
+                check=lambda ids: [i == "x" for i in ids])
+    assert runner.evaluate(step, "x y") == (["x", "y"], [True, False])
+
+
+class FakeReport:
+    def __init__(self):
+        self.data = {}
+
+    def write_data(self, key, value, status):
+        self.data[key] = (value, status)
+
+
+def test_write_to():
+    report = FakeReport()
+    step = Step("tac", "tac", report_key=["t1", "t2"])
+    sequence.StepResult(step, ["a", "b"], [True, False], 0, 1).write_to(
+        report)
+    sequence.StepResult(Step("x", "x", report_key="x"), None, [False],
+                        0, 1).write_to(report)
+    assert report.data == {"t1": ("a", "PASS"), "t2": ("b", "FAIL"),
+                           "x": ("", "FAIL")}
@@ -0,0 +1,78 @@
+import re
+import serialmanager
+
+
+class FakePort:
+    """Returns the given chunks from read, one per call, then nothing."""
+
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+        self.timeout = None
+
+    @property
+    def in_waiting(self):
+        return len(self.chunks[0]) if self.chunks else 0
+
+    def read(self, size=1):
+        return self.chunks.pop(0) if self.chunks else b""
+
+
+def manager(chunks=()):
+    sm = serialmanager.SerialManager()
+    sm.ser = FakePort(chunks)
+    return sm
+
+
+def test_hex_frames():
+    sm = manager()
+    records = [b":1\r\n", b":22\r\n", b":333\r\n", b":4444444444\r\n"]
+    sm.hex_rx_buffer = 12
+    assert list(sm.hex_frames(records)) == [
+        (b":1\r\n:22\r\n", 2), (b":333\r\n", 1), (b":4444444444\r\n", 1)]
+
+    sm.hex_rx_buffer = serialmanager.HEX_RX_BUFFER
+    assert list(sm.hex_frames(records)) == [(r, 1) for r in records]
+    assert list(sm.hex_frames([])) == []
+
+
+def test_read_response_prompt():
+    sm = manager([b"6.0", b"1\r\n", b">", b"left over"])
+    assert sm.read_response() == b"6.01\r\n>"
+    assert not sm.timed_out
+    assert sm.line_synced
+    assert sm.ser.chunks == [b"left over"]
+
+
+def test_read_response_expected():
+    sm = manager([b"download hex ", b"records now...\r\n", b"more"])
+    data = sm.read_response([serialmanager.HEX_UPLOAD_READY])
+    assert data == b"download hex records now...\r\n"
+    assert not sm.timed_out
+    assert not sm.line_synced
+
+    sm = manager([b"T1\r\n000a5296"])
+    assert sm.read_response([re.compile(rb"[0-9a-f]{8}")]) == b"T1\r\n000a5296"
+
+
+def test_read_response_timeout():
+    sm = manager([b"partial"])
+    assert sm.read_response(timeout=0.05) == b"partial"
+    assert sm.timed_out
+    assert not sm.line_synced
+
+
+def test_read_response_quiet():
+    sm = manager([b"no prompt"])
+    assert sm.read_response(timeout=5, quiet=0.05) == b"no prompt"
+    assert not sm.timed_out
+
+
+def test_wait_for_acks():
+    sm = manager([b"\n\n", b"\x06"])
+    assert sm.wait_for_acks(2) == (b"\n\n", 2)
+
+    sm = manager([b"\n", b"lock bits set"])
+    assert sm.wait_for_acks(5) == (b"\nlock bits set", 5)
+
+    sm = manager([b"\n"])
+    assert sm.wait_for_acks(2) == (b"\n", 1)
@@ -0,0 +1,64 @@
+import pytest
+import steps
+
+
+def test_parse_versions():
+    data = "\r\nbootloader 1.0a\r\napp 2.3b\r\n"
+    assert steps.parse_versions(data) == ("1.0a", "2.3b")
+    assert steps.parse_versions("app 2.3b") is None
+
+
+def test_parse_version():
+    assert steps.parse_version("1-wire master 1.2a\r\n") == "1.2a"
+    assert steps.parse_version("no version") is None
+
+
+def test_parse_5v():
+    assert steps.parse_5v("5V\n5.02\n") == 5.02
+    with pytest.raises(ValueError):
+        steps.parse_5v("5V\n")
+    with pytest.raises(ValueError):
+        steps.parse_5v("5V\nerror\n")
+
+
+def test_parse_bat_v():
+    assert steps.parse_bat_v("bat_v\r\n6.01\r\n") == 6.01
+    assert steps.parse_bat_v("bat_v\r\n") is None
+
+
+def test_parse_imei():
+    assert steps.parse_imei("IMEI: 300234010000000\r\n") == "300234010000000"
+    assert steps.parse_imei("IMEI: 3002340\r\n") is None
+
+
+def test_board_id():
+    board_id = steps.parse_board_id("board_id\r\n01 02 03 04 05 06 07 28\r\n")
+    assert board_id == "01 02 03 04 05 06 07 28"
+    assert steps.board_id_passed(board_id)
+    assert not steps.board_id_passed("01 02 03 04 05 06 07 29")
+    assert steps.parse_board_id("board_id\r\n01 02\r\n") is None
+
+
+def test_parse_tac_ids():
+    data = "T1\n000a5296 ok\nT2\n000a5297\nT4"
+    assert steps.parse_tac_ids(data) == ["000a5296", "000a5297", None, None]
+
+
+def test_parse_snow_depth():
+    assert steps.parse_snow_depth("snow-depth\r\n21 cm\r\n") == "21"
+    assert steps.parse_snow_depth("snow-depth\r\n21\r\n") is None
+
+
+def test_hex_upload_patterns():
+    assert steps.hex_upload_ready("download hex records now...\r\n")
+    assert not steps.hex_upload_ready("error\r\n")
+    assert steps.hex_upload_done("lock bits set\r\n")
+    assert not steps.hex_upload_done("")
+
+
+def test_interface_steps_order():
+    tac_ids = ["000a5296", "000a5297", "000a5298", "000a5299"]
+    names = [step.name for step in
+             steps.interface_steps("D5050076", "300234010000000", tac_ids)]
+    assert names == ["serial_command", "serial", "bat_v", "iridium",
+                     "board_id", "tac", "flash", "rtc", "gps", "snow_depth"]